@@ -4,23 +4,66 @@ Main module for Google to Apple Photos Metadata Synchronizer
 """
 import os
 import sys
+import csv
 import json
 import logging
 import argparse
 import time
 import re
 import subprocess
-from pathlib import Path
+import mmap
+import concurrent.futures
+import itertools
+import multiprocessing
+import queue
+import platform
+import shutil
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime
 
 # Add the parent directory to sys.path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.models.metadata import DATE_TAG_ARGS, format_exif_date
 from src.services.exiftool_service import ExifToolService
 from src.services.metadata_service import MetadataService
 
-from src.services.copy_service import CopyService
+from src.services.copy_service import CopyService, COPY_WORKERS
+from src.services.xmp_service import XmpService
+from src.services.file_format_service import FileFormatService
+from src.services.photos_app_service import PhotosAppService
+
+try:
+	from tqdm import tqdm
+except ImportError:
+	class tqdm:
+		"""Minimal stand-in for tqdm progress bars when tqdm is not installed"""
+		def __init__(self, iterable=None, *args, **kwargs):
+			self.iterable = iterable
+
+		def __iter__(self):
+			return iter(self.iterable)
+
+		def update(self, n=1):
+			pass
+
+		def close(self):
+			pass
 from src.utils.file_utils import extract_date_from_filename
+from src.utils.log_utils import BufferedFileHandler, flush_log_handlers
+from src.utils.image_utils import (
+	iter_media_entries, find_duplicates, remove_duplicates_from_log, check_metadata_status,
+	find_duplicates_by_name, rename_files_remove_suffix
+)
+
+# Try to use simdjson for parsing Takeout JSON files
+HAS_SIMDJSON = False
+try:
+	import simdjson
+	HAS_SIMDJSON = True
+except ImportError:
+	pass
 
 # Configure logging
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -34,60 +77,300 @@ logging.basicConfig(
 	format='%(asctime)s - %(levelname)s - %(message)s',
 	handlers=[
 		logging.StreamHandler(),
-		logging.FileHandler(os.path.join(log_dir, 'metadata_sync.log'))
+		BufferedFileHandler(os.path.join(log_dir, 'metadata_sync.log'))
 	]
 )
 logger = logging.getLogger(__name__)
 
+# Filesystem creation dates can only be set with SetFile on macOS
+_IS_MACOS = platform.system() == 'Darwin'
+# Without SetFile the creation date is never set, so it is not checked either
+_HAS_SETFILE = _IS_MACOS and shutil.which('SetFile') is not None
+
+# Separator line of the summary
+SEP = "=" * 50
+
+
+# Formats exiftool cannot (or should not) write in place; they get an XMP sidecar
+_SIDECAR_EXTS = frozenset({'.mpg', '.avi', '.png', '.aae'})
+# AAE edit files: IMG_1234O.aae / IMG_1234(1)O.aae -> IMG_1234
+_AAE_NAME_RE = re.compile(r'(.+?)(?:\(\d+\))?O\.aae$', re.IGNORECASE)
+
+# JSON file name -> path indexes of old directories, built once per run
+_json_indexes = {}
+
+
+def build_json_index(old_dir):
+	"""
+	Build (or return the cached) index of JSON metadata files under old_dir
+
+	Args:
+		old_dir: Directory with Google Takeout files
+
+	Returns:
+		Dictionary mapping JSON file names to their full paths (first occurrence wins)
+	"""
+	json_index = _json_indexes.get(old_dir)
+	if json_index is not None:
+		return json_index
+
+	json_index = {}
+	stack = [old_dir]
+	while stack:
+		path = stack.pop()
+		try:
+			with os.scandir(path) as entries:
+				for entry in entries:
+					if entry.is_dir(follow_symlinks=False):
+						stack.append(entry.path)
+					elif entry.name.endswith('.json') and entry.name not in json_index:
+						json_index[entry.name] = entry.path
+		except OSError as e:
+			logger.error(f"Error scanning {path}: {str(e)}")
+
+	logger.debug(f"Indexed {len(json_index)} JSON files in {old_dir}")
+	_json_indexes[old_dir] = json_index
+	return json_index
+
+
+# Only the JSON fields the metadata writers use are kept from parallel parses
+_JSON_FIELDS = ('photoTakenTime', 'creationTime', 'geoData', 'title', 'description')
+# Below this many files the process pool costs more than it saves
+_PARALLEL_JSON_THRESHOLD = 1000
+# Matched pairs handled per worker task (and per exiftool session)
+_APPLY_CHUNK_SIZE = 64
+# Chunks queued per worker process, so matching stays only a little ahead of writing
+_CHUNKS_PER_WORKER = 2
+# SetFile processes (macOS creation dates) left running while the next files are written
+_SETFILE_IN_FLIGHT = 16
+# Tags compared before a write to skip files that already hold their metadata
+_CURRENT_TAGS = ['DateTimeOriginal', 'CreateDate', 'ModifyDate', 'Composite:GPSLatitude', 'Composite:GPSLongitude', 'Title', 'Description']
+# "photoTakenTime": {"timestamp": "1234567890", ...} without a full JSON parse
+_TS_PATTERN = re.compile(rb'"photoTakenTime"\s*:\s*\{[^}]*"timestamp"\s*:\s*"?(\d+)"?')
+# JSON path -> parsed fields, filled by preload_json_metadata and consumed by read_json_metadata
+_json_cache = {}
+
+
+def _read_json_file(json_path):
+	"""
+	Parse a JSON file from disk
+
+	With simdjson installed the file is memory-mapped and parsed without
+	first copying it into a Python bytes object; otherwise the stdlib
+	json module is used.
+
+	Args:
+		json_path: Path to the JSON file
+
+	Returns:
+		Parsed JSON data
+	"""
+	if HAS_SIMDJSON:
+		with open(json_path, 'rb') as f:
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+				return simdjson.Parser().parse(mm).as_dict()
+	with open(json_path, 'r') as f:
+		return json.load(f)
+
+
+def _load_json_fields(json_path):
+	"""
+	Parse one JSON file in a worker process
+
+	Args:
+		json_path: Path to the JSON metadata file
+
+	Returns:
+		Tuple of (json_path, dict of the fields in _JSON_FIELDS) or (json_path, None) on error
+	"""
+	try:
+		data = _read_json_file(json_path)
+		return json_path, {key: data[key] for key in _JSON_FIELDS if key in data}
+	except Exception:
+		return json_path, None
+
+
+def preload_json_metadata(json_paths, max_workers=None):
+	"""
+	Parse many JSON metadata files across CPU cores ahead of the metadata step
+
+	Args:
+		json_paths: Paths of the JSON files that will be read
+		max_workers: Number of worker processes (default: CPU count)
+	"""
+	pending = [path for path in set(json_paths) if path and path not in _json_cache]
+	if len(pending) < _PARALLEL_JSON_THRESHOLD:
+		return
+
+	logger.info(f"Parsing {len(pending)} JSON metadata files in parallel...")
+	try:
+		with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+			for json_path, data in executor.map(_load_json_fields, pending, chunksize=256):
+				if data is not None:
+					_json_cache[json_path] = data
+	except Exception as e:
+		# Files that were not preloaded are simply parsed on demand
+		logger.warning(f"Parallel JSON parsing failed, falling back to serial parsing: {str(e)}")
+
+
+def _load_json(json_path):
+	"""
+	Load a JSON metadata file, preferring a preloaded parse
+
+	Args:
+		json_path: Path to the JSON metadata file
+
+	Returns:
+		Parsed JSON data
+	"""
+	data = _json_cache.pop(json_path, None)
+	if data is None:
+		data = _read_json_file(json_path)
+	return data
+
+
+def _extract_date_taken(data):
+	"""
+	Get the capture date from parsed Google Takeout JSON
+
+	Args:
+		data: Parsed JSON data
+
+	Returns:
+		datetime from photoTakenTime (or creationTime), or None if neither is present
+	"""
+	if 'photoTakenTime' in data and 'timestamp' in data['photoTakenTime']:
+		return datetime.fromtimestamp(int(data['photoTakenTime']['timestamp']))
+	if 'creationTime' in data and 'timestamp' in data['creationTime']:
+		return datetime.fromtimestamp(int(data['creationTime']['timestamp']))
+	return None
+
+
+def _read_json_timestamp(json_path):
+	"""
+	Get photoTakenTime from a JSON file by scanning its bytes, without parsing it
+
+	Args:
+		json_path: Path to the JSON metadata file
+
+	Returns:
+		datetime of photoTakenTime, or None if it could not be found this way
+	"""
+	with open(json_path, 'rb') as f:
+		match = _TS_PATTERN.search(f.read())
+	if match:
+		return datetime.fromtimestamp(int(match.group(1)))
+	return None
+
+
+def _metadata_data(metadata):
+	"""
+	Get the parsed JSON behind a metadata dict, loading it on first use
+
+	Args:
+		metadata: Metadata dict from find_json_metadata/read_json_metadata
+
+	Returns:
+		Parsed JSON data, or None if the metadata has no JSON source
+	"""
+	if metadata['data'] is None and metadata.get('json_path'):
+		try:
+			metadata['data'] = _load_json(metadata['json_path'])
+		except Exception as e:
+			logger.warning(f"Error reading JSON file {metadata['json_path']}: {str(e)}")
+	return metadata['data']
+
+
+def read_json_metadata(json_path):
+	"""
+	Read a Google Takeout JSON file and build the metadata dict used by the writers
+
+	Args:
+		json_path: Path to the JSON metadata file
+
+	Returns:
+		Metadata dict with date_taken, json_path and data, or None if the JSON has no usable date
+	"""
+	try:
+		# Fast path: only the timestamp is needed to accept this JSON; the full
+		# document is parsed later by _metadata_data if a writer needs it
+		if json_path not in _json_cache:
+			date_taken = _read_json_timestamp(json_path)
+			if date_taken:
+				return {
+					'date_taken': date_taken,
+					'date_str': format_exif_date(date_taken),
+					'json_path': json_path,
+					'data': None
+				}
+
+		data = _load_json(json_path)
+		date_taken = _extract_date_taken(data)
+		if date_taken:
+			return {
+				'date_taken': date_taken,
+				'date_str': format_exif_date(date_taken),
+				'json_path': json_path,
+				'data': data
+			}
+	except Exception as e:
+		logger.warning(f"Error reading JSON file {json_path}: {str(e)}")
+	return None
+
+
+def _find_indexed_json_metadata(possible_json_names, old_dir):
+	"""
+	Resolve candidate JSON names through the old_dir index, then parse them in priority order
+
+	Args:
+		possible_json_names: Candidate JSON file names, most likely first
+		old_dir: Directory with Google Takeout files
+
+	Returns:
+		Metadata dict from the first candidate that yields a date, or None
+	"""
+	json_index = build_json_index(old_dir)
+	# Cheap lookups first; only candidates that exist are ever opened
+	json_paths = []
+	for json_name in possible_json_names:
+		json_path = json_index.get(json_name)
+		if json_path and json_path not in json_paths:
+			json_paths.append(json_path)
+
+	for json_path in json_paths:
+		metadata = read_json_metadata(json_path)
+		if metadata:
+			return metadata
+	return None
+
 
 def find_json_metadata(file_path, old_dir):
 	"""
 	Find the corresponding JSON metadata file for a given file
 	"""
-	logger.debug(f"Looking for metadata for {os.path.basename(file_path)}")
+	logger.debug("Looking for metadata for %s", os.path.basename(file_path))
 	base_name = os.path.basename(file_path)
-	name_without_ext = os.path.splitext(base_name)[0]
+	name_without_ext, file_ext = os.path.splitext(base_name)
+	file_ext = file_ext.lower()
 
 	# Special handling for AAE files
-	if file_path.lower().endswith('.aae'):
-		# AAE files often have names like IMG_1234O.aae or IMG_1234(1)O.aae
-		# Try to find the corresponding JSON by removing the O suffix and any (1) parts
-		match = re.match(r'(.+?)(?:\(\d+\))?O\.aae$', base_name, re.IGNORECASE)
-		if match:
-			base_name_without_o = match.group(1)
-			possible_json_names = [
-				f"{base_name_without_o}.json",
-				f"{base_name_without_o}(1).json",
-				f"{base_name_without_o.replace('IMG_', '')}.json"
-			]
-
-			# Recursively search for JSON files in old_dir and its subdirectories
-			for root, _, files in os.walk(old_dir):
-				for json_name in possible_json_names:
-					if json_name in files:
-						json_path = os.path.join(root, json_name)
-						try:
-							with open(json_path, 'r') as f:
-								data = json.load(f)
-
-							# Extract date taken
-							date_taken = None
-							if 'photoTakenTime' in data and 'timestamp' in data['photoTakenTime']:
-								timestamp = int(data['photoTakenTime']['timestamp'])
-								date_taken = datetime.fromtimestamp(timestamp)
-							elif 'creationTime' in data and 'timestamp' in data['creationTime']:
-								timestamp = int(data['creationTime']['timestamp'])
-								date_taken = datetime.fromtimestamp(timestamp)
-
-							if date_taken:
-								logger.info(f"Found metadata for AAE file {file_path} in {json_path}")
-								return {
-									'date_taken': date_taken,
-									'json_path': json_path,
-									'data': data
-								}
-						except Exception as e:
-							logger.warning(f"Error reading JSON file {json_path}: {str(e)}")
+	# AAE files often have names like IMG_1234O.aae or IMG_1234(1)O.aae
+	# Try to find the corresponding JSON by removing the O suffix and any (1) parts;
+	# the JSON lookup only happens when the name actually fits that pattern
+	match = _AAE_NAME_RE.match(base_name) if file_ext == '.aae' else None
+	if match:
+		base_name_without_o = match.group(1)
+		possible_json_names = [
+			f"{base_name_without_o}.json",
+			f"{base_name_without_o}(1).json",
+			f"{base_name_without_o.replace('IMG_', '')}.json"
+		]
+
+		metadata = _find_indexed_json_metadata(possible_json_names, old_dir)
+		if metadata:
+			logger.info("Found metadata for AAE file %s in %s", file_path, metadata['json_path'])
+			metadata['file_ext'] = file_ext
+			return metadata
 
 	# Try to extract date from filename patterns using the utility function
 	date_info = extract_date_from_filename(file_path)
@@ -113,14 +396,16 @@ def find_json_metadata(file_path, old_dir):
 				# For patterns without time, set to noon
 				date_taken = datetime(int(year), int(month), int(day), 12, 0, 0)
 
-			logger.info(f"Extracted date {date_taken} from filename {base_name} using {pattern_desc}")
+			logger.info("Extracted date %s from filename %s using %s", date_taken, base_name, pattern_desc)
 			return {
 				'date_taken': date_taken,
+				'date_str': format_exif_date(date_taken),
 				'json_path': None,
-				'data': None
+				'data': None,
+				'file_ext': file_ext
 			}
 		except ValueError as e:
-			logger.warning(f"Error parsing date from filename {base_name}: {str(e)}")
+			logger.warning("Error parsing date from filename %s: %s", base_name, e)
 			pass
 
 	# Legacy pattern like image_2021-03-07_235256.png
@@ -130,11 +415,13 @@ def find_json_metadata(file_path, old_dir):
 		try:
 			date_taken = datetime.strptime(date_str, '%Y-%m-%d')
 			date_taken = date_taken.replace(hour=12)  # Set to noon if no time
-			logger.info(f"Extracted date {date_taken} from filename {base_name}")
+			logger.info("Extracted date %s from filename %s", date_taken, base_name)
 			return {
 				'date_taken': date_taken,
+				'date_str': format_exif_date(date_taken),
 				'json_path': None,
-				'data': None
+				'data': None,
+				'file_ext': file_ext
 			}
 		except ValueError:
 			pass
@@ -148,11 +435,13 @@ def find_json_metadata(file_path, old_dir):
 			timestamp = timestamp / 1000
 		try:
 			date_taken = datetime.fromtimestamp(timestamp)
-			logger.info(f"Extracted date {date_taken} from timestamp filename {base_name}")
+			logger.info("Extracted date %s from timestamp filename %s", date_taken, base_name)
 			return {
 				'date_taken': date_taken,
+				'date_str': format_exif_date(date_taken),
 				'json_path': None,
-				'data': None
+				'data': None,
+				'file_ext': file_ext
 			}
 		except ValueError:
 			pass
@@ -164,56 +453,109 @@ def find_json_metadata(file_path, old_dir):
 		f"{name_without_ext.replace('(1)', '')}.json"
 	]
 
-	# Recursively search for JSON files in old_dir and its subdirectories
-	for root, _, files in os.walk(old_dir):
-		for json_name in possible_json_names:
-			if json_name in files:
-				json_path = os.path.join(root, json_name)
-				try:
-					with open(json_path, 'r') as f:
-						data = json.load(f)
-
-					# Extract date taken
-					date_taken = None
-					if 'photoTakenTime' in data and 'timestamp' in data['photoTakenTime']:
-						timestamp = int(data['photoTakenTime']['timestamp'])
-						date_taken = datetime.fromtimestamp(timestamp)
-					elif 'creationTime' in data and 'timestamp' in data['creationTime']:
-						timestamp = int(data['creationTime']['timestamp'])
-						date_taken = datetime.fromtimestamp(timestamp)
-
-					if date_taken:
-						logger.info(f"Found metadata for {file_path} in {json_path}")
-						return {
-							'date_taken': date_taken,
-							'json_path': json_path,
-							'data': data
-						}
-				except Exception as e:
-					logger.warning(f"Error reading JSON file {json_path}: {str(e)}")
+	metadata = _find_indexed_json_metadata(possible_json_names, old_dir)
+	if metadata:
+		logger.info("Found metadata for %s in %s", file_path, metadata['json_path'])
+		metadata['file_ext'] = file_ext
+		return metadata
 
 	# If no metadata found, use file system timestamps as last resort
 	try:
 		creation_time = os.path.getctime(file_path)
 		date_taken = datetime.fromtimestamp(creation_time)
-		logger.info(f"Using file system creation time for {file_path}: {date_taken}")
+		logger.info("Using file system creation time for %s: %s", file_path, date_taken)
 		return {
 			'date_taken': date_taken,
+			'date_str': format_exif_date(date_taken),
 			'json_path': None,
-			'data': None
+			'data': None,
+			'file_ext': file_ext
 		}
 	except Exception as e:
-		logger.warning(f"Could not get file creation time for {file_path}: {str(e)}")
+		logger.warning("Could not get file creation time for %s: %s", file_path, e)
 
 	return None
 
 
+def _date_args(date_str):
+	"""
+	Build the exiftool date assignments for an EXIF-formatted date string
+
+	Args:
+		date_str: Date in 'YYYY:MM:DD HH:MM:SS' format
+
+	Returns:
+		Tuple of the DATE_TAG_ARGS assignments
+	"""
+	return tuple(tag + date_str for tag in DATE_TAG_ARGS)
+
+
+def _metadata_is_current(metadata, current):
+	"""
+	Check whether a file already holds the metadata that would be written to it
+
+	Args:
+		metadata: Metadata dict as returned by read_json_metadata/find_json_metadata
+		current: Tag values of the file as returned by ExifToolService.read_tags
+
+	Returns:
+		True if writing the metadata would not change the file
+	"""
+	if not current:
+		return False
+	date_str = metadata['date_str']
+	if any(str(current.get(tag)) != date_str for tag in ('DateTimeOriginal', 'CreateDate', 'ModifyDate')):
+		return False
+
+	data = _metadata_data(metadata)
+	if data:
+		geo_data = data.get('geoData') or {}
+		for key, tag in (('latitude', 'GPSLatitude'), ('longitude', 'GPSLongitude')):
+			if geo_data.get(key):
+				try:
+					if abs(float(current.get(tag)) - float(geo_data[key])) > 1e-6:
+						return False
+				except (TypeError, ValueError):
+					return False
+		for key, tag in (('title', 'Title'), ('description', 'Description')):
+			if data.get(key) and str(current.get(tag)) != data[key]:
+				return False
+	return True
+
+
+def _file_times_are_current(file_path, metadata):
+	"""
+	Check whether a file's filesystem times already match its date taken
+
+	update_file_metadata sets the modification time (and the creation date with
+	SetFile on macOS) after the write; a file whose tags are current but whose
+	times are not still needs that update.
+
+	Args:
+		file_path: Path to the file
+		metadata: Metadata dict as returned by read_json_metadata/find_json_metadata
+
+	Returns:
+		True if the filesystem times match the date taken
+	"""
+	try:
+		st = os.stat(file_path)
+	except OSError:
+		return False
+	timestamp = metadata['date_taken'].timestamp()
+	if abs(st.st_mtime - timestamp) >= 1:
+		return False
+	if _HAS_SETFILE and abs(getattr(st, 'st_birthtime', timestamp) - timestamp) >= 1:
+		return False
+	return True
+
+
 def create_xmp_sidecar(file_path, metadata, dry_run=False, overwrite=False):
 	"""
 	Create an XMP sidecar file for files that can't have metadata embedded directly
 	"""
 	if dry_run:
-		logger.info(f"[DRY RUN] Would create XMP sidecar for {file_path}")
+		logger.info("[DRY RUN] Would create XMP sidecar for %s", file_path)
 		return True
 
 	sidecar_path = f"{file_path}.xmp"
@@ -221,104 +563,94 @@ def create_xmp_sidecar(file_path, metadata, dry_run=False, overwrite=False):
 	# Check if sidecar already exists
 	if os.path.exists(sidecar_path):
 		if overwrite:
-			logger.info(f"Overwriting existing XMP sidecar for {file_path}")
-			try:
-				os.remove(sidecar_path)
-			except Exception as e:
-				logger.error(f"Failed to remove existing XMP sidecar for {file_path}: {str(e)}")
-				return False
+			# The sidecar is replaced atomically by the writer
+			logger.info("Overwriting existing XMP sidecar for %s", file_path)
 		else:
-			logger.info(f"XMP sidecar already exists for {file_path}, skipping")
+			logger.info("XMP sidecar already exists for %s, skipping", file_path)
 			return True
 
-	date_str = metadata['date_taken'].strftime('%Y:%m:%d %H:%M:%S')
-
-	# Build exiftool command
-	cmd = [
-		'exiftool',
-		'-o', sidecar_path,
-		f'-DateTimeOriginal={date_str}',
-		f'-CreateDate={date_str}',
-		f'-ModifyDate={date_str}'
-	]
-
-	# Add GPS coordinates if available
-	if metadata['data'] and 'geoData' in metadata['data']:
-		geo_data = metadata['data']['geoData']
+	# Write the sidecar directly; spawning exiftool per sidecar is not needed for plain XMP
+	latitude = longitude = title = description = None
+	data = _metadata_data(metadata)
+	if data and 'geoData' in data:
+		geo_data = data['geoData']
 		if 'latitude' in geo_data and geo_data['latitude'] != 0:
-			cmd.append(f'-GPSLatitude={geo_data["latitude"]}')
+			latitude = geo_data['latitude']
 		if 'longitude' in geo_data and geo_data['longitude'] != 0:
-			cmd.append(f'-GPSLongitude={geo_data["longitude"]}')
+			longitude = geo_data['longitude']
 
 	# Add title/description if available
-	if metadata['data']:
-		if 'title' in metadata['data'] and metadata['data']['title']:
-			cmd.append(f'-Title={metadata["data"]["title"]}')
-		if 'description' in metadata['data'] and metadata['data']['description']:
-			cmd.append(f'-Description={metadata["data"]["description"]}')
+	if data:
+		title = data.get('title') or None
+		description = data.get('description') or None
+
+	if XmpService.write_sidecar(sidecar_path, metadata['date_str'], latitude, longitude, title, description):
+		logger.debug("Created XMP sidecar: %s", sidecar_path)
+		return True
+	logger.error("Failed to create XMP sidecar for %s", file_path)
+	return False
 
-	# Add the file path
-	cmd.append(file_path)
 
+def _wait_setfile(file_path, proc):
+	"""Wait for a SetFile process started by update_file_metadata and log a failure"""
 	try:
-		result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
-		if result.returncode == 0:
-			logger.info(f"Successfully created XMP sidecar for {file_path}")
-			logger.info(f"Created XMP sidecar: {sidecar_path}")
-			return True
-		else:
-			logger.error(f"Failed to create XMP sidecar for {file_path}: {result.stderr}")
-			return False
+		_, stderr = proc.communicate(timeout=30)
+		if proc.returncode != 0:
+			logger.warning("SetFile failed for %s: %s", file_path, stderr.strip())
 	except Exception as e:
-		logger.error(f"Error creating XMP sidecar for {file_path}: {str(e)}")
-		return False
+		proc.kill()
+		logger.warning("SetFile exception for %s: %s", file_path, e)
 
 
-def update_file_metadata(file_path, metadata, dry_run=False):
+def update_file_metadata(file_path, metadata, dry_run=False, session=None, setfile_procs=None):
 	"""
 	Update metadata directly in the file if possible
+
+	When session (a running ExifToolSession) is given, the write goes through
+	that persistent exiftool process instead of spawning a new one. When
+	setfile_procs (a deque) is given, SetFile is not waited for: its process is
+	queued there and only reaped once _SETFILE_IN_FLIGHT are running, so the
+	spawns overlap with the next exiftool writes. The caller reaps the rest.
 	"""
 	if dry_run:
-		logger.info(f"[DRY RUN] Would update metadata for {file_path}")
+		logger.info("[DRY RUN] Would update metadata for %s", file_path)
 		return True
 
-	date_str = metadata['date_taken'].strftime('%Y:%m:%d %H:%M:%S')
+	date_str = metadata['date_str']
 
 	# Build exiftool command
-	cmd = [
-		'exiftool',
-		f'-DateTimeOriginal={date_str}',
-		f'-CreateDate={date_str}',
-		f'-ModifyDate={date_str}'
-	]
+	cmd = ['exiftool', *_date_args(date_str)]
 
 	# Add GPS coordinates if available
-	if metadata['data'] and 'geoData' in metadata['data']:
-		geo_data = metadata['data']['geoData']
+	data = _metadata_data(metadata)
+	if data and 'geoData' in data:
+		geo_data = data['geoData']
 		if 'latitude' in geo_data and geo_data['latitude'] != 0:
 			cmd.append(f'-GPSLatitude={geo_data["latitude"]}')
 		if 'longitude' in geo_data and geo_data['longitude'] != 0:
 			cmd.append(f'-GPSLongitude={geo_data["longitude"]}')
 
 	# Add title/description if available
-	if metadata['data']:
-		if 'title' in metadata['data'] and metadata['data']['title']:
-			cmd.append(f'-Title={metadata["data"]["title"]}')
-		if 'description' in metadata['data'] and metadata['data']['description']:
-			cmd.append(f'-Description={metadata["data"]["description"]}')
+	if data:
+		if 'title' in data and data['title']:
+			cmd.append(f'-Title={data["title"]}')
+		if 'description' in data and data['description']:
+			cmd.append(f'-Description={data["description"]}')
 
 	# Add overwrite flag and file path
 	cmd.extend(['-overwrite_original', file_path])
 
 	try:
-		result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
+		if session is not None:
+			result = session.execute(cmd[1:])
+		else:
+			result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
 		if result.returncode == 0:
-			logger.info(f"Successfully updated metadata for {file_path}")
+			logger.debug("Successfully updated metadata for %s", file_path)
 
 			# Try to update filesystem creation date (macOS only)
 			try:
-				import platform
-				if platform.system() == 'Darwin':
+				if _IS_MACOS:
 					# SetFile (macOS, needs Xcode Command Line Tools)
 					creation_date = metadata['date_taken'].strftime('%m/%d/%Y %H:%M:%S')
 					setfile_cmd = [
@@ -327,40 +659,56 @@ def update_file_metadata(file_path, metadata, dry_run=False):
 						file_path
 					]
 					try:
-						result_setfile = subprocess.run(setfile_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-						if result_setfile.returncode != 0:
-							logger.warning(f"SetFile failed for {file_path}: {result_setfile.stderr.strip()}")
+						if setfile_procs is not None:
+							proc = subprocess.Popen(setfile_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+							setfile_procs.append((file_path, proc))
+							if len(setfile_procs) >= _SETFILE_IN_FLIGHT:
+								_wait_setfile(*setfile_procs.popleft())
+						else:
+							result_setfile = subprocess.run(setfile_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+							if result_setfile.returncode != 0:
+								logger.warning("SetFile failed for %s: %s", file_path, result_setfile.stderr.strip())
 					except Exception as e:
-						logger.warning(f"SetFile exception for {file_path}: {str(e)}")
+						logger.warning("SetFile exception for %s: %s", file_path, e)
 				# Always update mtime/atime
 				mtime = atime = metadata['date_taken'].timestamp()
 				os.utime(file_path, (atime, mtime))
 			except Exception as e:
-				logger.warning(f"Failed to update filesystem times for {file_path}: {str(e)}")
+				logger.warning("Failed to update filesystem times for %s: %s", file_path, e)
 
 			return True
 		else:
-			logger.error(f"Failed to update metadata for {file_path}: {result.stderr}")
+			logger.error("Failed to update metadata for %s: %s", file_path, result.stderr)
 			return False
 	except Exception as e:
-		logger.error(f"Error updating metadata for {file_path}: {str(e)}")
+		logger.error("Error updating metadata for %s: %s", file_path, e)
 		return False
 
 
-def process_file(file_path, old_dir, dry_run=False, overwrite=False):
+def process_file(file_path, old_dir, dry_run=False, overwrite=False, json_path=None, session=None, current=None,
+				setfile_procs=None):
 	"""
 	Process a single file
+
+	When json_path is given (e.g. from an already matched media/JSON pair) it is
+	used directly instead of searching old_dir for the metadata again. session is
+	an optional ExifToolSession used for the direct metadata write. current holds
+	the file's tag values read beforehand (see _CURRENT_TAGS); when they already
+	match the metadata and the filesystem times match the date taken, the write
+	is skipped. setfile_procs is passed on to update_file_metadata.
 	"""
-	logger.info(f"Processing {os.path.basename(file_path)}")
+	logger.debug("Processing %s", os.path.basename(file_path))
 
 	# Find corresponding JSON metadata or fallback to filename-based date
-	metadata = find_json_metadata(file_path, old_dir)
+	metadata = read_json_metadata(json_path) if json_path else None
+	if metadata:
+		metadata['file_ext'] = os.path.splitext(file_path)[1].lower()
+	else:
+		metadata = find_json_metadata(file_path, old_dir)
 	if not metadata:
-		from src.utils.file_utils import extract_date_from_filename
 		date_info = extract_date_from_filename(file_path)
 		if date_info:
 			date_str, pattern_desc = date_info
-			from datetime import datetime
 			# Try to extract time if possible
 			filename = os.path.basename(file_path)
 			time_match = None
@@ -375,26 +723,182 @@ def process_file(file_path, old_dir, dry_run=False, overwrite=False):
 					dt = datetime.strptime(f"{date_time.group(1)} {date_time.group(2).replace('-', ':')}", '%Y-%m-%d %H:%M:%S')
 				else:
 					dt = datetime.strptime(date_str, '%Y:%m:%d')
-			metadata = {'date_taken': dt, 'json_path': None, 'data': None}
+			metadata = {
+				'date_taken': dt,
+				'date_str': format_exif_date(dt),
+				'json_path': None,
+				'data': None,
+				'file_ext': os.path.splitext(filename)[1].lower()
+			}
 		else:
-			logger.warning(f"No metadata or valid date found for {file_path}")
+			logger.warning("No metadata or valid date found for %s", file_path)
 			return False
 
-	file_ext = os.path.splitext(file_path)[1].lower()
-	if file_ext in ['.mpg', '.avi', '.png', '.aae']:
+	if metadata['file_ext'] in _SIDECAR_EXTS:
 		return create_xmp_sidecar(file_path, metadata, dry_run, overwrite)
+	elif _metadata_is_current(metadata, current) and _file_times_are_current(file_path, metadata):
+		logger.debug("Metadata of %s is already up to date", file_path)
+		return True
 	else:
-		success = update_file_metadata(file_path, metadata, dry_run)
+		success = update_file_metadata(file_path, metadata, dry_run, session, setfile_procs)
 		if not success:
-			logger.info(f"Direct update failed for {file_path}, trying sidecar approach")
+			logger.info("Direct update failed for %s, trying sidecar approach", file_path)
 			return create_xmp_sidecar(file_path, metadata, dry_run, overwrite)
 		return success
 
 
+def _apply_chunk(task):
+	"""
+	Apply metadata to a chunk of matched pairs through one exiftool session
+
+	Runs in a worker process of apply_metadata_to_pairs.
+
+	Args:
+		task: Tuple of (list of (json_path, media_file), old_dir, dry_run, overwrite)
+
+	Returns:
+		Tuple of (list of updated (json_path, media_file) pairs, failed count)
+	"""
+	pairs, old_dir, dry_run, overwrite = task
+	updated_pairs = []
+	failure_count = 0
+	setfile_procs = deque()
+	# A dry run never writes, so it does not need an exiftool process
+	with (nullcontext() if dry_run else ExifToolService.batch_session()) as session:
+		# One read for the whole chunk tells which files already hold their metadata
+		current_tags = {}
+		if session is not None:
+			media_files = [media_file for _, media_file in pairs]
+			current_tags = ExifToolService.read_tags(media_files, _CURRENT_TAGS, session)
+		for json_path, media_file in pairs:
+			try:
+				# Reuse the JSON found while matching instead of searching old_dir again
+				if process_file(media_file, old_dir, dry_run, overwrite, json_path=json_path, session=session,
+								current=current_tags.get(media_file), setfile_procs=setfile_procs):
+					updated_pairs.append((json_path, media_file))
+				else:
+					failure_count += 1
+			except Exception as e:
+				logger.error("Error processing %s: %s", media_file, e)
+				failure_count += 1
+	while setfile_procs:
+		_wait_setfile(*setfile_procs.popleft())
+	# Pool workers exit without flushing the buffered log files
+	flush_log_handlers()
+	return updated_pairs, failure_count
+
+
+def apply_metadata_to_pairs(matched_pairs, old_dir, dry_run=False, overwrite=False, jobs=None,
+							processed_files=None, match_info=None):
+	"""
+	Apply metadata to matched media/JSON pairs, spreading chunks over worker processes
+
+	Each worker owns its own persistent exiftool process, so exiftool I/O overlaps
+	across cores. matched_pairs may be a generator (see iter_metadata_pairs): it is
+	consumed in the calling thread, and a new chunk is taken from it only when a
+	worker returns one, keeping _CHUNKS_PER_WORKER chunks per worker queued. So
+	matching and writing overlap, while the generator's side effects (hashing,
+	duplicate removal, match_info) stay in this thread. Every updated file is
+	written to the processed files log, so an interrupted run can be resumed.
+
+	Args:
+		matched_pairs: Iterable of (json_path, media_file, metadata) tuples
+		old_dir: Directory with Google Takeout files
+		dry_run: If True, don't modify any files
+		overwrite: Overwrite existing XMP sidecar files
+		jobs: Number of worker processes (default: CPU count, 1 = no pool)
+		processed_files: Set of media files updated by a previous run, which are skipped
+		match_info: Dictionary of (match_method, similarity) per JSON file for the processed log
+
+	Returns:
+		Tuple of (updated count, failed count)
+	"""
+	jobs = jobs or os.cpu_count() or 1
+	processed_files = processed_files or set()
+	# Filled while matched_pairs is consumed, so the caller's dictionary must be kept
+	if match_info is None:
+		match_info = {}
+	skipped_count = 0
+
+	def unprocessed_pairs():
+		nonlocal skipped_count
+		for pair in matched_pairs:
+			if pair[1] in processed_files:
+				skipped_count += 1
+			else:
+				yield pair[0], pair[1]
+
+	def record(updated_pairs):
+		# A dry run does not change anything, so it must not mark files as done
+		if not dry_run:
+			for json_path, media_file in updated_pairs:
+				match_method, similarity = match_info.get(json_path, ('name', 1.0))
+				MetadataService.log_processed_file(json_path, media_file, match_method, similarity)
+
+	pairs = unprocessed_pairs()
+	chunks = iter(lambda: list(itertools.islice(pairs, _APPLY_CHUNK_SIZE)), [])
+	tasks = ((chunk, old_dir, dry_run, overwrite) for chunk in chunks)
+	# A single chunk is not worth starting a pool for
+	first_tasks = list(itertools.islice(tasks, 2))
+	tasks = itertools.chain(first_tasks, tasks)
+
+	updated_count = 0
+	failed_count = 0
+	progress = tqdm(desc='Applying metadata', unit='file')
+	try:
+		if jobs > 1 and len(first_tasks) > 1:
+			# Forked workers would write the records still buffered in this process again
+			flush_log_handlers()
+			with multiprocessing.Pool(jobs) as pool:
+				# Not imap_unordered: its task handler thread would drain the whole generator
+				done = queue.Queue()
+
+				def submit():
+					task = next(tasks, None)
+					if task is None:
+						return False
+					pool.apply_async(_apply_chunk, (task,), callback=done.put, error_callback=done.put)
+					return True
+
+				pending = 0
+				while pending < jobs * _CHUNKS_PER_WORKER and submit():
+					pending += 1
+				while pending:
+					result = done.get()
+					pending -= 1
+					if isinstance(result, BaseException):
+						raise result
+					updated_pairs, failure_count = result
+					record(updated_pairs)
+					updated_count += len(updated_pairs)
+					failed_count += failure_count
+					progress.update(len(updated_pairs) + failure_count)
+					if submit():
+						pending += 1
+		else:
+			# Without workers, parse the JSON files of a window of chunks in parallel up front
+			window_size = -(-_PARALLEL_JSON_THRESHOLD // _APPLY_CHUNK_SIZE)
+			for window in iter(lambda: list(itertools.islice(tasks, window_size)), []):
+				preload_json_metadata([json_path for task in window for json_path, _ in task[0]])
+				for task in window:
+					updated_pairs, failure_count = _apply_chunk(task)
+					record(updated_pairs)
+					updated_count += len(updated_pairs)
+					failed_count += failure_count
+					progress.update(len(updated_pairs) + failure_count)
+	finally:
+		progress.close()
+		if skipped_count:
+			logger.info(f"Skipped {skipped_count} files already updated by a previous run")
+	return updated_count, failed_count
+
+
 def fix_metadata(args):
 	"""
 	Fix metadata for all file types
 	"""
+	dry_run, overwrite = args.dry_run, args.overwrite
+
 	# Check if exiftool is installed
 	if not ExifToolService.check_exiftool():
 		logger.error("ExifTool is not installed or not in PATH. Please install ExifTool.")
@@ -425,7 +929,6 @@ def fix_metadata(args):
 	# Check if we have a metadata status file
 	if args.status_log and os.path.isfile(args.status_log):
 		try:
-			import csv
 			logger.info(f"Using metadata status file: {args.status_log}")
 			with open(args.status_log, 'r') as f:
 				reader = csv.reader(f)
@@ -459,7 +962,6 @@ def fix_metadata(args):
 	elif args.failed_updates_log and os.path.isfile(args.failed_updates_log):
 		# Process files from the failed log
 		try:
-			import csv
 			logger.info(f"Using failed updates log: {args.failed_updates_log}")
 			with open(args.failed_updates_log, 'r') as f:
 				reader = csv.reader(f)
@@ -479,36 +981,35 @@ def fix_metadata(args):
 		except Exception as e:
 			logger.error(f"Error reading failed updates log: {str(e)}")
 			return 1
-	elif args.extensions:
-		# Process specific file extensions
-		extensions = [ext.lower().strip() for ext in args.extensions.split(',')]
-		logger.debug(f"Looking for files with extensions: {extensions}")
-		for ext in extensions:
-			# Search for both lowercase and uppercase extensions
-			for pattern in [f"*.{ext}", f"*.{ext.upper()}"]:
-				logger.debug(f"Searching with pattern: {pattern} in directory {new_dir}")
-				count_before = len(files_to_process)
-				for file_path in Path(new_dir).glob(pattern):
-					files_to_process.append((str(file_path), None))
-				count_after = len(files_to_process)
-				logger.debug(f"Found {count_after - count_before} files with pattern {pattern}")
-		logger.info(f"Found {len(files_to_process)} files with extensions {args.extensions}")
 	else:
-		# Process all files
-		logger.info(f"Scanning for all files in {new_dir}")
-		for file_path in Path(new_dir).glob("*.*"):
-			file_path_str = str(file_path)
-			# Skip XMP sidecar files and hidden files
-			if not file_path_str.endswith('.xmp') and not os.path.basename(file_path_str).startswith('.'):
-				files_to_process.append((file_path_str, None))
-		logger.info(f"Found {len(files_to_process)} files to process")
+		# Single directory pass filtered by extension set, skipping XMP sidecars and hidden files
+		exts = {f".{ext.lower().strip()}" for ext in args.extensions.split(',')} if args.extensions else None
+		if exts:
+			logger.debug(f"Looking for files with extensions: {sorted(exts)}")
+		else:
+			logger.info(f"Scanning for all files in {new_dir}")
+		with os.scandir(new_dir) as entries:
+			for entry in entries:
+				name = entry.name
+				if name.startswith('.') or name.endswith('.xmp') or not entry.is_file(follow_symlinks=False):
+					continue
+				ext = os.path.splitext(name)[1].lower()
+				if exts is None and not ext:
+					continue
+				if exts is not None and ext not in exts:
+					continue
+				files_to_process.append((entry.path, None))
+		if exts:
+			logger.info(f"Found {len(files_to_process)} files with extensions {args.extensions}")
+		else:
+			logger.info(f"Found {len(files_to_process)} files to process")
 
 	# Limit processing if requested
 	if args.limit and args.limit > 0 and args.limit < len(files_to_process):
 		logger.info(f"Limiting processing to {args.limit} files")
 		files_to_process = files_to_process[:args.limit]
 
-	if args.dry_run:
+	if dry_run:
 		logger.info("Performing dry run, no changes will be made")
 
 	# Process files
@@ -521,82 +1022,80 @@ def fix_metadata(args):
 	with open(results_log_path, 'w') as results_log:
 		results_log.write("file_path,result,timestamp\n")
 
-	for i, file_info in enumerate(files_to_process):
-		if isinstance(file_info, tuple) and len(file_info) == 2:
-			file_path, json_path = file_info
-		else:
-			file_path = file_info
-			json_path = None
+	# One persistent exiftool process for files written through process_file
+	with ExifToolService.batch_session() as session:
+		for i, file_info in enumerate(files_to_process):
+			if isinstance(file_info, tuple) and len(file_info) == 2:
+				file_path, json_path = file_info
+			else:
+				file_path = file_info
+				json_path = None
 
-		logger.info(f"Processing file {i+1}/{len(files_to_process)}: {os.path.basename(file_path)}")
+			logger.info("Processing file %d/%d: %s", i + 1, len(files_to_process), os.path.basename(file_path))
 
-		try:
-			result = "failure"
-			if json_path and os.path.exists(json_path):
-				# If we have a specific JSON file, use it directly
-				logger.debug(f"Using JSON file: {json_path} for {file_path}")
-				metadata = MetadataService.extract_metadata_from_json(json_path)
-				if metadata:
-					# Convert Metadata object to exiftool arguments
-					exiftool_args = []
-
-					# Add date fields if available
-					if metadata.date_taken:
-						exiftool_args.extend([
-							"-DateTimeOriginal=" + metadata.date_taken,
-							"-CreateDate=" + metadata.date_taken,
-							"-ModifyDate=" + metadata.date_taken
-						])
-
-					# Add GPS coordinates if available
-					if metadata.latitude is not None and metadata.longitude is not None:
-						exiftool_args.extend([
-							"-GPSLatitude=" + str(metadata.latitude),
-							"-GPSLongitude=" + str(metadata.longitude),
-							"-GPSLatitudeRef=" + ("N" if metadata.latitude >= 0 else "S"),
-							"-GPSLongitudeRef=" + ("E" if metadata.longitude >= 0 else "W")
-						])
-
-					# Add title if available
-					if metadata.title:
-						exiftool_args.append("-Title=" + metadata.title)
-
-					if exiftool_args:
-						logger.debug(f"Applying metadata with args: {exiftool_args}")
-						if ExifToolService.apply_metadata(file_path, exiftool_args, args.dry_run):
-							success_count += 1
-							result = "success"
+			try:
+				result = "failure"
+				if json_path and os.path.exists(json_path):
+					# If we have a specific JSON file, use it directly
+					logger.debug("Using JSON file: %s for %s", json_path, file_path)
+					metadata = MetadataService.extract_metadata_from_json(json_path)
+					if metadata:
+						# Convert Metadata object to exiftool arguments
+						exiftool_args = []
+
+						# Add date fields if available
+						if metadata.date_taken:
+							exiftool_args.extend(_date_args(metadata.date_taken))
+
+						# Add GPS coordinates if available
+						if metadata.latitude is not None and metadata.longitude is not None:
+							exiftool_args.extend([
+								"-GPSLatitude=" + str(metadata.latitude),
+								"-GPSLongitude=" + str(metadata.longitude),
+								"-GPSLatitudeRef=" + ("N" if metadata.latitude >= 0 else "S"),
+								"-GPSLongitudeRef=" + ("E" if metadata.longitude >= 0 else "W")
+							])
+
+						# Add title if available
+						if metadata.title:
+							exiftool_args.append("-Title=" + metadata.title)
+
+						if exiftool_args:
+							logger.debug("Applying metadata with args: %s", exiftool_args)
+							if ExifToolService.apply_metadata(file_path, exiftool_args, dry_run, session):
+								success_count += 1
+								result = "success"
+							else:
+								failure_count += 1
 						else:
+							logger.warning("No metadata fields to apply for file: %s", file_path)
 							failure_count += 1
 					else:
-						logger.warning(f"No metadata fields to apply for file: {file_path}")
+						logger.warning("No metadata found in JSON file: %s", json_path)
 						failure_count += 1
 				else:
-					logger.warning(f"No metadata found in JSON file: {json_path}")
-					failure_count += 1
-			else:
-				# Otherwise, try to find matching JSON in old directory
-				if process_file(file_path, old_dir, args.dry_run, args.overwrite):
-					success_count += 1
-					result = "success"
-				else:
-					failure_count += 1
+					# Otherwise, try to find matching JSON in old directory
+					if process_file(file_path, old_dir, dry_run, overwrite, session=session):
+						success_count += 1
+						result = "success"
+					else:
+						failure_count += 1
 
-			# Log the result
-			with open(results_log_path, 'a') as results_log:
-				timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-				results_log.write(f"{file_path},{result},{timestamp}\n")
-		except KeyboardInterrupt:
-			logger.warning("Process interrupted by user")
-			break
-		except Exception as e:
-			logger.error(f"Error processing {file_path}: {str(e)}")
-			failure_count += 1
+				# Log the result
+				with open(results_log_path, 'a') as results_log:
+					timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+					results_log.write(f"{file_path},{result},{timestamp}\n")
+			except KeyboardInterrupt:
+				logger.warning("Process interrupted by user")
+				break
+			except Exception as e:
+				logger.error("Error processing %s: %s", file_path, e)
+				failure_count += 1
 
-			# Log the error
-			with open(results_log_path, 'a') as results_log:
-				timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-				results_log.write(f"{file_path},error: {str(e)},{timestamp}\n")
+				# Log the error
+				with open(results_log_path, 'a') as results_log:
+					timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+					results_log.write(f"{file_path},error: {str(e)},{timestamp}\n")
 
 	# Summary
 	logger.info("==================================================")
@@ -616,6 +1115,65 @@ def fix_metadata(args):
 
 
 
+def copy_missing_files(old_dir, new_dir, dry_run=False, copy_mode='copy', similarity_threshold=1.0,
+					copy_workers=COPY_WORKERS):
+	"""
+	Copy media files missing from the new directory and report the result
+
+	Args:
+		old_dir: Directory with Google Takeout files
+		new_dir: Directory with Apple Photos exports
+		dry_run: If True, don't copy any files
+		copy_mode: How files are put into new_dir ('copy', 'hardlink' or 'reflink')
+		similarity_threshold: Threshold for considering images as already present (0.0 to 1.0)
+		copy_workers: Number of concurrent copies
+	"""
+	missing_count, copied_count = CopyService.copy_missing_files(
+		old_dir, new_dir, dry_run, copy_mode, similarity_threshold, copy_workers
+	)
+	if dry_run:
+		logger.info(f"[DRY RUN] Would copy {copied_count} of {missing_count} missing files from {old_dir} to {new_dir}")
+	else:
+		logger.info(f"Finished copying files. Copied {copied_count} of {missing_count} missing files from {old_dir} to {new_dir}")
+
+
+def report_duplicates(new_dir, similarity_threshold, duplicates_log):
+	"""
+	Find duplicates in the new directory, write them to the duplicates log and report them
+
+	Args:
+		new_dir: Directory with Apple Photos exports
+		similarity_threshold: Threshold for considering images as duplicates (0.0 to 1.0)
+		duplicates_log: Path to the duplicates log
+
+	Returns:
+		Dictionary mapping original files to lists of duplicate files
+	"""
+	duplicates = find_duplicates(new_dir, similarity_threshold, duplicates_log)
+	if duplicates:
+		dup_count = sum(len(dups) for dups in duplicates.values())
+		logger.info(f"Found {dup_count} duplicate files in {len(duplicates)} groups")
+		logger.info(f"Results written to {duplicates_log}")
+	else:
+		logger.info("No duplicates found")
+	return duplicates
+
+
+def remove_logged_duplicates(duplicates_log, dry_run=False):
+	"""
+	Remove the duplicates listed in the duplicates log and report the result
+
+	Args:
+		duplicates_log: Path to the duplicates log
+		dry_run: If True, don't remove any files
+	"""
+	processed, removed = remove_duplicates_from_log(duplicates_log, dry_run)
+	if dry_run:
+		logger.info(f"[DRY RUN] Would remove {removed} of {processed} duplicate files")
+	else:
+		logger.info(f"Removed {removed} of {processed} duplicate files")
+
+
 def main():
 	"""Main function to run the metadata synchronization process
 
@@ -656,6 +1214,10 @@ def main():
 	advanced_group.add_argument('--find-duplicates-by-name', action='store_true', help='Find duplicates by checking for files with the same base name but with "(1)" suffix')
 	advanced_group.add_argument('--name-duplicates-log', default=os.path.join(data_dir, 'name_duplicates.csv'), help='Log file for name-based duplicates (default: data/name_duplicates.csv)')
 	advanced_group.add_argument('--check-metadata', action='store_true', help='Check which files in the new directory need metadata updates from the old directory')
+	advanced_group.add_argument('--copy-mode', choices=['copy', 'hardlink', 'reflink'], default='copy', help='How missing files are put into the new directory: copy (default), hardlink or reflink (no data copy, falls back to copy)')
+	advanced_group.add_argument('--copy-workers', type=int, default=COPY_WORKERS, help=f'Number of files copied at the same time (default: {COPY_WORKERS}; use 1 or 2 when either directory is on a spinning disk)')
+	advanced_group.add_argument('--reprocess', action='store_true', help='Update all matched files again, ignoring files recorded in the processed log')
+	advanced_group.add_argument('--jobs', '-j', type=int, help='Number of worker processes for applying metadata and of parallel HEIC conversions (default: CPU count)')
 
 	# New features added from other repositories
 	new_features_group = parser.add_argument_group('New features', 'Additional features for enhanced functionality')
@@ -666,6 +1228,8 @@ def main():
 	new_features_group.add_argument('--preserve-albums', action='store_true', help='Preserve album structure when importing to Apple Photos (creates folders for album groups)')
 	new_features_group.add_argument('--skip-album-folders', action='store_true', help='Skip creating folders for album groups, import all albums at top level')
 	args = parser.parse_args()
+	dry_run, processed_log, duplicates_log = args.dry_run, args.processed_log, args.duplicates_log
+	similarity_threshold, use_hash_matching = args.similarity, not args.no_hash_matching
 
 	# Set logging level based on verbosity
 	if args.verbose:
@@ -697,26 +1261,21 @@ def main():
 	if args.fix_metadata:
 		return fix_metadata(args)
 
-	if args.dry_run:
+	if dry_run:
 		logger.info("Performing dry run (no files will be modified)")
 
+	# Files updated by previous runs are skipped, unless a full rerun is requested
+	processed_files = set() if args.reprocess else MetadataService.load_processed_files(processed_log)
+
 	# Set up the processed files and failed updates loggers
-	MetadataService.setup_processed_files_logger(args.processed_log, args.failed_updates_log)
+	MetadataService.setup_processed_files_logger(processed_log, args.failed_updates_log, append=not args.reprocess)
 
 	# Handle specific advanced options first
 	if args.find_duplicates_only:
-		from src.utils.image_utils import find_duplicates
 		logger.info(f"Finding duplicates in {new_dir}...")
-		duplicates = find_duplicates(new_dir, args.similarity)
-		if duplicates:
-			dup_count = sum(len(dups) for dups in duplicates.values())
-			logger.info(f"Found {dup_count} duplicate files in {len(duplicates)} groups")
-			logger.info(f"Results written to {args.duplicates_log}")
-		else:
-			logger.info("No duplicates found")
+		report_duplicates(new_dir, similarity_threshold, duplicates_log)
 
 	if args.check_metadata:
-		from src.utils.image_utils import check_metadata_status
 		logger.info(f"Checking metadata status for files in {new_dir}...")
 		total, with_metadata, without_metadata = check_metadata_status(old_dir, new_dir, args.status_log)
 		logger.info(f"Total files in {new_dir}: {total}")
@@ -725,76 +1284,51 @@ def main():
 		logger.info(f"Detailed status written to {args.status_log}")
 
 	if args.find_duplicates_by_name:
-		from src.utils.image_utils import find_duplicates_by_name
 		logger.info(f"Finding duplicates by name in {new_dir}...")
-		found, removed = find_duplicates_by_name(new_dir, args.rename_suffix, args.dry_run, args.name_duplicates_log)
-		if args.dry_run:
+		found, removed = find_duplicates_by_name(new_dir, args.rename_suffix, dry_run, args.name_duplicates_log)
+		if dry_run:
 			logger.info(f"[DRY RUN] Would remove {found} duplicate files")
 		else:
 			logger.info(f"Removed {removed} of {found} duplicate files")
 
 	if args.rename_files:
-		from src.utils.image_utils import rename_files_remove_suffix
 		logger.info(f"Renaming files in {new_dir} by removing '{args.rename_suffix}' suffix...")
-		processed, renamed = rename_files_remove_suffix(new_dir, args.rename_suffix, args.dry_run)
-		if args.dry_run:
+		processed, renamed = rename_files_remove_suffix(new_dir, args.rename_suffix, dry_run)
+		if dry_run:
 			logger.info(f"[DRY RUN] Would rename {renamed} of {processed} files")
 		else:
 			logger.info(f"Renamed {renamed} of {processed} files")
 
 	if args.copy_to_new:
 		logger.info(f"Copying missing media files from {old_dir} to {new_dir}...")
-		missing_count, copied_count = CopyService.copy_missing_files(old_dir, new_dir, args.dry_run)
-		if args.dry_run:
-			logger.info(f"[DRY RUN] Would copy {copied_count} of {missing_count} missing files from {old_dir} to {new_dir}")
-		else:
-			logger.info(f"Finished copying files. Copied {copied_count} of {missing_count} missing files from {old_dir} to {new_dir}")
+		copy_missing_files(old_dir, new_dir, dry_run, args.copy_mode, similarity_threshold, args.copy_workers)
 
 	if args.remove_duplicates:
-		from src.utils.image_utils import remove_duplicates
-		logger.info(f"Removing duplicates in {new_dir} based on {args.duplicates_log}...")
-		if not os.path.exists(args.duplicates_log):
-			logger.error(f"Duplicates log file not found: {args.duplicates_log}")
+		logger.info(f"Removing duplicates in {new_dir} based on {duplicates_log}...")
+		if not os.path.exists(duplicates_log):
+			logger.error(f"Duplicates log file not found: {duplicates_log}")
 			logger.info("Run the script with --find-duplicates-only first to generate the duplicates log")
 			return 1
-		processed, removed = remove_duplicates(args.duplicates_log, args.dry_run)
-		if args.dry_run:
-			logger.info(f"[DRY RUN] Would remove {removed} of {processed} duplicate files")
-		else:
-			logger.info(f"Removed {removed} of {processed} duplicate files")
+		remove_logged_duplicates(duplicates_log, dry_run)
+
+	# The advanced options run on their own, not followed by the default workflow
+	if any((args.find_duplicates_only, args.check_metadata, args.find_duplicates_by_name,
+			args.rename_files, args.copy_to_new, args.remove_duplicates)):
+		return 0
 
 	# Default workflow: copy -> find duplicates -> remove duplicates -> apply metadata
+	total_matched = updated_count = failed_count = 0
 	# Step 1: Copy missing files from old to new (if not skipped)
 	if not args.skip_copy:
 		logger.info(f"Step 1/3: Copying missing media files from {old_dir} to {new_dir}...")
-		missing_count, copied_count = CopyService.copy_missing_files(old_dir, new_dir, args.dry_run)
-		if args.dry_run:
-			logger.info(f"[DRY RUN] Would copy {copied_count} of {missing_count} missing files from {old_dir} to {new_dir}")
-		else:
-			logger.info(f"Finished copying files. Copied {copied_count} of {missing_count} missing files from {old_dir} to {new_dir}")
+		copy_missing_files(old_dir, new_dir, dry_run, args.copy_mode, similarity_threshold, args.copy_workers)
 
 	# Step 2: Find and remove duplicates (if not skipped)
 	if not args.skip_duplicates:
 		logger.info(f"Step 2/3: Finding and removing duplicates in {new_dir}...")
 
-		# Find duplicates
-		from src.utils.image_utils import find_duplicates, remove_duplicates
-		duplicates = find_duplicates(new_dir, args.similarity)
-
-		if duplicates:
-			dup_count = sum(len(dups) for dups in duplicates.values())
-			logger.info(f"Found {dup_count} duplicate files in {len(duplicates)} groups")
-			logger.info(f"Results written to {args.duplicates_log}")
-
-			# Remove duplicates
-			processed, removed = remove_duplicates(args.duplicates_log, args.dry_run)
-
-			if args.dry_run:
-				logger.info(f"[DRY RUN] Would remove {removed} of {processed} duplicate files")
-			else:
-				logger.info(f"Removed {removed} of {processed} duplicate files")
-		else:
-			logger.info("No duplicates found")
+		if report_duplicates(new_dir, similarity_threshold, duplicates_log):
+			remove_logged_duplicates(duplicates_log, dry_run)
 	else:
 		logger.info("Step 2/3: Skipping duplicate search and removal (--skip-duplicates)")
 
@@ -802,38 +1336,31 @@ def main():
 	if not args.skip_metadata:
 		logger.info(f"Step 3/3: Applying metadata from {old_dir} to files in {new_dir}...")
 
-		# Двухэтапная обработка: сначала по JSON, потом по остальным файлам
-		from pathlib import Path
-		try:
-			from tqdm import tqdm
-		except ImportError:
-			tqdm = lambda x: x
-		processed_files = set()
-
 		# Optimized reporting: only matched and processed files are counted
 		logger.info("Finding matched media/JSON pairs...")
-		matched_pairs = MetadataService.find_metadata_pairs(old_dir, new_dir)
-		total_matched = len(matched_pairs)
-		updated_count = 0
-		failed_count = 0
-		tqdm_bar = tqdm(matched_pairs, desc='Applying metadata', unit='file')
-		for pair in tqdm_bar:
-			try:
-				json_path, media_file, _ = pair
-				if process_file(media_file, old_dir, args.dry_run, args.overwrite):
-					updated_count += 1
-				else:
-					failed_count += 1
-			except KeyboardInterrupt:
-				logger.warning("Process interrupted by user")
-				break
-			except Exception as e:
-				logger.error(f"Error processing {media_file}: {str(e)}")
-				failed_count += 1
+		pairs_cache_file = os.path.join(data_dir, 'pairs_cache.pkl')
+		pairs_cache_settings = MetadataService.pairs_cache_settings(new_dir, use_hash_matching, similarity_threshold)
+		pairs_cache = MetadataService.load_pairs_cache(pairs_cache_file, pairs_cache_settings)
+		match_info = {}
+		# Pairs are matched while the metadata of earlier pairs is being written
+		matched_pairs = MetadataService.iter_metadata_pairs(
+			old_dir, new_dir, use_hash_matching, similarity_threshold, duplicates_log,
+			pairs_cache=pairs_cache, match_info=match_info
+		)
+		try:
+			updated_count, failed_count = apply_metadata_to_pairs(
+				matched_pairs, old_dir, dry_run, args.overwrite, args.jobs,
+				processed_files=processed_files, match_info=match_info
+			)
+		except KeyboardInterrupt:
+			logger.warning("Process interrupted by user")
+		# Every matched JSON file gets an entry in match_info
+		total_matched = len(match_info)
+		MetadataService.save_pairs_cache(pairs_cache, pairs_cache_file, pairs_cache_settings)
 
 	elapsed_time = time.time() - start_time
 	minutes, seconds = divmod(elapsed_time, 60)
-	logger.info("=" * 50)
+	logger.info(SEP)
 	logger.info("Metadata Synchronization Summary:")
 	logger.info(f"Time elapsed: {int(minutes)} minutes, {int(seconds)} seconds")
 	logger.info(f"Matched files: {total_matched}")
@@ -841,8 +1368,8 @@ def main():
 	logger.info(f"Failed: {failed_count}")
 	if failed_count > 0:
 		logger.info(f"Failed updates are logged in: {args.failed_updates_log}")
-	logger.info(f"Detailed processing log: {args.processed_log}")
-	logger.info("=" * 50)
+	logger.info(f"Detailed processing log: {processed_log}")
+	logger.info(SEP)
 	if updated_count > 0:
 		logger.info("✅ Metadata synchronization completed successfully!")
 	else:
@@ -852,60 +1379,44 @@ def main():
 	# Process zip files directly if requested
 	if args.process_zip and os.path.isfile(old_dir) and CopyService.is_zip_file(old_dir):
 		logger.info(f"Processing Google Takeout zip file directly: {old_dir}")
-		missing_count, copied_count = CopyService.process_zip_file(old_dir, new_dir, args.dry_run)
-		if args.dry_run:
+		missing_count, copied_count = CopyService.process_zip_file(old_dir, new_dir, dry_run, args.copy_mode, args.copy_workers)
+		if dry_run:
 			logger.info(f"[DRY RUN] Would extract and copy {copied_count} of {missing_count} files from {old_dir} to {new_dir}")
 		else:
 			logger.info(f"Finished extracting and copying files. Copied {copied_count} of {missing_count} files from {old_dir} to {new_dir}")
 
 	# Convert HEIC files to JPG if requested
 	if args.convert_heic:
-		from src.services.file_format_service import FileFormatService
 		logger.info(f"Converting HEIC files to JPG in {new_dir}...")
-		heic_files = []
-		for root, _, files in os.walk(new_dir):
-			for file in files:
-				if file.lower().endswith('.heic'):
-					heic_files.append(os.path.join(root, file))
+		heic_files = [entry.path for entry in iter_media_entries(new_dir) if entry.name.lower().endswith('.heic')]
 
 		logger.info(f"Found {len(heic_files)} HEIC files to convert")
-		converted_count = 0
-		for heic_file in heic_files:
-			if args.dry_run:
+		if dry_run:
+			for heic_file in heic_files:
 				logger.info(f"[DRY RUN] Would convert {heic_file} to JPG")
-				converted_count += 1
-			else:
-				jpg_file = FileFormatService.convert_heic_to_jpg(heic_file)
-				if jpg_file:
-					converted_count += 1
+			converted_count = len(heic_files)
+		else:
+			converted_count = FileFormatService.convert_heic_files(heic_files, args.jobs)
 
-		if args.dry_run:
+		if dry_run:
 			logger.info(f"[DRY RUN] Would convert {converted_count} of {len(heic_files)} HEIC files to JPG")
 		else:
 			logger.info(f"Converted {converted_count} of {len(heic_files)} HEIC files to JPG")
 
 	# Fix file extensions if requested
 	if args.fix_extensions:
-		from src.services.file_format_service import FileFormatService
 		logger.info(f"Fixing incorrect file extensions in {new_dir}...")
-		media_files = []
-		for root, _, files in os.walk(new_dir):
-			for file in files:
-				if is_media_file(os.path.join(root, file)):
-					media_files.append(os.path.join(root, file))
+		media_files = [entry.path for entry in iter_media_entries(new_dir)]
 
 		logger.info(f"Found {len(media_files)} media files to check")
-		fixed_count = 0
-		for media_file in media_files:
-			if args.dry_run:
+		if dry_run:
+			for media_file in media_files:
 				logger.info(f"[DRY RUN] Would check and fix extension for {media_file}")
-				fixed_count += 1
-			else:
-				fixed_file = FileFormatService.fix_file_extension(media_file)
-				if fixed_file and fixed_file != media_file:
-					fixed_count += 1
+			fixed_count = len(media_files)
+		else:
+			fixed_count = FileFormatService.fix_file_extensions(media_files)
 
-		if args.dry_run:
+		if dry_run:
 			logger.info(f"[DRY RUN] Would fix extensions for {fixed_count} files")
 		else:
 			logger.info(f"Fixed extensions for {fixed_count} files")
@@ -917,16 +1428,15 @@ def main():
 		matched_pairs = MetadataService.find_metadata_pairs(old_dir, new_dir)
 
 		# Rename files to original filenames
-		processed, successful = MetadataService.batch_rename_to_original(matched_pairs, args.dry_run)
+		processed, successful = MetadataService.batch_rename_to_original(matched_pairs, dry_run)
 
-		if args.dry_run:
+		if dry_run:
 			logger.info(f"[DRY RUN] Would rename {successful} of {processed} files to their original filenames")
 		else:
 			logger.info(f"Renamed {successful} of {processed} files to their original filenames")
 
 	# Import to Apple Photos if requested
 	if updated_count > 0 and (args.import_to_photos or args.import_with_albums):
-		from src.services.photos_app_service import PhotosAppService
 		logger.info("Importing photos to Apple Photos...")
 
 		# Determine album handling based on options
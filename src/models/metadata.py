@@ -1,9 +1,32 @@
 """
 Models for photo metadata
 """
+import sys
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, ClassVar
+
+# __slots__ for dataclasses needs Python 3.10; older versions keep a __dict__ per instance
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# exiftool date tags written for every photo
+DATE_TAG_ARGS = ('-DateTimeOriginal=', '-CreateDate=', '-ModifyDate=')
+
+
+def format_exif_date(dt: datetime) -> str:
+	"""
+	Format a datetime in the EXIF 'YYYY:MM:DD HH:MM:SS' format
+	
+	Formats the fields directly instead of going through strftime, which
+	parses its format string again on every call.
+	
+	Args:
+		dt: Date and time to format
+		
+	Returns:
+		Date string in EXIF format
+	"""
+	return f"{dt.year:04d}:{dt.month:02d}:{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
 
 
 @dataclass
@@ -36,7 +59,7 @@ class Metadata:
 		return args
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class PhotoMetadata:
 	"""Represents metadata extracted from Google Takeout JSON files"""
 	
@@ -54,9 +77,12 @@ class PhotoMetadata:
 	latitude: Optional[float] = None
 	longitude: Optional[float] = None
 	
-	# Original JSON data
+	# Original JSON data, only kept when KEEP_RAW is set (e.g. for debugging)
 	raw_data: Optional[Dict[str, Any]] = None
 	
+	# Keeping every decoded JSON alive for the whole pair list costs a lot of memory
+	KEEP_RAW: ClassVar[bool] = False
+	
 	@classmethod
 	def from_json(cls, json_data: Dict[str, Any]) -> 'PhotoMetadata':
 		"""
@@ -105,7 +131,7 @@ class PhotoMetadata:
 			description=description,
 			latitude=latitude,
 			longitude=longitude,
-			raw_data=json_data
+			raw_data=json_data if cls.KEEP_RAW else None
 		)
 	
 	def to_exiftool_args(self) -> List[str]:
@@ -115,17 +141,9 @@ class PhotoMetadata:
 		Returns:
 			List of arguments for exiftool
 		"""
-		args = []
-		
-		# Format date as YYYY:MM:DD HH:MM:SS
-		date_str = self.date_taken.strftime('%Y:%m:%d %H:%M:%S')
-		
-		# Add date fields
-		args.extend([
-			f'-DateTimeOriginal={date_str}',
-			f'-CreateDate={date_str}',
-			f'-ModifyDate={date_str}'
-		])
+		# Format date as YYYY:MM:DD HH:MM:SS and add date fields
+		date_str = format_exif_date(self.date_taken)
+		args = [tag + date_str for tag in DATE_TAG_ARGS]
 		
 		# Add title if available
 		if self.title:
@@ -1,15 +1,121 @@
 import os
+import sys
+import errno
+import ctypes
 import shutil
+import struct
+import itertools
 import logging
 import zipfile
 import tempfile
-from typing import List, Tuple, Dict, Set, Optional
-from pathlib import Path
-
-from src.utils.image_utils import is_media_file, compute_hash_for_file, load_image_hashes, save_image_hashes
+import threading
+from typing import List, Tuple, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+	import fcntl
+	HAS_FCNTL = True
+except ImportError:
+	HAS_FCNTL = False
+
+# clonefile(2) on macOS 10.12+: a copy-on-write clone on APFS that copies no data
+HAS_CLONEFILE = False
+if sys.platform == 'darwin':
+	try:
+		_clonefile = ctypes.CDLL(None, use_errno=True).clonefile
+		_clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+		_clonefile.restype = ctypes.c_int
+		HAS_CLONEFILE = True
+	except (OSError, AttributeError):
+		pass
+
+from src.utils.hash_index import HashIndex, max_distance_for
+from src.utils.image_utils import (
+	HAS_IMAGE_HASH, is_image_file, is_video_file, scan_media_entries, compute_hash_for_file,
+	get_cached_hash, set_cached_hash, load_image_hashes, append_image_hashes, compact_image_hashes
+)
 
 logger = logging.getLogger(__name__)
 
+# Number of concurrent copies; copying is I/O bound, so threads overlap the syscalls
+COPY_WORKERS = 16
+
+# Maximum number of copies queued to the pool at once
+COPY_QUEUE_DEPTH = 256
+
+# Read and write buffer size when streaming zip members to disk
+ZIP_BUFFER_SIZE = 1 << 20
+
+# Number of zip members extracted at the same time
+ZIP_WORKERS = 8
+
+# Size of the fixed part of a zip local file header
+ZIP_LOCAL_HEADER_SIZE = 30
+
+# Below this many files a process pool costs more than it saves when hashing
+PARALLEL_HASH_THRESHOLD = 64
+
+# Supported ways of putting a file into the target directory
+COPY_MODES = ('copy', 'hardlink', 'reflink')
+
+# In-kernel file copies (Linux 4.5+, Python 3.8+)
+HAS_COPY_FILE_RANGE = hasattr(os, 'copy_file_range')
+
+# Linux ioctl that clones a file's extents on copy-on-write filesystems (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def _hash_worker(item: Tuple[str, os.stat_result]) -> Tuple[str, Optional[str]]:
+	"""Compute the hash of a file in a worker process"""
+	file_path, st = item
+	return file_path, compute_hash_for_file(file_path, st=st)
+
+
+def _has_content_hash(file_path: str) -> bool:
+	"""Check if a file is hashed by its content, so only files of the same size can match it"""
+	return is_video_file(file_path) or (not HAS_IMAGE_HASH and is_image_file(file_path))
+
+
+def _copy_stored_member(archive_fd: int, info: zipfile.ZipInfo, target: str) -> bool:
+	"""
+	Copy an uncompressed zip member to a file with os.copy_file_range
+
+	Members stored without compression (as Takeout stores most photos and videos)
+	are a plain byte range of the archive, so the kernel copies them without
+	passing the data through Python. pread and copy_file_range take explicit
+	offsets, so the archive descriptor can be shared by all threads.
+
+	Args:
+		archive_fd: Read-only file descriptor of the zip file
+		info: Zip member to copy
+		target: Path of the file to write
+
+	Returns:
+		True if the member was copied, False if it has to be extracted with zipfile instead
+	"""
+	if not HAS_COPY_FILE_RANGE or info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+		return False
+	try:
+		# The local file header has its own name and extra field lengths before the data
+		header = os.pread(archive_fd, ZIP_LOCAL_HEADER_SIZE, info.header_offset)
+		if len(header) != ZIP_LOCAL_HEADER_SIZE or header[:4] != b'PK\x03\x04':
+			return False
+		name_length, extra_length = struct.unpack('<HH', header[26:30])
+		offset = info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length
+		with open(target, 'wb') as dst:
+			remaining = info.file_size
+			while remaining > 0:
+				count = os.copy_file_range(archive_fd, dst.fileno(), remaining, offset)
+				if count == 0:
+					break
+				offset += count
+				remaining -= count
+		return remaining == 0
+	except OSError as e:
+		logger.debug(f"copy_file_range failed for {info.filename}, extracting with zipfile: {str(e)}")
+		return False
+
+
 class CopyService:
 	"""Service for copying missing media files from old to new directory"""
 
@@ -53,16 +159,58 @@ class CopyService:
 
 			# Extract the zip file
 			logger.info(f"Extracting {zip_path} to {extract_dir}...")
+			root = os.path.realpath(extract_dir)
+			created_dirs = {root}
+			file_members = []
 			with zipfile.ZipFile(zip_path, 'r') as zip_ref:
 				# Get total number of files for progress reporting
-				total_files = len(zip_ref.namelist())
+				members = zip_ref.infolist()
+				total_files = len(members)
 				logger.info(f"Zip file contains {total_files} files")
 
-				# Extract files with progress reporting
-				for i, file in enumerate(zip_ref.namelist()):
-					zip_ref.extract(file, extract_dir)
-					if (i + 1) % 100 == 0 or (i + 1) == total_files:
-						logger.info(f"Extracted {i + 1}/{total_files} files")
+				# Directories are created here, once each, so the workers only write files
+				for info in members:
+					target = os.path.realpath(os.path.join(root, info.filename))
+					if os.path.commonpath([root, target]) != root:
+						logger.warning(f"Skipped {info.filename} in {zip_path}, it points outside {extract_dir}")
+						continue
+					target_dir = target if info.is_dir() else os.path.dirname(target)
+					if target_dir not in created_dirs:
+						os.makedirs(target_dir, exist_ok=True)
+						created_dirs.add(target_dir)
+					if not info.is_dir():
+						file_members.append((info, target))
+
+			# zlib releases the GIL while inflating, so members are extracted by several
+			# threads; a ZipFile handle must not be shared, so each thread opens its own
+			local = threading.local()
+			handles = []
+			handles_lock = threading.Lock()
+			archive_fd = os.open(zip_path, os.O_RDONLY)
+
+			def extract_member(member: Tuple[zipfile.ZipInfo, str]) -> None:
+				info, target = member
+				if _copy_stored_member(archive_fd, info, target):
+					return
+				zip_ref = getattr(local, 'zip_ref', None)
+				if zip_ref is None:
+					zip_ref = local.zip_ref = zipfile.ZipFile(zip_path, 'r')
+					with handles_lock:
+						handles.append(zip_ref)
+				# Stream the member to disk with large buffers
+				with zip_ref.open(info) as src, open(target, 'wb', buffering=ZIP_BUFFER_SIZE) as dst:
+					shutil.copyfileobj(src, dst, ZIP_BUFFER_SIZE)
+
+			try:
+				with ThreadPoolExecutor(max_workers=ZIP_WORKERS) as executor:
+					# Results are consumed in this thread, so the counter needs no lock
+					for i, _ in enumerate(executor.map(extract_member, file_members), 1):
+						if i % 100 == 0 or i == len(file_members):
+							logger.info(f"Extracted {i}/{len(file_members)} files")
+			finally:
+				for zip_ref in handles:
+					zip_ref.close()
+				os.close(archive_fd)
 
 			logger.info(f"Successfully extracted {zip_path} to {extract_dir}")
 			return extract_dir
@@ -71,7 +219,8 @@ class CopyService:
 			return ""
 
 	@staticmethod
-	def process_zip_file(zip_path: str, new_dir: str, dry_run: bool = False) -> Tuple[int, int]:
+	def process_zip_file(zip_path: str, new_dir: str, dry_run: bool = False, copy_mode: str = 'copy',
+						copy_workers: int = COPY_WORKERS) -> Tuple[int, int]:
 		"""
 		Process a Google Takeout zip file by extracting it and copying the files to the target directory
 
@@ -79,6 +228,8 @@ class CopyService:
 			zip_path: Path to the zip file
 			new_dir: Target directory where files should be copied
 			dry_run: If True, only log what would be done without actually copying
+			copy_mode: How files are put into new_dir (see copy_missing_files)
+			copy_workers: Number of concurrent copies (see copy_missing_files)
 
 		Returns:
 			Tuple of (total files found, files copied)
@@ -100,7 +251,7 @@ class CopyService:
 
 			# Process the extracted files
 			logger.info(f"Processing extracted files from {extract_dir}...")
-			result = CopyService.copy_missing_files(extract_dir, new_dir, dry_run)
+			result = CopyService.copy_missing_files(extract_dir, new_dir, dry_run, copy_mode, copy_workers=copy_workers)
 
 			# Clean up the temporary directory if it was created by us
 			if "google_takeout_" in extract_dir:
@@ -113,7 +264,102 @@ class CopyService:
 			return 0, 0
 
 	@staticmethod
-	def copy_missing_files(old_dir: str, new_dir: str, dry_run: bool = False) -> Tuple[int, int]:
+	def _scan_media(directory: str) -> List[Tuple[str, str, os.stat_result]]:
+		"""
+		List the media files of a directory with their stat results
+
+		The directory tree is listed, and the files are stat'ed, by several threads.
+		The stat results validate hash cache entries, so unchanged files are never
+		read again.
+
+		Args:
+			directory: Directory to scan
+
+		Returns:
+			List of (file name, file path, stat result) tuples
+		"""
+		files = []
+		for entry in scan_media_entries(directory, stat=True):
+			try:
+				files.append((entry.name, entry.path, entry.stat()))
+			except OSError as e:
+				logger.warning(f"Could not stat {entry.path}: {str(e)}")
+		return files
+
+	@staticmethod
+	def _fill_hash_cache(files: List[Tuple[str, os.stat_result]], hash_cache: Dict[str, tuple], directory: str,
+						key_prefix: str, executor: Optional[ProcessPoolExecutor] = None) -> None:
+		"""
+		Compute the hashes of the files that are not in the cache yet or changed since
+
+		Perceptual hashing is CPU bound, so the hashes are computed in worker processes.
+		New hashes are appended to the hash cache journal every 500 files and at the end,
+		in a background thread; the journal is complete when this returns.
+
+		Args:
+			files: (path, stat result) of the files that need a hash
+			hash_cache: Shared hash cache to fill, mapping prefixed file paths to (size, mtime_ns, hash)
+			directory: Directory of the files, for progress messages
+			key_prefix: Key prefix of these files in the hash cache ('old:' or 'new:')
+			executor: Process pool to hash in, shared by both directories (None hashes in this process)
+		"""
+		misses = [(file_path, st) for file_path, st in files if get_cached_hash(hash_cache, key_prefix + file_path, st) is None]
+		if not misses:
+			return
+
+		logger.info(f"Computing hashes for {len(misses)} files in {directory} ({len(files) - len(misses)} cached)...")
+		if executor is None or len(misses) < PARALLEL_HASH_THRESHOLD:
+			results = map(_hash_worker, misses)
+		else:
+			results = executor.map(_hash_worker, misses, chunksize=32)
+		stats = dict(misses)
+		unsaved_hashes = {}
+		# The journal is written (and fsynced) by a background thread, so the loop does not
+		# wait for the disk; a single writer keeps the batches in order
+		with ThreadPoolExecutor(max_workers=1) as journal_writer:
+			for i, (file_path, file_hash) in enumerate(results, 1):
+				if file_hash:
+					key = key_prefix + file_path
+					set_cached_hash(hash_cache, key, file_hash, stats[file_path])
+					unsaved_hashes[key] = hash_cache[key]
+
+				# Log progress and journal the new hashes every 500 files
+				if i % 500 == 0:
+					logger.info(f"Computed hashes for {i}/{len(misses)} files in {directory}")
+					journal_writer.submit(append_image_hashes, unsaved_hashes)
+					unsaved_hashes = {}
+			journal_writer.submit(append_image_hashes, unsaved_hashes)
+
+	@staticmethod
+	def _cache_copied_hashes(copied: List[Tuple[str, str]], source_hashes: Dict[str, str], hash_cache: Dict[str, tuple]) -> None:
+		"""
+		Record the hashes of freshly copied files, so the next run does not hash them again
+
+		A copy has the same content as its source, so it gets the source's hash,
+		stamped with the stat of the copy.
+
+		Args:
+			copied: (source, target) paths of the copied files
+			source_hashes: Dictionary mapping source paths to their hashes
+			hash_cache: Shared hash cache, mapping prefixed file paths to (size, mtime_ns, hash)
+		"""
+		new_hashes = {}
+		for old_file, new_file in copied:
+			file_hash = source_hashes.get(old_file)
+			if not file_hash:
+				continue
+			try:
+				st = os.stat(new_file)
+			except OSError:
+				continue
+			key = 'new:' + new_file
+			set_cached_hash(hash_cache, key, file_hash, st)
+			new_hashes[key] = hash_cache[key]
+		append_image_hashes(new_hashes)
+
+	@staticmethod
+	def copy_missing_files(old_dir: str, new_dir: str, dry_run: bool = False, copy_mode: str = 'copy',
+						similarity_threshold: float = 1.0, copy_workers: int = COPY_WORKERS) -> Tuple[int, int]:
 		"""
 		Copy media files from old directory to new directory if they don't exist in new
 		based on hash comparison to avoid duplicates
@@ -122,6 +368,13 @@ class CopyService:
 			old_dir: Source directory or zip file with original files
 			new_dir: Target directory where files should be copied
 			dry_run: If True, only log what would be done without actually copying
+			copy_mode: 'copy' (default), 'hardlink' to link files instead of copying them when
+				both directories are on the same filesystem, or 'reflink' to clone them on
+				copy-on-write filesystems; both fall back to a copy when not possible
+			similarity_threshold: Threshold for considering images as the same (0.0 to 1.0); below
+				1.0, files whose perceptual hash is this close to a file in new_dir are not copied
+			copy_workers: Number of concurrent copies; parallel copies help SSDs and network
+				storage, while 1 or 2 keep a spinning disk reading sequentially
 
 		Returns:
 			Tuple of (total files found, files copied)
@@ -129,7 +382,7 @@ class CopyService:
 		# Check if old_dir is a zip file
 		if CopyService.is_zip_file(old_dir):
 			logger.info(f"Source is a zip file: {old_dir}")
-			return CopyService.process_zip_file(old_dir, new_dir, dry_run)
+			return CopyService.process_zip_file(old_dir, new_dir, dry_run, copy_mode, copy_workers)
 
 		if not os.path.exists(old_dir):
 			logger.error(f"Source directory not found: {old_dir}")
@@ -139,95 +392,256 @@ class CopyService:
 			logger.error(f"Target directory not found: {new_dir}")
 			return 0, 0
 
-		# Get all media files in old directory
-		old_files = []
-		for root, _, files in os.walk(old_dir):
-			for file in files:
-				file_path = os.path.join(root, file)
-				if is_media_file(file_path) and not file.endswith('.json'):
-					old_files.append(file_path)
-
-		logger.info(f"Found {len(old_files)} media files in {old_dir}")
-
-		# Get all media files in new directory
-		new_files = []
-		for root, _, files in os.walk(new_dir):
-			for file in files:
-				file_path = os.path.join(root, file)
-				if is_media_file(file_path):
-					new_files.append(file_path)
-
-		logger.info(f"Found {len(new_files)} media files in {new_dir}")
-
-		# Load hash caches for old and new directories
-		logger.info("Loading hash caches...")
-		# Load combined image_hashes.csv and split into old/new
-		hash_cache = load_image_hashes('data/image_hashes.csv')
-		old_hash_cache = {k[4:]: v for k, v in hash_cache.items() if k.startswith('old:')}
-		new_hash_cache = {k[4:]: v for k, v in hash_cache.items() if k.startswith('new:')}
-		logger.info(f"Loaded {len(old_hash_cache)} old and {len(new_hash_cache)} new hashes from image_hashes.csv")
-
-		# Compute hashes for files in new directory
-		logger.info("Computing hashes for files in new directory...")
-		new_file_hashes = {}
-		for i, file_path in enumerate(new_files):
-			# Use the new directory hash cache
-			file_hash = compute_hash_for_file(file_path, new_hash_cache)
-			if file_hash:
-				new_file_hashes[file_hash] = file_path
-
-			# Log progress every 500 files
-			if (i + 1) % 500 == 0:
-				logger.info(f"Computed hashes for {i + 1}/{len(new_files)} files in new directory")
-				# Save new hash cache periodically
-				save_image_hashes({**{f'old:{k}': v for k, v in old_hash_cache.items()}, **{f'new:{k}': v for k, v in new_hash_cache.items()}}, 'data/image_hashes.csv')
+		if copy_mode == 'hardlink' and os.stat(old_dir).st_dev != os.stat(new_dir).st_dev:
+			logger.warning(f"{old_dir} and {new_dir} are on different filesystems, copying instead of hardlinking")
+			copy_mode = 'copy'
+
+		# Names already taken in the target directory; copying would overwrite them
+		existing_names = set(os.listdir(new_dir))
+
+		# Scan both directories at the same time; the threads mostly wait on
+		# getdents/stat, so the walks overlap when the directories are on different disks
+		with ThreadPoolExecutor(max_workers=2) as executor:
+			old_future = executor.submit(CopyService._scan_media, old_dir)
+			new_future = executor.submit(CopyService._scan_media, new_dir)
+			old_entries, new_entries = old_future.result(), new_future.result()
+
+		# Media files in old directory whose name is not taken yet; the names from the
+		# scan are kept, so no path has to be split again
+		old_candidates = [(name, path, st) for name, path, st in old_entries if name not in existing_names]
+		new_stats = [(path, st) for _, path, st in new_entries]
+		skipped_count = len(old_entries) - len(old_candidates)
+
+		# Content hashes can only be equal for files of the same size, so such a file whose
+		# size does not occur in new_dir is missing without being hashed; perceptual hashes
+		# of images do not depend on the file size and are always needed
+		new_sizes = {st.st_size for _, st in new_stats}
+		old_stats = [
+			(path, st) for _, path, st in old_candidates
+			if st.st_size in new_sizes or not _has_content_hash(path)
+		]
+		if len(old_stats) < len(old_candidates):
+			logger.info(f"{len(old_candidates) - len(old_stats)} files in {old_dir} have no file of the same size in {new_dir}, not hashing them")
+
+		logger.info(f"Found {len(old_candidates)} media files in {old_dir} ({skipped_count} skipped, name already in {new_dir})")
+		logger.info(f"Found {len(new_stats)} media files in {new_dir}")
+
+		# One hash cache for both directories; their files are told apart by the 'old:' and 'new:'
+		# key prefixes, so the cache is used in place instead of being split and merged again
+		logger.info("Loading hash cache...")
+		hash_cache = load_image_hashes()
+
+		# Compute the missing hashes of both directories in one pool of worker processes;
+		# workers are only started once a directory has enough files to hash
+		with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+			CopyService._fill_hash_cache(new_stats, hash_cache, new_dir, 'new:', executor)
+			CopyService._fill_hash_cache(old_stats, hash_cache, old_dir, 'old:', executor)
+		# New hashes are already in the journal; the cache is only rewritten once the journal is large
+		compact_image_hashes()
+
+		new_file_hashes = HashIndex(
+			{file_path: get_cached_hash(hash_cache, 'new:' + file_path, st) for file_path, st in new_stats},
+			max_distance_for(similarity_threshold)
+		)
 
 		logger.info(f"Computed hashes for {len(new_file_hashes)} files in new directory")
-		# Save combined hash cache
-		save_image_hashes({**{f'old:{k}': v for k, v in old_hash_cache.items()}, **{f'new:{k}': v for k, v in new_hash_cache.items()}}, 'data/image_hashes.csv')
 
 		# Find files that exist in old but not in new based on hash
 		logger.info("Finding missing files based on hash comparison...")
 		missing_files = []
-		for i, old_file in enumerate(old_files):
-			# Use the old directory hash cache
-			file_hash = compute_hash_for_file(old_file, old_hash_cache)
+		missing_hashes = {}
+		old_hashes = [get_cached_hash(hash_cache, 'old:' + old_file, st) for _, old_file, st in old_candidates]
+		# Exact matches are found for all files at once; only the rest need a similarity search
+		present = new_file_hashes.contains_many(old_hashes)
+		for (name, old_file, _), file_hash, exact_match in zip(old_candidates, old_hashes, present):
+			# If we couldn't compute a hash or no file in new directory has the same (or a similar) image
+			if not file_hash or (not exact_match and new_file_hashes.find(file_hash) is None):
+				# Claim the target name so that a file with the same name from
+				# another album does not overwrite this one
+				if name in existing_names:
+					skipped_count += 1
+				else:
+					existing_names.add(name)
+					missing_files.append(old_file)
+					if file_hash:
+						missing_hashes[old_file] = file_hash
 
-			# If we couldn't compute a hash or the hash doesn't exist in new directory
-			if not file_hash or file_hash not in new_file_hashes:
-				missing_files.append(old_file)
+		logger.info(f"Found {len(missing_files)} files in {old_dir} that don't exist in {new_dir} based on hash comparison")
+		if skipped_count:
+			logger.info(f"Skipped {skipped_count} files whose name is already taken in {new_dir}")
 
-			# Log progress every 500 files
-			if (i + 1) % 500 == 0:
-				logger.info(f"Processed {i + 1}/{len(old_files)} files from old directory")
-				# Save combined hash cache periodically
-				save_image_hashes({**{f'old:{k}': v for k, v in old_hash_cache.items()}, **{f'new:{k}': v for k, v in new_hash_cache.items()}}, 'data/image_hashes.csv')
+		# Copy missing files
+		if dry_run:
+			target_prefix = os.path.join(new_dir, '')
+			for old_file in missing_files:
+				new_file = target_prefix + os.path.basename(old_file)
+				logger.info(f"[DRY RUN] Would copy {old_file} to {new_file}")
+			copied_count = len(missing_files)
+		else:
+			copied = []
+			copied_count = CopyService.copy_files(missing_files, new_dir, max_workers=copy_workers,
+												copy_mode=copy_mode, copied=copied)
+			CopyService._cache_copied_hashes(copied, missing_hashes, hash_cache)
 
-		# Save combined hash cache
-		save_image_hashes({**{f'old:{k}': v for k, v in old_hash_cache.items()}, **{f'new:{k}': v for k, v in new_hash_cache.items()}}, 'data/image_hashes.csv')
+		logger.info(f"Copied {copied_count} files from {old_dir} to {new_dir}")
+		return len(missing_files), copied_count
 
-		logger.info(f"Found {len(missing_files)} files in {old_dir} that don't exist in {new_dir} based on hash comparison")
+	@staticmethod
+	def copy_file(source: str, target: str, copy_mode: str = 'copy') -> None:
+		"""
+		Put a file into the target location according to the copy mode
 
-		# Copy missing files
-		copied_count = 0
-		for old_file in missing_files:
-			filename = os.path.basename(old_file)
-			new_file = os.path.join(new_dir, filename)
+		A hardlink or reflink costs no data copy; when the filesystem does not
+		support it the file is copied instead. A hardlinked file shares its inode
+		with the original, so metadata writes replace it by a rename rather than
+		writing in place (see exiftool_service._write_args). An existing target is never
+		overwritten: the exclusive create doubles as the existence check, so no
+		separate stat is needed (and names that only differ in case collide on
+		case-insensitive filesystems).
 
-			if dry_run:
-				logger.info(f"[DRY RUN] Would copy {old_file} to {new_file}")
-				copied_count += 1
+		Args:
+			source: Path to the source file
+			target: Path to the target file
+			copy_mode: 'copy', 'hardlink' or 'reflink'
+
+		Raises:
+			FileExistsError: If the target already exists
+		"""
+		if copy_mode == 'hardlink':
+			try:
+				os.link(source, target)
+				return
+			except FileExistsError:
+				raise
+			except OSError as e:
+				logger.debug(f"Could not hardlink {source}, copying instead: {str(e)}")
+		elif copy_mode == 'reflink' and HAS_FCNTL:
+			try:
+				with open(source, 'rb') as src, open(target, 'xb') as dst:
+					try:
+						fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+					except OSError:
+						# Drop the empty file created here so the copy below can create it again
+						os.remove(target)
+						raise
+				shutil.copystat(source, target)
+				return
+			except FileExistsError:
+				raise
+			except OSError as e:
+				logger.debug(f"Could not reflink {source}, copying instead: {str(e)}")
+		CopyService._fast_copy(source, target)
+
+	@staticmethod
+	def _fast_copy(source: str, target: str) -> None:
+		"""
+		Copy a file and its timestamps with clonefile or os.copy_file_range
+
+		On macOS the file is cloned first, which on APFS only shares the extents
+		and keeps the timestamps. Otherwise the data is copied inside the kernel
+		without passing through user-space buffers; on btrfs/XFS/NFS the kernel
+		may share or offload the extents. Where copy_file_range is not available
+		or not supported between the two files, shutil.copy2 is used (which
+		itself uses sendfile/fcopyfile).
+
+		Args:
+			source: Path to the source file
+			target: Path to the target file
+
+		Raises:
+			FileExistsError: If the target already exists
+		"""
+		if HAS_CLONEFILE:
+			# clonefile never replaces the target; it fails with EEXIST instead
+			if _clonefile(os.fsencode(source), os.fsencode(target), 0) == 0:
+				return
+			err = ctypes.get_errno()
+			if err == errno.EEXIST:
+				raise FileExistsError(err, os.strerror(err), target)
+			logger.debug(f"Could not clone {source}, copying instead: {os.strerror(err)}")
+
+		# The exclusive create is the existence check; everything after it may overwrite
+		dst_fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+		try:
+			copied = False
+			try:
+				if HAS_COPY_FILE_RANGE:
+					with open(source, 'rb') as src:
+						remaining = os.fstat(src.fileno()).st_size
+						while remaining > 0:
+							count = os.copy_file_range(src.fileno(), dst_fd, remaining)
+							if count == 0:
+								break
+							remaining -= count
+					copied = remaining == 0
+			except OSError as e:
+				logger.debug(f"copy_file_range failed for {source}, copying with shutil: {str(e)}")
+			finally:
+				os.close(dst_fd)
+
+			if copied:
+				shutil.copystat(source, target)
 			else:
-				try:
-					shutil.copy2(old_file, new_file)
-					logger.info(f"Copied {old_file} to {new_file}")
-					copied_count += 1
+				shutil.copy2(source, target)
+		except BaseException:
+			# Do not leave a partial file behind that a later run would take for a copy
+			os.remove(target)
+			raise
 
-					# Log progress every 100 files
-					if copied_count % 100 == 0:
-						logger.info(f"Copied {copied_count} of {len(missing_files)} files")
-				except Exception as e:
-					logger.error(f"Error copying {old_file} to {new_file}: {str(e)}")
+	@staticmethod
+	def copy_files(files: List[str], new_dir: str, max_workers: int = COPY_WORKERS, copy_mode: str = 'copy',
+				copied: Optional[List[Tuple[str, str]]] = None) -> int:
+		"""
+		Copy files into a directory with a pool of copy threads
 
-		logger.info(f"Copied {copied_count} files from {old_dir} to {new_dir}")
-		return len(missing_files), copied_count
+		copy_file_range and shutil.copy2 release the GIL during their syscalls, so
+		the threads keep several copies in flight against the storage device.
+		Copies are submitted in a bounded window of COPY_QUEUE_DEPTH, like a
+		submission queue, so large imports do not create one future per file
+		up front.
+
+		Args:
+			files: Paths of the files to copy
+			new_dir: Target directory where files should be copied
+			max_workers: Number of concurrent copies
+			copy_mode: How files are put into new_dir (see copy_file)
+			copied: Optional list to append the (source, target) paths of copied files to
+
+		Returns:
+			Number of files copied
+		"""
+		copied_count = 0
+		queue_depth = max(COPY_QUEUE_DEPTH, max_workers)
+		pending_files = iter(files)
+		# Joined once; per file only the name is appended
+		target_prefix = os.path.join(new_dir, '')
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			in_flight = {}
+
+			def submit(count: int) -> None:
+				for old_file in itertools.islice(pending_files, count):
+					new_file = target_prefix + os.path.basename(old_file)
+					in_flight[executor.submit(CopyService.copy_file, old_file, new_file, copy_mode)] = (old_file, new_file)
+
+			submit(queue_depth)
+			# Results are collected in this thread, so the counter needs no lock
+			while in_flight:
+				done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+				for future in done:
+					old_file, new_file = in_flight.pop(future)
+					try:
+						future.result()
+						logger.debug("Copied %s to %s", old_file, new_file)
+						copied_count += 1
+						if copied is not None:
+							copied.append((old_file, new_file))
+
+						# Log progress every 100 files
+						if copied_count % 100 == 0:
+							logger.info("Copied %d of %d files", copied_count, len(files))
+					except FileExistsError:
+						logger.warning("Skipped %s, %s already exists", old_file, new_file)
+					except Exception as e:
+						logger.error("Error copying %s to %s: %s", old_file, new_file, e)
+				submit(len(done))
+		return copied_count
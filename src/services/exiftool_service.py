@@ -3,40 +3,664 @@ Service for interacting with exiftool
 """
 import subprocess
 import logging
+import json
 import os
+import re
+import time
+import queue
+import select
 import shutil
+import tempfile
 import mimetypes
-from typing import List, Optional, Tuple
+import threading
+import functools
+import atexit
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# Try to use orjson to parse exiftool's JSON output; it takes bytes directly
+HAS_ORJSON = False
+try:
+	import orjson
+	HAS_ORJSON = True
+except ImportError:
+	pass
 
 logger = logging.getLogger(__name__)
 
+# Seconds one exiftool command in a session may take before exiftool is restarted
+SESSION_TIMEOUT = 30
+# Extra seconds per file for commands that read or write a batch of files
+BATCH_TIMEOUT_PER_FILE = 2
+
+# MIME types reported by the file command -> real extension
+_MIME_EXTENSIONS = {
+	'image/jpeg': 'jpg',
+	'image/jpg': 'jpg',
+	'image/png': 'png',
+	'image/heic': 'heic',
+	'image/heif': 'heif',
+	'video/mp4': 'mp4',
+	'video/quicktime': 'mov',
+	'video/mpeg': 'mpg',
+	'video/x-msvideo': 'avi',
+	'image/gif': 'gif',
+	'image/webp': 'webp',
+	'image/tiff': 'tiff'
+}
+# MIME subtypes that are used as the extension when the type is not in _MIME_EXTENSIONS
+_MIME_SUBTYPE_EXTENSIONS = frozenset(('jpeg', 'jpg', 'png', 'gif', 'webp', 'heic', 'heif', 'mp4', 'mov', 'mpeg', 'avi'))
+
+# (real extension, wrong extension) pairs that fix_file_extension corrects
+_FIX_EXTENSIONS = frozenset({
+	# Photos
+	('jpg', 'heic'), ('jpg', 'png'), ('jpg', 'jfif'), ('jpg', 'webp'),  # JPEG files with incorrect extensions
+	('png', 'heic'),  # PNG files with incorrect extensions
+	('heic', 'jpg'), ('heic', 'jpeg'), ('heic', 'png'),  # HEIC files with incorrect extensions
+	# Videos
+	('mp4', 'mov'), ('mp4', 'avi'), ('mp4', '3gp'),  # MP4 files with incorrect extensions
+	('mov', 'mp4'), ('mov', 'avi'), ('mov', '3gp'),  # MOV files with incorrect extensions
+})
+
+# Number of files passed to one run of the file command
+FILE_COMMAND_BATCH_SIZE = 1000
+
+# Arguments kept when only the dates of a file are written
+_DATE_ARG_PREFIXES = ('-DateTime', '-Create', '-Modify')
+
+# Number of files of one type in a row whose full write failed but a date-only retry
+# worked, after which apply_metadata starts with that retry for the type
+WRITE_FALLBACK_THRESHOLD = 3
+# (real_extension, mime_type) -> (retry that worked: 'dates_only' or 'force_jpeg', files in a row)
+_write_fallbacks: Dict[Tuple[str, str], Tuple[str, int]] = {}
+
+# (path, mtime_ns, size) -> (real_extension, mime_type) of files probed by detect_file_type;
+# a file that is renamed or written gets a new key, so entries never go stale
+_file_type_cache: Dict[Tuple[str, int, int], Tuple[str, str]] = {}
+# Maximum number of entries in _file_type_cache; the oldest are dropped first
+FILE_TYPE_CACHE_SIZE = 4096
+
+
+def _remember_file_type(cache_key: Tuple[str, int, int], file_type: Tuple[str, str]) -> Tuple[str, str]:
+	"""Store a detected file type in _file_type_cache and return it"""
+	if len(_file_type_cache) >= FILE_TYPE_CACHE_SIZE:
+		# Dicts keep insertion order, so the first key is the oldest entry
+		del _file_type_cache[next(iter(_file_type_cache))]
+	_file_type_cache[cache_key] = file_type
+	return file_type
+
+# Leading bytes of the formats that can be told apart without exiftool, with the
+# extension exiftool -FileType reports for them. TIFF is left to exiftool, since
+# most RAW formats (CR2, NEF, DNG, ...) are TIFF containers too.
+_MAGIC_TYPES = (
+	(b'\xff\xd8\xff', 'jpg'),
+	(b'\x89PNG\r\n\x1a\n', 'png'),
+	(b'GIF87a', 'gif'),
+	(b'GIF89a', 'gif'),
+	(b'\x00\x00\x01\xba', 'mpeg'),
+	(b'\x00\x00\x01\xb3', 'mpeg'),
+)
+# RIFF containers, by the form type at offset 8
+_RIFF_TYPES = {b'WEBP': 'webp', b'AVI ': 'avi'}
+# ISO base media files, by the major brand of the ftyp box at offset 8
+_FTYP_BRANDS = {
+	b'heic': 'heic', b'heix': 'heic', b'heim': 'heic', b'heis': 'heic', b'hevc': 'heic', b'hevx': 'heic',
+	b'qt  ': 'mov',
+	b'isom': 'mp4', b'iso2': 'mp4', b'mp41': 'mp4', b'mp42': 'mp4', b'avc1': 'mp4', b'mmp4': 'mp4',
+	b'3gp4': '3gp', b'3gp5': '3gp', b'3gp6': '3gp',
+	b'M4V ': 'm4v', b'M4VH': 'm4v', b'M4VP': 'm4v',
+}
+# Generic HEIF brands; the file is HEIC if a HEVC brand is among the compatible brands
+_HEIF_BRANDS = (b'mif1', b'msf1')
+_HEVC_BRANDS = (b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx')
+# QuickTime files written without an ftyp box start with one of these atoms
+_QUICKTIME_ATOMS = (b'moov', b'mdat', b'wide', b'free', b'skip')
+
+
+def sniff_file_type(file_path: str) -> str:
+	"""
+	Identify a file from its first bytes
+
+	Args:
+		file_path: Path to the file
+
+	Returns:
+		Extension as reported by exiftool -FileType, or '' if the format is not recognized
+	"""
+	try:
+		with open(file_path, 'rb', buffering=0) as f:
+			header = f.read(64)
+	except OSError:
+		return ''
+	for magic, ext in _MAGIC_TYPES:
+		if header.startswith(magic):
+			return ext
+	if header.startswith(b'RIFF'):
+		return _RIFF_TYPES.get(header[8:12], '')
+	if header[4:8] == b'ftyp':
+		brand = header[8:12]
+		if brand in _HEIF_BRANDS:
+			# Compatible brands follow the major brand and minor version, up to the end of the box
+			box_end = min(int.from_bytes(header[:4], 'big'), len(header))
+			compatible = [header[i:i + 4] for i in range(16, box_end - 3, 4)]
+			return 'heic' if any(b in _HEVC_BRANDS for b in compatible) else 'heif'
+		return _FTYP_BRANDS.get(brand, '')
+	if header[4:8] in _QUICKTIME_ATOMS:
+		return 'mov'
+	return ''
+
+
+def _run_exiftool(args: List[str], session: Optional['ExifToolSession'] = None, timeout: int = 15) -> subprocess.CompletedProcess:
+	"""
+	Run an exiftool command in a running session, or else in a new exiftool process
+
+	Args:
+		args: exiftool arguments (without the 'exiftool' executable)
+		session: Optional ExifToolSession to run the command in
+		timeout: Timeout in seconds when a new process is started
+
+	Returns:
+		CompletedProcess with text output
+	"""
+	if session is not None and session.running:
+		return session.execute(args, timeout)
+	return subprocess.run(['exiftool'] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+
+
+def _batch_timeout(file_count: int) -> int:
+	"""Timeout in seconds for an exiftool command over file_count files"""
+	return SESSION_TIMEOUT + BATCH_TIMEOUT_PER_FILE * file_count
+
+
+def _pump_lines(stream, lines: queue.Queue) -> None:
+	"""Move the lines of a pipe to a queue until EOF, which is queued as None"""
+	try:
+		for line in iter(stream.readline, ''):
+			lines.put(line)
+	except (OSError, ValueError):
+		pass
+	finally:
+		lines.put(None)
+
+
+def _wait_for_exit(process: subprocess.Popen, timeout: float) -> None:
+	"""
+	Wait for a process to exit
+
+	Blocks on a pidfd (Linux 5.3+) or a kqueue process event (macOS/BSD) until
+	the process exits, instead of Popen.wait's loop of waitpid and sleeps.
+
+	Args:
+		process: Process to wait for
+		timeout: Timeout in seconds
+
+	Raises:
+		subprocess.TimeoutExpired: If the process is still running after timeout seconds
+	"""
+	try:
+		if hasattr(os, 'pidfd_open'):
+			pidfd = os.pidfd_open(process.pid)
+			try:
+				exited = bool(select.select([pidfd], [], [], timeout)[0])
+			finally:
+				os.close(pidfd)
+		elif hasattr(select, 'kqueue'):
+			kq = select.kqueue()
+			try:
+				event = select.kevent(process.pid, filter=select.KQ_FILTER_PROC,
+									flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT, fflags=select.KQ_NOTE_EXIT)
+				exited = bool(kq.control([event], 1, timeout))
+			finally:
+				kq.close()
+		else:
+			process.wait(timeout=timeout)
+			return
+	except OSError:
+		# Already reaped, or no pidfd support in the kernel
+		process.wait(timeout=timeout)
+		return
+	if not exited:
+		raise subprocess.TimeoutExpired(process.args, timeout)
+	process.wait()
+
+
+# Process-wide exiftool session of ExifToolService.shared_session, with the pid that started it
+_shared_session = None
+_shared_session_pid = None
+_shared_session_failed = False
+_shared_session_lock = threading.Lock()
+
+
+def _parse_json(output):
+	"""Parse exiftool -j output (bytes or str) with orjson if available"""
+	return orjson.loads(output) if HAS_ORJSON else json.loads(output)
+
+
+def _decode_output(output) -> str:
+	"""Decode exiftool output read without text=True"""
+	return output.decode('utf-8', errors='replace') if isinstance(output, bytes) else output
+
+
+def _record_write_fallback(file_type: Tuple[str, str], fallback: Optional[str]) -> None:
+	"""
+	Remember which write worked for a file of a type
+
+	Args:
+		file_type: (real_extension, mime_type) of the file
+		fallback: Retry that worked ('dates_only' or 'force_jpeg'), or None if the full write did
+	"""
+	if fallback is None:
+		_write_fallbacks.pop(file_type, None)
+		return
+	previous, count = _write_fallbacks.get(file_type, (fallback, 0))
+	_write_fallbacks[file_type] = (fallback, count + 1 if previous == fallback else 1)
+
+
+def _known_write_fallback(file_type: Tuple[str, str]) -> Optional[str]:
+	"""Retry to start with for a file type, once it worked for WRITE_FALLBACK_THRESHOLD files in a row"""
+	fallback, count = _write_fallbacks.get(file_type, (None, 0))
+	return fallback if count >= WRITE_FALLBACK_THRESHOLD else None
+
+
+def _extension_for_mime(mime_type: str) -> str:
+	"""Real extension for a MIME type reported by the file command, or '' if unknown"""
+	real_ext = _MIME_EXTENSIONS.get(mime_type, '')
+	# If not found in the map, try to extract from MIME type
+	if not real_ext and '/' in mime_type:
+		potential_ext = mime_type.split('/')[-1]
+		if potential_ext in _MIME_SUBTYPE_EXTENSIONS:
+			real_ext = 'jpg' if potential_ext == 'jpeg' else potential_ext
+	return real_ext
+
+
+def _date_only_args(args: List[str]) -> List[str]:
+	"""Keep only the date arguments of an exiftool command"""
+	return [arg for arg in args if arg.startswith(_DATE_ARG_PREFIXES)]
+
+
+def _write_args(args: List[str], file_path: str) -> List[str]:
+	"""
+	Complete a write command with its overwrite mode and the file
+
+	-overwrite_original replaces the file by a rename, while -overwrite_original_in_place
+	writes through the existing inode. A file hardlinked by --copy-mode hardlink shares
+	that inode with the original in old_dir, so it is always replaced by a rename, which
+	leaves the original alone.
+	"""
+	args = list(args)
+	if '-overwrite_original_in_place' in args:
+		try:
+			linked = os.stat(file_path).st_nlink > 1
+		except OSError:
+			linked = False
+		if not linked:
+			return args + [file_path]
+		args.remove('-overwrite_original_in_place')
+	return args + ['-overwrite_original', file_path]
+
+
+def _jpeg_args(args: List[str]) -> List[str]:
+	"""JPEG files (including those that were renamed) take the standard arguments"""
+	return args + ['-ignoreMinorErrors']
+
+
+def _heic_args(args: List[str]) -> List[str]:
+	"""HEIC files take a safer set of arguments without GPS coordinates, which often cause problems"""
+	return [arg for arg in args if not arg.startswith('-GPS')] + ['-ignoreMinorErrors']
+
+
+def _png_gif_args(args: List[str]) -> List[str]:
+	"""PNG and GIF files keep only the basic date metadata"""
+	return _date_only_args(args) + ['-ignoreMinorErrors', '-overwrite_original_in_place']
+
+
+def _mpeg_avi_args(args: List[str]) -> List[str]:
+	"""MPG and AVI files are particularly problematic: dates only, and minor errors are ignored"""
+	return _date_only_args(args) + ['-ignoreMinorErrors', '-m', '-overwrite_original_in_place']
+
+
+def _aae_args(args: List[str]) -> List[str]:
+	"""AAE files (Apple edit information) only take the basic date metadata"""
+	return _date_only_args(args) + ['-ignoreMinorErrors']
+
+
+def _video_args(args: List[str]) -> List[str]:
+	"""Other video files take special flags"""
+	return args + ['-ignoreMinorErrors', '-use MWG']
+
+
+# Adjustment of the metadata arguments by real file extension
+_EXT_ARG_HANDLERS = {
+	'jpg': _jpeg_args,
+	'jpeg': _jpeg_args,
+	'heic': _heic_args,
+	'heif': _heic_args,
+	'png': _png_gif_args,
+	'gif': _png_gif_args,
+	'mpg': _mpeg_avi_args,
+	'mpeg': _mpeg_avi_args,
+	'avi': _mpeg_avi_args,
+	'aae': _aae_args,
+	'mp4': _video_args,
+	'mov': _video_args,
+	'wmv': _video_args,
+}
+# Fallbacks by a part of the MIME type, in order of precedence
+_MIME_ARG_HANDLERS = (
+	('jpeg', _jpeg_args),
+	('heic', _heic_args),
+	('heif', _heic_args),
+	('png', _png_gif_args),
+	('gif', _png_gif_args),
+	('mpeg', _mpeg_avi_args),
+	('avi', _mpeg_avi_args),
+	('video', _video_args),
+	('quicktime', _video_args),
+)
+
+
+def _metadata_args_handler(real_ext: str, mime_type: str, file_ext: str) -> Optional[Callable[[List[str]], List[str]]]:
+	"""
+	Pick the adjustment of the metadata arguments for a file type
+
+	Args:
+		real_ext: Real extension of the file
+		mime_type: MIME type of the file
+		file_ext: Extension in the file name
+
+	Returns:
+		Function that adjusts the arguments, or None if they are used as they are
+	"""
+	# A .jpg file is written as JPEG even if it could not be renamed to its real type
+	if file_ext == 'jpg':
+		return _jpeg_args
+	handler = _EXT_ARG_HANDLERS.get(real_ext.lower())
+	if handler is None:
+		handler = next((h for part, h in _MIME_ARG_HANDLERS if part in mime_type), None)
+	if handler is None and file_ext == 'aae':
+		handler = _aae_args
+	return handler
+
+
+def _file_extension(file_path: str) -> str:
+	"""Lowercase extension of a file without the dot; only the extension is lowercased, not the whole path"""
+	return os.path.splitext(file_path)[1][1:].lower()
+
+
+class ExifToolSession:
+	"""
+	Persistent exiftool process driven through the -stay_open protocol
+
+	Each command is written to exiftool's stdin as an argument file followed
+	by -execute{N}; the output is read back up to the {readyN} marker, so the
+	Perl interpreter is started once instead of once per file. Options shared
+	by every command are given once with -common_args.
+	"""
+
+	# Options appended by exiftool to every command of the session; the overwrite
+	# mode is given by each write command, since reads do not take one
+	COMMON_ARGS = ['-charset', 'filename=utf8']
+
+	def __init__(self, common_args: Optional[List[str]] = None):
+		"""
+		Args:
+			common_args: Options for every command (default: COMMON_ARGS)
+		"""
+		self.common_args = list(self.COMMON_ARGS if common_args is None else common_args)
+		self._process = None
+		self._sequence = 0
+		self._lock = threading.Lock()
+		self._stdout_lines = None
+		self._stderr_lines = None
+
+	def start(self) -> None:
+		"""
+		Launch the exiftool process
+
+		Raises:
+			OSError: If exiftool cannot be started
+		"""
+		self._process = subprocess.Popen(
+			# -common_args only works on the command line, not in the argument file
+			['exiftool', '-stay_open', 'True', '-@', '-', '-common_args', *self.common_args],
+			stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+			text=True, encoding='utf-8', errors='replace'
+		)
+		# Both pipes are drained by threads, so a command with a lot of stderr cannot fill the
+		# pipe and block exiftool, and execute can wait for the output with a deadline
+		self._stdout_lines = queue.Queue()
+		self._stderr_lines = queue.Queue()
+		for stream, lines in ((self._process.stdout, self._stdout_lines), (self._process.stderr, self._stderr_lines)):
+			threading.Thread(target=_pump_lines, args=(stream, lines), daemon=True).start()
+
+	def _restart(self) -> None:
+		"""Kill a hung exiftool process and start a new one"""
+		process = self._process
+		try:
+			process.kill()
+			process.wait(timeout=10)
+		except Exception as e:
+			logger.warning(f"Could not stop exiftool process {process.pid}: {str(e)}")
+		for stream in (process.stdin, process.stdout, process.stderr):
+			try:
+				stream.close()
+			except Exception:
+				pass
+		self._process = None
+		self.start()
+
+	@staticmethod
+	def _read_until(lines: queue.Queue, is_last: Callable[[str], bool], deadline: float) -> Tuple[List[str], Optional[str]]:
+		"""
+		Read lines of a pipe up to the line that ends a command
+
+		Args:
+			lines: Queue filled by _pump_lines
+			is_last: Check for the line that ends the command
+			deadline: time.monotonic() value after which to give up
+
+		Returns:
+			Tuple of (lines before the last one, last line or None at EOF)
+
+		Raises:
+			queue.Empty: If the deadline passes first
+		"""
+		read = []
+		while True:
+			line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+			if line is None or is_last(line):
+				return read, line
+			read.append(line)
+
+	@property
+	def running(self) -> bool:
+		"""Whether the exiftool process is alive"""
+		return self._process is not None and self._process.poll() is None
+
+	def execute(self, args: List[str], timeout: float = SESSION_TIMEOUT) -> subprocess.CompletedProcess:
+		"""
+		Run one exiftool command in the persistent process
+
+		Args:
+			args: exiftool arguments (without the 'exiftool' executable)
+			timeout: Seconds to wait for the command to finish
+
+		Returns:
+			CompletedProcess with the command's return code, stdout and stderr; if
+			exiftool exits during the command, the return code is nonzero and the
+			session is restarted
+
+		Raises:
+			subprocess.TimeoutExpired: If the command did not finish in time; exiftool
+				is then restarted, so the session can run the next command
+		"""
+		with self._lock:
+			if not self.running:
+				raise RuntimeError("exiftool session is not running")
+
+			self._sequence += 1
+			ready = f"{{ready{self._sequence}}}"
+			status_prefix = f"{{status{self._sequence}="
+			# Arguments are newline-separated in the argument file, so values must not contain newlines
+			lines = [arg.replace('\n', ' ') for arg in args]
+			lines.extend(['-echo4', status_prefix + '${status}}', f"-execute{self._sequence}"])
+			self._process.stdin.write('\n'.join(lines) + '\n')
+			self._process.stdin.flush()
+
+			deadline = time.monotonic() + timeout
+			try:
+				stdout_lines, ready_line = self._read_until(self._stdout_lines, lambda line: line.rstrip('\r\n') == ready, deadline)
+				stderr_lines, status_line = self._read_until(self._stderr_lines, lambda line: line.startswith(status_prefix), deadline)
+			except queue.Empty:
+				logger.warning(f"exiftool did not finish within {timeout} seconds, restarting it")
+				self._restart()
+				raise subprocess.TimeoutExpired(['exiftool'] + list(args), timeout)
+
+			if ready_line is None:
+				# exiftool exited before finishing the command, so its output says nothing about the result
+				try:
+					exit_code = self._process.wait(timeout=5)
+				except subprocess.TimeoutExpired:
+					exit_code = None
+				logger.warning(f"exiftool exited with code {exit_code} during a command, restarting it")
+				self._restart()
+				return subprocess.CompletedProcess(['exiftool'] + list(args), exit_code or 1, ''.join(stdout_lines), ''.join(stderr_lines))
+			status = status_line[len(status_prefix):].strip().rstrip('}') if status_line else None
+
+		stdout = ''.join(stdout_lines)
+		stderr = ''.join(stderr_lines)
+		if status is not None and status.isdigit():
+			returncode = int(status)
+		else:
+			# exiftool older than 12.10 does not expand ${status}; infer it from the output
+			returncode = 1 if 'Error' in stderr or "weren't updated" in stdout else 0
+		return subprocess.CompletedProcess(['exiftool'] + list(args), returncode, stdout, stderr)
+
+	def apply(self, file_path: str, metadata_args: List[str], dry_run: bool = False) -> bool:
+		"""
+		Write metadata arguments to a file
+
+		Args:
+			file_path: Path to the file
+			metadata_args: List of exiftool arguments
+			dry_run: If True, only log the command without executing it
+
+		Returns:
+			True if successful, False otherwise
+		"""
+		args = _write_args(metadata_args, file_path)
+		if dry_run:
+			logger.info(f"[DRY RUN] Would execute: exiftool {' '.join(args)}")
+			return True
+		try:
+			result = self.execute(args)
+		except Exception as e:
+			logger.error(f"Error applying metadata to {file_path}: {str(e)}")
+			return False
+		if result.returncode == 0:
+			logger.info(f"Successfully updated metadata for {file_path}")
+			return True
+		logger.error(f"Failed to update metadata for {file_path}: {result.stderr.strip()}")
+		return False
+
+	def close(self) -> None:
+		"""Ask exiftool to exit and wait for it"""
+		if self._process is None:
+			return
+		try:
+			if self.running:
+				self._process.stdin.write('-stay_open\nFalse\n')
+				self._process.stdin.flush()
+			_wait_for_exit(self._process, 10)
+		except Exception:
+			self._process.kill()
+		finally:
+			self._process = None
+
 
 class ExifToolService:
 	"""Service for interacting with exiftool"""
 
 	@staticmethod
+	@functools.lru_cache(maxsize=1)
 	def check_exiftool() -> bool:
 		"""
 		Check if exiftool is installed
 
+		Only the PATH is searched, without starting exiftool, and the result is
+		cached for the process.
+
 		Returns:
 			True if exiftool is installed, False otherwise
 		"""
-		try:
-			subprocess.run(['exiftool', '-ver'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+		if shutil.which('exiftool') is not None:
 			return True
-		except (subprocess.SubprocessError, FileNotFoundError):
-			logger.error("exiftool is not installed. Please install it to continue.")
-			logger.info("On macOS, you can install it with: brew install exiftool")
-			return False
+		logger.error("exiftool is not installed. Please install it to continue.")
+		logger.info("On macOS, you can install it with: brew install exiftool")
+		return False
 
 	@staticmethod
-	def fix_file_extension(file_path: str) -> str:
+	@contextmanager
+	def batch_session() -> Iterator[Optional[ExifToolSession]]:
+		"""
+		Keep one exiftool process open for a batch of writes
+
+		Yields:
+			A running ExifToolSession, or None if exiftool could not be started
+			(callers then fall back to one exiftool process per file)
+		"""
+		session = ExifToolSession()
+		try:
+			session.start()
+		except OSError as e:
+			logger.warning(f"Could not start exiftool in -stay_open mode, using one process per file: {str(e)}")
+			yield None
+			return
+		try:
+			yield session
+		finally:
+			session.close()
+
+	@staticmethod
+	def shared_session() -> Optional[ExifToolSession]:
+		"""
+		Return the process-wide exiftool session, started on first use
+
+		For callers that write one file at a time without managing a session
+		(see batch_session): exiftool is started once per process instead of once
+		per file. The session is closed when the interpreter exits. A forked
+		worker does not reuse its parent's pipes but starts its own session.
+
+		Returns:
+			The running session, or None if exiftool cannot be started in -stay_open mode
+		"""
+		global _shared_session, _shared_session_pid, _shared_session_failed
+		with _shared_session_lock:
+			if _shared_session_pid == os.getpid() and (_shared_session_failed or _shared_session.running):
+				return _shared_session
+			session = ExifToolSession()
+			try:
+				session.start()
+			except OSError as e:
+				logger.warning(f"Could not start exiftool in -stay_open mode, using one process per file: {str(e)}")
+				session = None
+			else:
+				atexit.register(session.close)
+				if not session.running:
+					session = None
+			_shared_session, _shared_session_pid = session, os.getpid()
+			_shared_session_failed = session is None
+			return session
+
+	@staticmethod
+	def fix_file_extension(file_path: str, detected: Optional[Tuple[str, str]] = None) -> str:
 		"""
 		Fixes the file extension if it doesn't match the actual file type
 
 		Args:
 			file_path: Path to the file
+			detected: (real_extension, mime_type) from an earlier detect_file_type call, if any
 
 		Returns:
 			Path to the file with the correct extension (may be the same as input)
@@ -45,13 +669,13 @@ class ExifToolService:
 			logger.error(f"File not found: {file_path}")
 			return file_path
 
-		real_ext, mime_type = ExifToolService.detect_file_type(file_path)
+		real_ext, mime_type = detected or ExifToolService.detect_file_type(file_path)
 		if not real_ext:
 			logger.debug(f"Could not determine real file type for {file_path}")
 			return file_path
 
 		# Get the current file extension
-		file_ext = file_path.lower().split('.')[-1] if '.' in file_path else ''
+		file_ext = _file_extension(file_path)
 
 		# Check special case for JPG/JPEG
 		if (real_ext.lower() == 'jpg' and file_ext.lower() == 'jpeg') or (real_ext.lower() == 'jpeg' and file_ext.lower() == 'jpg'):
@@ -62,19 +686,8 @@ class ExifToolService:
 		if real_ext.lower() == file_ext.lower():
 			return file_path
 
-		# Correction map for different file types
-		fix_map = {
-			# Photos
-			'jpg': ['heic', 'png', 'jfif', 'webp'],  # JPEG files with incorrect extensions
-			'png': ['heic'],  # PNG files with incorrect extensions
-			'heic': ['jpg', 'jpeg', 'png'],  # HEIC files with incorrect extensions
-			# Videos
-			'mp4': ['mov', 'avi', '3gp'],  # MP4 files with incorrect extensions
-			'mov': ['mp4', 'avi', '3gp'],  # MOV files with incorrect extensions
-		}
-
 		# Check if we need to fix the extension
-		if real_ext in fix_map and file_ext in fix_map.get(real_ext, []):
+		if (real_ext, file_ext) in _FIX_EXTENSIONS:
 			# Create a new filename with the correct extension
 			base_name = os.path.splitext(file_path)[0]
 			new_path = f"{base_name}.{real_ext}"
@@ -96,8 +709,29 @@ class ExifToolService:
 						return file_path
 
 			try:
-				# Create a copy of the file with the correct extension
-				shutil.copy2(file_path, new_path)
+				# A hard link renames the file without copying any data and, unlike
+				# os.rename, never replaces a file that appeared under the new name
+				os.link(file_path, new_path)
+			except FileExistsError:
+				logger.warning(f"{new_path} appeared while fixing the extension of {file_path}, keeping both files")
+				return file_path
+			except OSError as e:
+				logger.debug(f"Could not hard link {file_path} to {new_path}, copying instead: {str(e)}")
+			else:
+				try:
+					os.remove(file_path)
+				except OSError as e:
+					logger.warning(f"Could not remove original file {file_path}: {str(e)}")
+				logger.info(f"Renamed {file_path} to {new_path} with correct extension ({file_ext} -> {real_ext})")
+				return new_path
+
+			try:
+				# Import here to avoid circular imports
+				from src.services.copy_service import CopyService
+
+				# Create a copy of the file with the correct extension; a reflink or clone
+				# shares the data on copy-on-write filesystems instead of copying it
+				CopyService.copy_file(file_path, new_path, 'reflink')
 				logger.info(f"Copied {file_path} to {new_path} with correct extension ({file_ext} -> {real_ext})")
 
 				# Check that the copy was created successfully and has the correct size
@@ -140,40 +774,45 @@ class ExifToolService:
 		return file_path
 
 	@staticmethod
-	def detect_file_type(file_path: str) -> Tuple[str, str]:
+	def detect_file_type(file_path: str, session: Optional[ExifToolSession] = None) -> Tuple[str, str]:
 		"""
 		Detects the actual file type, regardless of extension
 
+		Common formats are recognized from their magic bytes; exiftool (and then
+		the file command) is only asked about the others. Results are cached by
+		path, modification time and size, so a file is only probed again after
+		it changed.
+
 		Args:
 			file_path: Path to the file
+			session: Optional running ExifToolSession to run the exiftool probe in
 
 		Returns:
 			Tuple (real_extension, mime_type)
 		"""
-		if not os.path.exists(file_path):
+		try:
+			st = os.stat(file_path)
+		except OSError:
 			logger.error(f"File not found: {file_path}")
 			return '', ''
+		cache_key = (file_path, st.st_mtime_ns, st.st_size)
+		cached = _file_type_cache.get(cache_key)
+		if cached is not None:
+			return cached
 
-		# Extended MIME-type map
-		ext_map = {
-			'image/jpeg': 'jpg',
-			'image/jpg': 'jpg',
-			'image/png': 'png',
-			'image/heic': 'heic',
-			'image/heif': 'heif',
-			'video/mp4': 'mp4',
-			'video/quicktime': 'mov',
-			'video/mpeg': 'mpg',
-			'video/x-msvideo': 'avi',
-			'image/gif': 'gif',
-			'image/webp': 'webp',
-			'image/tiff': 'tiff'
-		}
+		# Common formats are recognized from their first bytes, without starting exiftool
+		real_ext = sniff_file_type(file_path)
+		if real_ext:
+			return _remember_file_type(cache_key, (real_ext, mimetypes.guess_type(f"file.{real_ext}")[0] or ''))
 
 		try:
-			# Method 1: Use exiftool to determine file type
-			cmd = ['exiftool', '-FileType', '-s3', file_path]
-			result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=5)
+			# Method 1: Use exiftool to determine file type; -fast2 stops reading
+			# once the header is parsed instead of scanning the whole file
+			cmd = ['exiftool', '-fast2', '-FileType', '-s3', file_path]
+			if session is not None and session.running:
+				result = session.execute(cmd[1:], timeout=5)
+			else:
+				result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=5)
 
 			if result.returncode == 0 and result.stdout.strip():
 				real_ext = result.stdout.strip().lower()
@@ -185,7 +824,7 @@ class ExifToolService:
 				if real_ext.lower() == 'jpeg':
 					real_ext = 'jpg'
 
-				return real_ext, mime_type
+				return _remember_file_type(cache_key, (real_ext, mime_type))
 
 			# Method 2: If exiftool failed to determine the type, use file command
 			cmd = ['file', '--mime-type', '-b', file_path]
@@ -193,26 +832,87 @@ class ExifToolService:
 
 			if result.returncode == 0 and result.stdout.strip():
 				mime_type = result.stdout.strip()
-
-				# Convert MIME type to extension
-				real_ext = ext_map.get(mime_type, '')
-
-				# If not found in the map, try to extract from MIME type
-				if not real_ext and '/' in mime_type:
-					potential_ext = mime_type.split('/')[-1]
-					if potential_ext in ['jpeg', 'jpg', 'png', 'gif', 'webp', 'heic', 'heif', 'mp4', 'mov', 'mpeg', 'avi']:
-						real_ext = 'jpg' if potential_ext == 'jpeg' else potential_ext
-
-				return real_ext, mime_type
+				return _remember_file_type(cache_key, (_extension_for_mime(mime_type), mime_type))
 		except Exception as e:
 			logger.debug(f"Error detecting file type for {file_path}: {str(e)}")
 
 		# If the type could not be determined, return the extension from the filename
-		file_ext = file_path.lower().split('.')[-1] if '.' in file_path else ''
+		file_ext = _file_extension(file_path)
 		return file_ext, mimetypes.guess_type(file_path)[0] or ''
 
 	@staticmethod
-	def apply_metadata(file_path: str, metadata_args: List[str], dry_run: bool = False) -> bool:
+	def detect_file_types(file_paths: List[str], session: Optional[ExifToolSession] = None) -> Dict[str, Tuple[str, str]]:
+		"""
+		Detects the actual types of many files at once
+
+		Works like detect_file_type and shares its cache, but the files that are not
+		recognized from their magic bytes are probed with one exiftool run, and the
+		ones exiftool cannot identify with one file command per FILE_COMMAND_BATCH_SIZE
+		files, instead of one process per file.
+
+		Args:
+			file_paths: Paths of the files
+			session: Optional running ExifToolSession to run the exiftool probe in
+
+		Returns:
+			Dictionary mapping file paths to (real_extension, mime_type); missing files are left out
+		"""
+		types = {}
+		pending = {}
+		for file_path in file_paths:
+			try:
+				st = os.stat(file_path)
+			except OSError:
+				logger.error(f"File not found: {file_path}")
+				continue
+			cache_key = (file_path, st.st_mtime_ns, st.st_size)
+			detected = _file_type_cache.get(cache_key)
+			if detected is None:
+				real_ext = sniff_file_type(file_path)
+				if real_ext:
+					detected = _remember_file_type(cache_key, (real_ext, mimetypes.guess_type(f"file.{real_ext}")[0] or ''))
+			if detected is None:
+				pending[file_path] = cache_key
+			else:
+				types[file_path] = detected
+
+		# Method 1: one exiftool run for all files that were not recognized
+		if pending:
+			metadata = ExifToolService.get_metadata_batch(list(pending), session, ['-fast2', '-FileType'])
+			for file_path, item in metadata.items():
+				real_ext = str(item.get('File:FileType', '')).lower()
+				if file_path in pending and real_ext:
+					mime_type = mimetypes.guess_type(f"file.{real_ext}")[0] or ''
+					if real_ext == 'jpeg':
+						real_ext = 'jpg'
+					types[file_path] = _remember_file_type(pending.pop(file_path), (real_ext, mime_type))
+
+		# Method 2: the file command prints one MIME type per file, in the order of the arguments
+		remaining = list(pending)
+		for i in range(0, len(remaining), FILE_COMMAND_BATCH_SIZE):
+			batch = remaining[i:i + FILE_COMMAND_BATCH_SIZE]
+			try:
+				result = subprocess.run(['file', '--mime-type', '-b', '-N', '--'] + batch,
+										stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=60)
+			except Exception as e:
+				logger.debug(f"Error detecting file types of {len(batch)} files: {str(e)}")
+				continue
+			lines = result.stdout.splitlines()
+			if result.returncode != 0 or len(lines) != len(batch):
+				continue
+			for file_path, mime_type in zip(batch, lines):
+				mime_type = mime_type.strip()
+				if mime_type:
+					types[file_path] = _remember_file_type(pending.pop(file_path), (_extension_for_mime(mime_type), mime_type))
+
+		# If the type could not be determined, use the extension from the filename
+		for file_path in pending:
+			types[file_path] = (_file_extension(file_path), mimetypes.guess_type(file_path)[0] or '')
+		return types
+
+	@staticmethod
+	def apply_metadata(file_path: str, metadata_args: List[str], dry_run: bool = False,
+					   session: Optional[ExifToolSession] = None) -> bool:
 		"""
 		Apply metadata to a file using exiftool
 
@@ -220,6 +920,8 @@ class ExifToolService:
 			file_path: Path to the file
 			metadata_args: List of exiftool arguments
 			dry_run: If True, only print the command without executing it
+			session: Optional running ExifToolSession for the type probe and all write
+				attempts, instead of starting exiftool for each of them
 
 		Returns:
 			True if successful, False otherwise
@@ -228,8 +930,8 @@ class ExifToolService:
 			return False
 
 		# Determine the real file type, not just the extension
-		real_ext, mime_type = ExifToolService.detect_file_type(file_path)
-		file_ext = file_path.lower().split('.')[-1] if '.' in file_path else ''
+		real_ext, mime_type = ExifToolService.detect_file_type(file_path, session)
+		file_ext = _file_extension(file_path)
 
 		# Check if the extension doesn't match the actual file type
 		if real_ext and real_ext != file_ext:
@@ -240,7 +942,8 @@ class ExifToolService:
 				logger.info(f"File {file_path} has extension '{file_ext}' but is actually a '{real_ext}' file")
 
 				# Fix file extension for all file types with incorrect extensions
-				fixed_path = ExifToolService.fix_file_extension(file_path)
+				# Reuse the type detected above instead of probing the file again
+				fixed_path = ExifToolService.fix_file_extension(file_path, (real_ext, mime_type))
 
 				# If the path has changed (i.e., a copy with the correct extension was created)
 				if fixed_path != file_path and os.path.exists(fixed_path):
@@ -248,76 +951,55 @@ class ExifToolService:
 					# Use the new path for further processing
 					file_path = fixed_path
 					# Update the extension and file type for further processing
-					file_ext = os.path.splitext(fixed_path)[1][1:].lower()
+					file_ext = _file_extension(fixed_path)
 					real_ext = file_ext  # Now the extension matches the real type
 
 		# Create a copy of arguments for modification depending on the file type
 		adjusted_args = metadata_args.copy()
 
 		# Special handling for different file types based on the real type
-		if real_ext == 'jpg' or 'jpeg' in mime_type or file_ext.lower() == 'jpg':
-			# For JPEG files (including those that were renamed)
-			# Use standard arguments for JPEG files
-			adjusted_args.append('-ignoreMinorErrors')
-		elif real_ext == 'heic' or 'heic' in mime_type:
-			# For actual HEIC files, use a safer set of arguments
-			# Remove GPS coordinates which often cause problems
-			adjusted_args = [arg for arg in adjusted_args if not arg.startswith('-GPS')]
-			# Add special flags for HEIC files
-			adjusted_args.append('-ignoreMinorErrors')
-		elif real_ext in ['png', 'gif'] or any(x in mime_type for x in ['png', 'gif']):
-			# For PNG and GIF files, keep only the basic date metadata
-			adjusted_args = [arg for arg in adjusted_args if arg.startswith('-DateTime') or arg.startswith('-Create') or arg.startswith('-Modify')]
-			# Add additional flags for PNG files
-			adjusted_args.append('-ignoreMinorErrors')
-			adjusted_args.append('-overwrite_original_in_place')
-		elif real_ext.lower() in ['mpg', 'mpeg'] or 'mpeg' in mime_type:
-			# Special handling for MPG files which are particularly problematic
-			# Keep only date metadata and add special flags
-			adjusted_args = [arg for arg in adjusted_args if arg.startswith('-DateTime') or arg.startswith('-Create') or arg.startswith('-Modify')]
-			adjusted_args.append('-ignoreMinorErrors')
-			adjusted_args.append('-m')
-			adjusted_args.append('-overwrite_original_in_place')
-		elif real_ext.lower() in ['avi'] or 'avi' in mime_type:
-			# Special handling for AVI files
-			# Keep only date metadata and add special flags
-			adjusted_args = [arg for arg in adjusted_args if arg.startswith('-DateTime') or arg.startswith('-Create') or arg.startswith('-Modify')]
-			adjusted_args.append('-ignoreMinorErrors')
-			adjusted_args.append('-m')
-			adjusted_args.append('-overwrite_original_in_place')
-		elif real_ext.lower() in ['aae'] or file_ext.lower() == 'aae':
-			# For AAE files (Apple edit information), only update basic metadata
-			adjusted_args = [arg for arg in adjusted_args if arg.startswith('-DateTime') or arg.startswith('-Create') or arg.startswith('-Modify')]
-			adjusted_args.append('-ignoreMinorErrors')
-		elif real_ext in ['mp4', 'mov', 'wmv'] or any(x in mime_type for x in ['video', 'quicktime']):
-			# For other video files, use special flags
-			adjusted_args.append('-ignoreMinorErrors')
-			adjusted_args.append('-use MWG')
+		handler = _metadata_args_handler(real_ext, mime_type, file_ext)
+		if handler is not None:
+			adjusted_args = handler(adjusted_args)
 
-		try:
-			cmd = ['exiftool']
-			cmd.extend(adjusted_args)
+		# Date-related arguments, for the retries with only the dates
+		date_args = _date_only_args(adjusted_args)
 
+		try:
 			# Overwrite original file
-			cmd.extend(['-overwrite_original', file_path])
+			write_args = _write_args(adjusted_args, file_path)
+			cmd = ['exiftool'] + write_args
 
 			if dry_run:
 				logger.info(f"[DRY RUN] Would execute: {' '.join(cmd)}")
 				return True
 
+			# The full write kept failing for files of this type while a retry worked;
+			# start with that retry instead of running exiftool two or three times
+			file_type = (real_ext, mime_type)
+			fallback = _known_write_fallback(file_type) if date_args else None
+			if fallback is not None:
+				force_args = ['-FileType=JPEG'] if fallback == 'force_jpeg' else []
+				result = _run_exiftool(date_args + force_args + ['-ignoreMinorErrors', '-overwrite_original', file_path], session)
+				if result.returncode == 0:
+					logger.info(f"Partially updated date metadata for {file_path}, full updates keep failing for {real_ext} files")
+					# Return False because we only applied partial metadata
+					return False
+				# This file needs the full sequence; so may the next ones
+				_record_write_fallback(file_type, None)
+
 			# Use subprocess.run without check=True to handle errors ourselves
 			try:
-				result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
+				if session is not None and session.running:
+					result = session.execute(write_args, timeout=30)
+				else:
+					result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
 			except subprocess.TimeoutExpired:
 				logger.warning(f"Command timed out for {file_path}, trying with simplified arguments")
 				# If timeout occurs, try with only date metadata
-				date_args = [arg for arg in adjusted_args if arg.startswith('-DateTime') or arg.startswith('-Create') or arg.startswith('-Modify')]
 				if date_args:
-					cmd = ['exiftool']
-					cmd.extend(date_args)
-					cmd.extend(['-ignoreMinorErrors', '-m', '-overwrite_original', file_path])
 					try:
-						result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=15)
+						result = _run_exiftool(date_args + ['-ignoreMinorErrors', '-m', '-overwrite_original', file_path], session)
 					except Exception:
 						logger.error(f"Failed to update metadata for {file_path} after timeout")
 						return False
@@ -327,63 +1009,132 @@ class ExifToolService:
 
 			if result.returncode == 0:
 				logger.info(f"Successfully updated metadata for {file_path}")
+				_record_write_fallback(file_type, None)
 				return True
 			else:
 				# If the first attempt failed, try with dates only
 				if result.returncode != 0 and not dry_run:
 					logger.warning(f"First attempt failed for {file_path}, trying with dates only")
 
-					# Keep only date-related arguments
-					date_args = [arg for arg in adjusted_args if arg.startswith('-DateTime') or arg.startswith('-Create') or arg.startswith('-Modify')]
-
 					if date_args:
-						cmd = ['exiftool']
-						cmd.extend(date_args)
-						cmd.extend(['-ignoreMinorErrors', '-overwrite_original', file_path])
-
 						try:
 							try:
-								result2 = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=15)
+								result2 = _run_exiftool(date_args + ['-ignoreMinorErrors', '-overwrite_original', file_path], session)
 							except subprocess.TimeoutExpired:
 								logger.error(f"Second attempt timed out for {file_path}")
 								return False
 							if result2.returncode == 0:
 								logger.info(f"Partially updated date metadata for {file_path}, but full metadata update failed")
+								_record_write_fallback(file_type, 'dates_only')
 								# Return False because we only applied partial metadata
 								return False
 							else:
+								stderr2 = _decode_output(result2.stderr)
 								# If that didn't work either, try to force the file type
-								if 'Not a valid HEIC' in result2.stderr.decode() and real_ext == 'jpg':
+								if real_ext == 'jpg' and 'Not a valid HEIC' in stderr2:
 									logger.warning(f"Trying to force JPEG format for {file_path}")
-									cmd = ['exiftool']
-									cmd.extend(date_args)
-									cmd.extend(['-FileType=JPEG', '-ignoreMinorErrors', '-overwrite_original', file_path])
-
 									try:
 										try:
-											result3 = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=15)
+											result3 = _run_exiftool(date_args + ['-FileType=JPEG', '-ignoreMinorErrors', '-overwrite_original', file_path], session)
 										except subprocess.TimeoutExpired:
 											logger.error(f"Third attempt timed out for {file_path}")
 											return False
 										if result3.returncode == 0:
 											logger.info(f"Partially updated metadata with forced JPEG format for {file_path}, but full metadata update failed")
+											_record_write_fallback(file_type, 'force_jpeg')
 											# Return False because we only applied partial metadata
 											return False
 										else:
-											logger.error(f"Failed to update metadata even with forced JPEG format for {file_path}: {result3.stderr.decode()}")
+											logger.error(f"Failed to update metadata even with forced JPEG format for {file_path}: {_decode_output(result3.stderr)}")
 									except Exception as e3:
 										logger.error(f"Error in third attempt for {file_path}: {str(e3)}")
 								else:
-									logger.error(f"Failed to update even date metadata for {file_path}: {result2.stderr.decode()}")
+									logger.error(f"Failed to update even date metadata for {file_path}: {stderr2}")
 						except Exception as e2:
 							logger.error(f"Error in second attempt for {file_path}: {str(e2)}")
 
-				logger.error(f"Failed to update metadata for {file_path}: {result.stderr.decode()}")
+				logger.error(f"Failed to update metadata for {file_path}: {_decode_output(result.stderr)}")
 				return False
 		except Exception as e:
 			logger.error(f"Error applying metadata to {file_path}: {str(e)}")
 			return False
 
+	@staticmethod
+	def apply_metadata_batch(items: List[Tuple[str, List[str]]], dry_run: bool = False) -> Set[str]:
+		"""
+		Apply metadata to many files with a single exiftool run
+
+		Every file gets its own command in one argument file, separated by
+		-execute, so exiftool is started once for the whole batch. Each command
+		echoes its exit status after it has run, which tells which files were updated.
+		The arguments are adjusted by file type as in apply_metadata, with the type
+		taken from the file name since probing every file would cost a run per file.
+
+		Args:
+			items: List of (file_path, exiftool arguments) tuples
+			dry_run: If True, only print the commands without executing them
+
+		Returns:
+			Set of the file paths that were updated successfully
+		"""
+		if not items:
+			return set()
+
+		if dry_run:
+			for file_path, metadata_args in items:
+				logger.info(f"[DRY RUN] Would execute: exiftool {' '.join(metadata_args)} -overwrite_original {file_path}")
+			return {file_path for file_path, _ in items}
+
+		arg_file = None
+		try:
+			with tempfile.NamedTemporaryFile('w', suffix='.args', delete=False, encoding='utf-8') as f:
+				arg_file = f.name
+				for index, (file_path, metadata_args) in enumerate(items):
+					if index:
+						f.write('-execute\n')
+					file_ext = _file_extension(file_path)
+					handler = _metadata_args_handler(file_ext, mimetypes.guess_type(file_path)[0] or '', file_ext)
+					write_args = handler(list(metadata_args)) if handler is not None else list(metadata_args)
+					if '-ignoreMinorErrors' not in write_args:
+						write_args.append('-ignoreMinorErrors')
+					for arg in _write_args(write_args, file_path):
+						# The argument file has one argument per line
+						f.write(arg.replace('\n', ' ') + '\n')
+					f.write(f'-echo3\n{{done{index}=${{status}}}}\n')
+
+			result = subprocess.run(['exiftool', '-@', arg_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+									timeout=_batch_timeout(len(items)))
+			output = result.stdout
+		except subprocess.TimeoutExpired as e:
+			# Keep what was written before exiftool hung and write the rest one by one
+			output = _decode_output(e.stdout or '')
+			logger.warning(f"exiftool timed out on a batch of {len(items)} files, writing the rest one at a time")
+		except Exception as e:
+			logger.error(f"Error applying metadata to {len(items)} files: {str(e)}")
+			return set()
+		finally:
+			if arg_file and os.path.exists(arg_file):
+				os.remove(arg_file)
+
+		statuses = {}
+		start = 0
+		for match in re.finditer(r'\{done(\d+)=([^}]*)\}', output):
+			status = match.group(2).strip()
+			if not status.isdigit():
+				# exiftool older than 12.10 does not expand ${status}; use the summary the command printed before its echo
+				summary = re.search(r'(\d+) image files (?:updated|unchanged)', output[start:match.start()])
+				status = '0' if summary and int(summary.group(1)) > 0 else '1'
+			statuses[match.group(1)] = status
+			start = match.end()
+		updated = {items[int(index)][0] for index, status in statuses.items() if status == '0'}
+		if len(statuses) < len(items):
+			for index, (file_path, metadata_args) in enumerate(items):
+				# apply_metadata has its own timeout and retries with the dates only
+				if str(index) not in statuses and ExifToolService.apply_metadata(file_path, metadata_args):
+					updated.add(file_path)
+		logger.info(f"Updated metadata for {len(updated)} of {len(items)} files in one exiftool run")
+		return updated
+
 	@staticmethod
 	def apply_specialized_metadata_for_problematic_files(file_path: str) -> bool:
 		"""
@@ -398,7 +1149,7 @@ class ExifToolService:
 		"""
 		try:
 			# Get file extension
-			file_ext = os.path.splitext(file_path)[1].lower().lstrip('.')
+			file_ext = _file_extension(file_path)
 
 			# Determine file creation time from filesystem
 			try:
@@ -406,7 +1157,6 @@ class ExifToolService:
 				modification_time = os.path.getmtime(file_path)
 
 				# Format dates for exiftool
-				from datetime import datetime
 				date_format = "%Y:%m:%d %H:%M:%S"
 				creation_date = datetime.fromtimestamp(creation_time).strftime(date_format)
 				modify_date = datetime.fromtimestamp(modification_time).strftime(date_format)
@@ -523,12 +1273,42 @@ class ExifToolService:
 			return False
 
 	@staticmethod
-	def get_metadata(file_path: str) -> Optional[dict]:
+	def read_tags(file_paths: List[str], tags: List[str], session: Optional[ExifToolSession] = None) -> Dict[str, dict]:
+		"""
+		Read a few tags of many files with one exiftool command
+
+		Values are numeric (-n), so GPS coordinates come back as signed decimals.
+
+		Args:
+			file_paths: Paths of the files to read
+			tags: Tag names to read (e.g. 'DateTimeOriginal', 'Composite:GPSLatitude')
+			session: Optional running ExifToolSession to run the command in
+
+		Returns:
+			Dictionary mapping file paths to their tag values (files that could not be read are missing)
+		"""
+		if not file_paths:
+			return {}
+		args = ['-j', '-n'] + [f'-{tag}' for tag in tags] + list(file_paths)
+		try:
+			if session is not None:
+				result = session.execute(args, _batch_timeout(len(file_paths)))
+			else:
+				result = subprocess.run(['exiftool'] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+										timeout=_batch_timeout(len(file_paths)))
+			return {item['SourceFile']: item for item in _parse_json(result.stdout or '[]') if 'SourceFile' in item}
+		except Exception as e:
+			logger.debug(f"Could not read tags of {len(file_paths)} files: {str(e)}")
+			return {}
+
+	@staticmethod
+	def get_metadata(file_path: str, session: Optional[ExifToolSession] = None) -> Optional[dict]:
 		"""
 		Get metadata from a file using exiftool
 
 		Args:
 			file_path: Path to the file
+			session: Optional running ExifToolSession to read the metadata in
 
 		Returns:
 			Dictionary with metadata or None if failed
@@ -538,18 +1318,21 @@ class ExifToolService:
 			return None
 
 		try:
-			# Use -j for JSON output and -G for grouping tags by their family
+			# Use -j for JSON output and -G for grouping tags by their family; the output
+			# is kept as bytes, which the JSON parser decodes itself
 			cmd = ['exiftool', '-j', '-G', file_path]
-			result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+			if session is not None and session.running:
+				result = session.execute(cmd[1:])
+			else:
+				result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 			if result.returncode != 0:
-				logger.error(f"Failed to get metadata for {file_path}: {result.stderr}")
+				logger.error(f"Failed to get metadata for {file_path}: {_decode_output(result.stderr)}")
 				return None
 
 			# Parse JSON output
-			import json
 			try:
-				data = json.loads(result.stdout)
+				data = _parse_json(result.stdout)
 				if data and isinstance(data, list) and len(data) > 0:
 					return data[0]  # Return the first item in the array
 				else:
@@ -561,3 +1344,46 @@ class ExifToolService:
 		except Exception as e:
 			logger.error(f"Error getting metadata from {file_path}: {str(e)}")
 			return None
+
+	@staticmethod
+	def get_metadata_batch(file_paths: List[str], session: Optional[ExifToolSession] = None,
+						tags: Optional[List[str]] = None) -> Dict[str, dict]:
+		"""
+		Get the metadata of many files with one exiftool run
+
+		The paths are passed as an argument file on stdin (-@ -), so the command
+		line length does not limit the batch size.
+
+		Args:
+			file_paths: Paths of the files
+			session: Optional running ExifToolSession to run the command in
+			tags: Optional tags (such as '-FileType') and options to read instead of all metadata
+
+		Returns:
+			Dictionary mapping file paths to their metadata (files that could not be read are missing)
+		"""
+		# The argument file has one argument per line
+		paths = [path for path in file_paths if '\n' not in path]
+		if len(paths) != len(file_paths):
+			logger.warning(f"Skipped {len(file_paths) - len(paths)} files with a newline in their name")
+		if not paths:
+			return {}
+
+		args = ['-j', '-G'] + (tags or [])
+		try:
+			if session is not None and session.running:
+				output = session.execute(args + paths, _batch_timeout(len(paths))).stdout
+			else:
+				result = subprocess.run(
+					['exiftool'] + args + ['-charset', 'filename=utf8', '-@', '-'],
+					input='\n'.join(paths).encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+					timeout=_batch_timeout(len(paths))
+				)
+				# exiftool exits with 1 when some of the files failed, but still reports the others
+				if result.returncode != 0:
+					logger.debug(f"exiftool reported errors for some files: {_decode_output(result.stderr).strip()}")
+				output = result.stdout
+			return {item['SourceFile']: item for item in _parse_json(output or '[]') if 'SourceFile' in item}
+		except Exception as e:
+			logger.error(f"Error getting metadata of {len(paths)} files: {str(e)}")
+			return {}
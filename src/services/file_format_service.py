@@ -2,20 +2,83 @@
 Service for handling file format operations like conversion and extension correction
 """
 import os
+import shutil
 import logging
+import functools
 import subprocess
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, List
 
+from src.services.exiftool_service import ExifToolService
+
 logger = logging.getLogger(__name__)
 
+# Try to decode HEIC in-process (libheif bindings + Pillow) instead of starting a converter per file;
+# Pillow is only imported by the conversion itself
+HAS_PYHEIF = False
+try:
+    import pyheif
+    HAS_PYHEIF = True
+except ImportError:
+    pass
+
+# Quality of the JPEG files written by the in-process conversion
+JPEG_QUALITY = 95
+
+
+@functools.lru_cache(maxsize=1)
+def _heic_converter() -> str:
+    """
+    Find the tool for HEIC conversion, once per process
+    
+    Returns:
+        'sips', 'magick' or 'exiftool'
+    """
+    if os.path.exists('/usr/bin/sips'):
+        return 'sips'
+    if shutil.which('magick'):
+        return 'magick'
+    return 'exiftool'
+
+
+def _convert_heic_in_process(file_path: str, jpg_path: str) -> bool:
+    """
+    Convert a HEIC file to JPG with pyheif and Pillow, without starting a process
+    
+    Args:
+        file_path: Path to the HEIC file
+        jpg_path: Path of the JPG file to write
+        
+    Returns:
+        True if the JPG file was written, False otherwise
+    """
+    try:
+        from PIL import Image
+        heif_file = pyheif.read(file_path)
+        image = Image.frombytes(heif_file.mode, heif_file.size, heif_file.data, 'raw', heif_file.mode, heif_file.stride)
+        if image.mode != 'RGB':
+            # JPEG has no alpha channel
+            image = image.convert('RGB')
+        image.save(jpg_path, 'JPEG', quality=JPEG_QUALITY)
+        return True
+    except Exception as e:
+        logger.debug(f"In-process HEIC conversion failed for {file_path}, using an external converter: {str(e)}")
+        if os.path.exists(jpg_path):
+            os.remove(jpg_path)
+        return False
+
+
 class FileFormatService:
     """Service for handling file format operations"""
     
     @staticmethod
     def detect_file_format(file_path: str) -> Optional[str]:
         """
-        Detect the actual file format using exiftool
+        Detect the actual file format
+        
+        Uses ExifToolService.detect_file_type, so the magic-byte sniffing, the
+        shared exiftool process and the per-file cache (keyed by path, size and
+        modification time) are shared with the metadata writes.
         
         Args:
             file_path: Path to the file
@@ -23,20 +86,11 @@ class FileFormatService:
         Returns:
             Detected file format or None if detection failed
         """
-        try:
-            cmd = ['exiftool', '-FileType', '-s3', file_path]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-            
-            if result.returncode == 0 and result.stdout.strip():
-                file_type = result.stdout.strip().lower()
-                # Normalize some common formats
-                if file_type == 'jpeg':
-                    return 'jpg'
-                return file_type
-            return None
-        except Exception as e:
-            logger.error(f"Error detecting file format for {file_path}: {str(e)}")
+        if not os.path.exists(file_path):
+            logger.error(f"Error detecting file format for {file_path}: file not found")
             return None
+        file_type, _ = ExifToolService.detect_file_type(file_path, ExifToolService.shared_session())
+        return file_type or None
     
     @staticmethod
     def is_heic(file_path: str) -> bool:
@@ -57,18 +111,20 @@ class FileFormatService:
             return False
     
     @staticmethod
-    def convert_heic_to_jpg(file_path: str, remove_original: bool = True) -> Optional[str]:
+    def convert_heic_to_jpg(file_path: str, remove_original: bool = True, known_format: Optional[str] = None) -> Optional[str]:
         """
         Convert a HEIC file to JPG
         
         Args:
             file_path: Path to the HEIC file
             remove_original: Whether to remove the original HEIC file
+            known_format: Format from an earlier detect_file_format call, if any
             
         Returns:
             Path to the converted JPG file or None if conversion failed
         """
-        if not FileFormatService.is_heic(file_path):
+        is_heic = known_format == 'heic' if known_format is not None else FileFormatService.is_heic(file_path)
+        if not is_heic:
             logger.warning(f"File is not HEIC: {file_path}")
             return None
         
@@ -79,29 +135,25 @@ class FileFormatService:
             name_without_ext = os.path.splitext(basename)[0]
             jpg_path = os.path.join(dirname, f"{name_without_ext}.jpg")
             
-            # Convert using sips (macOS) or magick (ImageMagick)
-            if os.path.exists('/usr/bin/sips'):
-                # macOS built-in tool
-                cmd = ['sips', '-s', 'format', 'jpeg', file_path, '--out', jpg_path]
-                result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                success = result.returncode == 0
-            else:
-                # Try ImageMagick
-                try:
+            # Convert in-process with pyheif if available, else with sips (macOS), magick (ImageMagick) or exiftool
+            success = HAS_PYHEIF and _convert_heic_in_process(file_path, jpg_path)
+            if not success:
+                converter = _heic_converter()
+                if converter == 'sips':
+                    # macOS built-in tool
+                    cmd = ['sips', '-s', 'format', 'jpeg', file_path, '--out', jpg_path]
+                elif converter == 'magick':
                     cmd = ['magick', 'convert', file_path, jpg_path]
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    success = result.returncode == 0
-                except FileNotFoundError:
+                else:
                     # If ImageMagick is not installed, try exiftool
                     cmd = ['exiftool', '-b', '-PreviewImage', file_path, '-o', jpg_path]
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-                    success = result.returncode == 0
+                result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+                success = result.returncode == 0
             
             if success and os.path.exists(jpg_path):
                 logger.info(f"Converted HEIC to JPG: {file_path} -> {jpg_path}")
                 
                 # Copy metadata from HEIC to JPG
-                from src.services.exiftool_service import ExifToolService
                 ExifToolService.copy_metadata(file_path, jpg_path)
                 
                 # Remove original if requested
@@ -120,18 +172,20 @@ class FileFormatService:
             return None
     
     @staticmethod
-    def fix_file_extension(file_path: str) -> Optional[str]:
+    def fix_file_extension(file_path: str, detected_format: Optional[str] = None) -> Optional[str]:
         """
         Fix incorrect file extension based on actual file content
         
         Args:
             file_path: Path to the file
+            detected_format: Format from an earlier detect_file_format call, if any
             
         Returns:
             Path to the renamed file or None if no change was needed or operation failed
         """
         try:
-            detected_format = FileFormatService.detect_file_format(file_path)
+            if detected_format is None:
+                detected_format = FileFormatService.detect_file_format(file_path)
             if not detected_format:
                 logger.warning(f"Could not detect format for {file_path}")
                 return None
@@ -176,17 +230,80 @@ class FileFormatService:
             return None
         
         result_path = file_path
+        # Detected once and reused while the file is unchanged, instead of running exiftool again
+        detected_format = None
         
         # Convert HEIC to JPG if requested
-        if convert_heic and FileFormatService.is_heic(result_path):
-            jpg_path = FileFormatService.convert_heic_to_jpg(result_path)
-            if jpg_path:
-                result_path = jpg_path
+        if convert_heic:
+            detected_format = FileFormatService.detect_file_format(result_path)
+            if detected_format == 'heic':
+                jpg_path = FileFormatService.convert_heic_to_jpg(result_path, known_format=detected_format)
+                if jpg_path:
+                    result_path = jpg_path
+                    detected_format = None
         
         # Fix file extension if requested
         if fix_extensions and os.path.exists(result_path):
-            fixed_path = FileFormatService.fix_file_extension(result_path)
+            fixed_path = FileFormatService.fix_file_extension(result_path, detected_format)
             if fixed_path:
                 result_path = fixed_path
         
-        return result_path
\ No newline at end of file
+        return result_path
+    
+    @staticmethod
+    def convert_heic_files(file_paths: List[str], max_workers: Optional[int] = None) -> int:
+        """
+        Convert many HEIC files to JPG with a pool of worker threads
+        
+        Each conversion waits on sips/ImageMagick in a subprocess, so threads
+        run several conversions at once.
+        
+        Args:
+            file_paths: Paths to the HEIC files
+            max_workers: Number of conversions at the same time (default: CPU count)
+            
+        Returns:
+            Number of files converted
+        """
+        if not file_paths:
+            return 0
+        # Probe the types of all files at once instead of once per conversion
+        detected = ExifToolService.detect_file_types(file_paths, ExifToolService.shared_session())
+        
+        def convert(file_path: str) -> Optional[str]:
+            known_format = detected[file_path][0] if file_path in detected else None
+            return FileFormatService.convert_heic_to_jpg(file_path, known_format=known_format)
+        
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            return sum(1 for jpg_path in executor.map(convert, file_paths) if jpg_path)
+    
+    @staticmethod
+    def fix_file_extensions(file_paths: List[str]) -> int:
+        """
+        Fix the extensions of many files
+        
+        The types of all files are detected in one pass (see
+        ExifToolService.detect_file_types); the renames themselves are cheap and
+        done one after another, so two files cannot race for the same new name.
+        
+        Args:
+            file_paths: Paths to the files
+            
+        Returns:
+            Number of files renamed
+        """
+        if not file_paths:
+            return 0
+        detected = ExifToolService.detect_file_types(file_paths, ExifToolService.shared_session())
+        fixed_count = 0
+        for file_path in file_paths:
+            if file_path not in detected:
+                logger.warning(f"File does not exist: {file_path}")
+                continue
+            detected_format = detected[file_path][0]
+            if not detected_format:
+                logger.warning(f"Could not detect format for {file_path}")
+                continue
+            if FileFormatService.fix_file_extension(file_path, detected_format):
+                fixed_count += 1
+        return fixed_count
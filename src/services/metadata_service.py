@@ -6,19 +6,21 @@ import json
 import logging
 import csv
 import re
+import bisect
+import pickle
 import concurrent.futures
 try:
 	from tqdm import tqdm
 except ImportError:
 	def tqdm(x, *args, **kwargs):
 		return x
-from typing import Optional, Dict, List, Tuple, Set
+from typing import Optional, Dict, List, Tuple, Set, Iterator
 from datetime import datetime
-from pathlib import Path
 
 from src.models.metadata import PhotoMetadata, Metadata
+from src.utils.log_utils import BufferedFileHandler
 from src.utils.file_utils import get_base_filename, extract_date_from_filename, is_uuid_filename, are_duplicate_filenames
-from src.utils.image_utils import is_media_file, compute_hash_for_file, find_duplicates, find_matching_file_by_hash, load_image_hashes, save_image_hashes, remove_duplicates
+from src.utils.image_utils import is_media_file, iter_media_entries, compute_hash_for_file, find_duplicates, find_matching_file_by_hash, load_image_hashes, save_image_hashes, append_image_hashes, remove_duplicates
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,78 @@ failed_updates_logger = logging.getLogger('failed_updates')
 failed_updates_logger.setLevel(logging.INFO)
 failed_updates_logger.propagate = False  # Don't propagate to parent loggers
 
+# Number of files written by one exiftool run in process_metadata_pairs
+METADATA_BATCH_SIZE = 200
+
+# Duplicate suffix like ' (1)' at the end of a file name without extension
+_DUPLICATE_SUFFIX_RE = re.compile(r'\s*\(\d+\)$')
+
+
+def _iter_json_files(directory: str) -> Iterator[str]:
+	"""
+	Recursively yield the paths of the Google Takeout metadata JSON files of a directory
+
+	Like iter_media_entries, the file type comes from the os.scandir entry and the
+	name is checked on the entry, so there is no extra stat() per file.
+
+	Args:
+		directory: Directory to scan
+
+	Yields:
+		Path of each supplemental metadata JSON file
+	"""
+	stack = [directory]
+	while stack:
+		path = stack.pop()
+		try:
+			with os.scandir(path) as entries:
+				for entry in entries:
+					if entry.is_dir(follow_symlinks=False):
+						stack.append(entry.path)
+					elif entry.name.endswith('.json') and '.supplemental-meta' in entry.name and entry.is_file(follow_symlinks=False):
+						yield entry.path
+		except OSError as e:
+			logger.error(f"Error scanning {path}: {str(e)}")
+
+
+def _find_by_name(name_index: Dict[str, str], sorted_names: List[str], json_file: str) -> Optional[str]:
+	"""
+	Find the media file of a JSON file in the name index of the new directory
+
+	Replaces find_matching_file in the matching loop: the exact lookups are dict
+	probes and the match of truncated names is a bisect over the sorted names,
+	instead of a scan over every indexed name for each JSON file.
+
+	Args:
+		name_index: Lowercase file names, names without extension and names without duplicate suffix mapped to paths
+		sorted_names: Sorted keys of name_index
+		json_file: Path to the JSON metadata file
+
+	Returns:
+		Path to the matching file or None if no match found
+	"""
+	name = os.path.basename(json_file).lower()
+	for suffix in ('.supplemental-metadata.json', '.supplemental-meta.json', '.json'):
+		if name.endswith(suffix):
+			name = name[:-len(suffix)]
+			break
+	if not name:
+		return None
+
+	stem = os.path.splitext(name)[0]
+	for key in (name, stem, _DUPLICATE_SUFFIX_RE.sub('', stem)):
+		if key in name_index:
+			return name_index[key]
+
+	# Google Takeout truncates long names, so one name may be a prefix of the other
+	position = bisect.bisect_left(sorted_names, name)
+	if position < len(sorted_names) and sorted_names[position].startswith(name):
+		return name_index[sorted_names[position]]
+	for end in range(len(name) - 1, 0, -1):
+		if name[:end] in name_index:
+			return name_index[name[:end]]
+	return None
+
 
 class MetadataService:
 	"""Service for handling metadata operations"""
@@ -181,7 +255,6 @@ class MetadataService:
 					indexed_files[filename_lower].append(full_path)
 
 					# Also store cleaned name (without numbers in parentheses)
-					import re
 					clean_name = re.sub(r'\s*\(\d+\)$', '', base_name_lower)
 					if clean_name != base_name_lower:
 						if clean_name not in indexed_files:
@@ -242,7 +315,6 @@ class MetadataService:
 
 			# Check for duplicate filenames (with suffixes like '(1)')
 			# Also try with cleaned name (without numbers in parentheses)
-			import re
 			clean_name = re.sub(r'\s*\(\d+\)$', '', base_name_lower)
 			if clean_name != base_name_lower and clean_name in indexed_files and indexed_files[clean_name]:
 				return indexed_files[clean_name][0]  # Return the first match
@@ -260,94 +332,6 @@ class MetadataService:
 			logger.error(f"Error finding matching file for {json_path}: {str(e)}")
 			return None
 
-	@staticmethod
-	def find_metadata_pairs(old_dir: str, new_dir: str, 
-						   no_hash_matching: bool = False,
-						   similarity_threshold: float = 0.98, duplicates_log: str = 'data/duplicates.csv') -> List[Tuple[str, str, PhotoMetadata]]:
-		"""
-		Find pairs of JSON metadata files and their matching media files, iterating over the smaller set for efficiency.
-
-		Args:
-			old_dir: Directory containing Google Takeout files (JSON metadata and original media)
-			new_dir: Directory containing Apple Photos exports to be updated
-			no_hash_matching: If True, disable image hash matching (faster but less accurate)
-			similarity_threshold: Threshold for considering two images as duplicates (0.0-1.0)
-			duplicates_log: Path to the log file for duplicates
-
-		Returns:
-			List of tuples (json_path, matching_file_path, metadata)
-		"""
-		if not os.path.exists(old_dir):
-			logger.error(f"Old directory not found: {old_dir}")
-			return []
-
-		if not os.path.exists(new_dir):
-			logger.error(f"New directory not found: {new_dir}")
-			return []
-
-		try:
-			# Find all JSON files in the old directory
-			json_files = []
-			for root, _, files in os.walk(old_dir):
-				for file in files:
-					if file.endswith('.json') or file.endswith('.supplemental-metadata.json'):
-						json_files.append(os.path.join(root, file))
-			logger.info(f"Found {len(json_files)} JSON files in {old_dir}")
-
-			# Find all media files in the new directory
-			media_files = []
-			for root, _, files in os.walk(new_dir):
-				for file in files:
-					if is_media_file(file):
-						media_files.append(os.path.join(root, file))
-			logger.info(f"Found {len(media_files)} media files in {new_dir}")
-
-			# Only extract metadata from JSON files that have a matching media file
-			logger.info("Building set of media basenames in new directory for fast lookup...")
-			media_basenames = set()
-			for media_file in media_files:
-				base_name = get_base_filename(os.path.basename(media_file)).lower()
-				media_basenames.add(base_name)
-				# Also add cleaned name (without (1), (2), etc.)
-				import re
-				clean_name = re.sub(r'\s*\(\d+\)$', '', base_name)
-				media_basenames.add(clean_name)
-
-			logger.info(f"Pre-extracting metadata only for JSONs with a matching media file (total media basenames: {len(media_basenames)})")
-			metadata_cache = {}
-			matched_json_files = set()
-			for idx, json_file in enumerate(json_files):
-				json_base = get_base_filename(os.path.basename(json_file)).lower()
-				if json_base in media_basenames:
-					metadata = MetadataService.extract_metadata(json_file)
-					if metadata:
-						metadata_cache[json_file] = metadata
-					matched_json_files.add(json_file)
-				elif re.sub(r'\s*\(\d+\)$', '', json_base) in media_basenames:
-					metadata = MetadataService.extract_metadata(json_file)
-					if metadata:
-						metadata_cache[json_file] = metadata
-					matched_json_files.add(json_file)
-
-			pairs = []
-			for media_file in media_files:
-				base_name = get_base_filename(os.path.basename(media_file))
-				json_candidates = [j for j in matched_json_files if get_base_filename(os.path.basename(j)).lower() == base_name.lower()]
-				if not json_candidates:
-					import re
-					clean_name = re.sub(r'\s*\(\d+\)$', '', base_name.lower())
-					json_candidates = [j for j in matched_json_files if get_base_filename(os.path.basename(j)).lower() == clean_name]
-				if json_candidates:
-					json_file = json_candidates[0]
-					if json_file in metadata_cache:
-						pairs.append((json_file, media_file, metadata_cache[json_file]))
-			logger.info(f"Matched {len(pairs)} media files with JSON metadata. Only these will be processed.")
-			return pairs
-
-		except Exception as e:
-			logger.error(f"Error finding metadata pairs: {str(e)}")
-			return []
-
 	@staticmethod
 	def extract_metadata_from_filename(file_path: str) -> Optional[PhotoMetadata]:
 		"""
@@ -478,8 +462,16 @@ class MetadataService:
 		return files_without_metadata
 
 	@staticmethod
-	def setup_processed_files_logger(log_file: str = 'logs/processed_files.log', failed_updates_log: str = 'logs/failed_updates.log'):
-		"""Set up separate loggers for processed files and failed updates"""
+	def setup_processed_files_logger(log_file: str = 'logs/processed_files.log', failed_updates_log: str = 'logs/failed_updates.log',
+									 append: bool = False):
+		"""
+		Set up separate loggers for processed files and failed updates
+
+		Args:
+			log_file: Path to the processed files log
+			failed_updates_log: Path to the failed updates log
+			append: Keep the entries of previous runs in the processed files log so they can be resumed
+		"""
 		# Create logs directory if it doesn't exist
 		logs_dir = os.path.dirname(log_file)
 		if not os.path.exists(logs_dir):
@@ -487,16 +479,18 @@ class MetadataService:
 
 		# Set up processed files logger
 		if not processed_logger.handlers:
-			file_handler = logging.FileHandler(log_file, mode='w')
+			write_header = not append or not os.path.exists(log_file) or os.path.getsize(log_file) == 0
+			file_handler = BufferedFileHandler(log_file, mode='a' if append else 'w')
 			file_handler.setFormatter(logging.Formatter('%(message)s'))
 			processed_logger.addHandler(file_handler)
 
 			# Write CSV header
-			processed_logger.info("source_file,target_file,match_method,similarity,date_modified")
+			if write_header:
+				processed_logger.info("source_file,target_file,match_method,similarity,date_modified")
 
 		# Set up failed updates logger
 		if not failed_updates_logger.handlers:
-			failed_file_handler = logging.FileHandler(failed_updates_log, mode='w')
+			failed_file_handler = BufferedFileHandler(failed_updates_log, mode='w')
 			failed_file_handler.setFormatter(logging.Formatter('%(message)s'))
 			failed_updates_logger.addHandler(failed_file_handler)
 
@@ -512,6 +506,31 @@ class MetadataService:
 		except Exception as e:
 			logger.error(f"Error logging processed file: {str(e)}")
 
+	@staticmethod
+	def load_processed_files(log_file: str) -> Set[str]:
+		"""
+		Load the target files recorded in the processed files log of previous runs
+
+		Args:
+			log_file: Path to the processed files log
+
+		Returns:
+			Set of target file paths that were already updated
+		"""
+		processed_files = set()
+		if not os.path.exists(log_file):
+			return processed_files
+		try:
+			with open(log_file, 'r', newline='') as f:
+				reader = csv.reader(f)
+				next(reader, None)  # Skip header
+				for row in reader:
+					if len(row) > 1:
+						processed_files.add(row[1])
+		except Exception as e:
+			logger.warning(f"Could not read processed files log {log_file}: {str(e)}")
+		return processed_files
+
 	@staticmethod
 	def log_failed_update(file_path: str, error_message: str):
 		"""Log a failed metadata update to the failed updates log"""
@@ -522,27 +541,103 @@ class MetadataService:
 			logger.error(f"Error logging failed update: {str(e)}")
 
 	@staticmethod
-	def find_metadata_pairs(old_dir: str, new_dir: str, use_hash_matching: bool = True, 
+	def pairs_cache_settings(new_dir: str, use_hash_matching: bool, similarity_threshold: float) -> Tuple[str, bool, float]:
+		"""
+		Settings the matches in the pairs cache depend on
+
+		Args:
+			new_dir: Directory with Apple Photos exports
+			use_hash_matching: Whether image hash matching is used
+			similarity_threshold: Threshold for considering images as matches
+
+		Returns:
+			Tuple stored with the cache; a cache saved with other settings is not used
+		"""
+		return os.path.abspath(new_dir), bool(use_hash_matching), float(similarity_threshold)
+
+	@staticmethod
+	def load_pairs_cache(cache_file: str = 'data/pairs_cache.pkl',
+						 settings: Optional[Tuple[str, bool, float]] = None) -> Dict[str, Tuple[int, int, str, PhotoMetadata]]:
+		"""
+		Load the cache of parsed and matched JSON files from a previous run
+
+		Args:
+			cache_file: Path to the cache file
+			settings: Settings of this run from pairs_cache_settings; the cache is
+				discarded if it was saved with different settings
+
+		Returns:
+			Dictionary mapping JSON paths to (mtime_ns, size, matched file, metadata)
+		"""
+		if not os.path.exists(cache_file):
+			return {}
+		try:
+			with open(cache_file, 'rb') as f:
+				cached = pickle.load(f)
+			if not isinstance(cached, dict) or not isinstance(cached.get('pairs'), dict):
+				logger.info(f"Ignoring metadata pairs cache {cache_file} in an old format")
+			elif cached.get('settings') != settings:
+				logger.info(f"Ignoring metadata pairs cache {cache_file} saved for another directory or other matching settings")
+			else:
+				pairs_cache = cached['pairs']
+				logger.info(f"Loaded {len(pairs_cache)} cached metadata pairs from {cache_file}")
+				return pairs_cache
+		except Exception as e:
+			logger.warning(f"Could not load metadata pairs cache {cache_file}: {str(e)}")
+		return {}
+
+	@staticmethod
+	def save_pairs_cache(pairs_cache: Dict[str, Tuple[int, int, str, PhotoMetadata]], cache_file: str = 'data/pairs_cache.pkl',
+						 settings: Optional[Tuple[str, bool, float]] = None) -> None:
+		"""
+		Save the cache of parsed and matched JSON files
+
+		Args:
+			pairs_cache: Dictionary mapping JSON paths to (mtime_ns, size, matched file, metadata)
+			cache_file: Path to the cache file
+			settings: Settings of this run from pairs_cache_settings, stored with the pairs
+		"""
+		try:
+			os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+			tmp_file = f"{cache_file}.tmp"
+			with open(tmp_file, 'wb') as f:
+				pickle.dump({'settings': settings, 'pairs': pairs_cache}, f, protocol=pickle.HIGHEST_PROTOCOL)
+			os.replace(tmp_file, cache_file)
+		except Exception as e:
+			logger.warning(f"Could not save metadata pairs cache {cache_file}: {str(e)}")
+
+	@staticmethod
+	def iter_metadata_pairs(old_dir: str, new_dir: str, use_hash_matching: bool = True,
 						   similarity_threshold: float = 0.98, duplicates_log: str = 'duplicates.log',
-						   skip_duplicates: bool = False) -> List[Tuple[str, str, PhotoMetadata]]:
+						   skip_duplicates: bool = False,
+						   pairs_cache: Optional[Dict[str, Tuple[int, int, str, PhotoMetadata]]] = None,
+						   match_info: Optional[Dict[str, Tuple[str, float]]] = None) -> Iterator[Tuple[str, str, PhotoMetadata]]:
 		"""
 		Find pairs of files between old and new directories with their metadata
 
+		Pairs are yielded as the JSON files are scanned, so the caller can start
+		applying metadata before the whole old directory has been matched.
+
 		Args:
 			old_dir: Directory with Google Takeout files
 			new_dir: Directory with Apple Photos exports
 			use_hash_matching: Whether to use image hash matching for more accurate results
 			similarity_threshold: Threshold for considering images as matches (0.0 to 1.0)
 			duplicates_log: Path to the log file for duplicates
-
-		Returns:
-			List of tuples (json_file, new_file, metadata)
+			pairs_cache: Optional cache from load_pairs_cache; JSON files whose mtime and size
+				are unchanged reuse the cached metadata and match, and new matches are added to it
+			match_info: Optional dictionary that receives (match_method, similarity) per JSON file;
+				when given, matches are not written to the processed files log here, so the caller
+				can log them once their metadata has actually been applied
+
+		Yields:
+			Tuples (json_file, new_file, metadata)
 		"""
 		# Set up the processed files logger
 		MetadataService.setup_processed_files_logger()
+		# Cached matches must be files of this new directory
+		new_dir_prefix = os.path.join(os.path.abspath(new_dir), '')
 
-		pairs = []
-		processed_count = 0
 		json_count = 0
 		match_count = 0
 		hash_match_count = 0
@@ -555,31 +650,32 @@ class MetadataService:
 
 		try:
 			# Walk through the new directory once and build both data structures
-			for root, _, files in os.walk(new_dir):
-				for file in files:
-					file_path = os.path.join(root, file)
-					if is_media_file(file_path):
-						# Add to list for hash matching
-						new_files_list.append(file_path)
-
-						# Add to dictionary for name matching
-						base_name = os.path.splitext(file)[0].lower()
-						new_files_dict[base_name] = file_path
-
-						# Also add with (1), (2) etc. removed for better matching
-						import re
-						clean_name = re.sub(r'\s*\(\d+\)$', '', base_name)
-						if clean_name != base_name:
-							new_files_dict[clean_name] = file_path
+			for entry in iter_media_entries(new_dir):
+				file_path = entry.path
+				# Add to list for hash matching
+				new_files_list.append(file_path)
+
+				# Add to dictionary for name matching
+				file_name = entry.name.lower()
+				base_name = os.path.splitext(file_name)[0]
+				new_files_dict[base_name] = file_path
+				new_files_dict.setdefault(file_name, file_path)
+
+				# Also add with (1), (2) etc. removed for better matching
+				clean_name = _DUPLICATE_SUFFIX_RE.sub('', base_name)
+				if clean_name != base_name:
+					new_files_dict[clean_name] = file_path
 
 			logger.info(f"Found {len(new_files_list)} media files in the new directory")
+			# For the prefix matching of truncated names
+			new_files_names = sorted(new_files_dict)
 
 			# Precompute hashes for all files in the new directory if using hash matching
 			if use_hash_matching:
 				logger.info("Precomputing hashes for files in the new directory...")
 
 				# Load existing hashes from cache file
-				hash_cache = load_image_hashes('data/image_hashes.csv')
+				hash_cache = load_image_hashes()
 				logger.info(f"Loaded {len(hash_cache)} hashes from cache")
 
 				# Identify files that need hash computation
@@ -594,6 +690,7 @@ class MetadataService:
 					# Compute hashes in parallel batches to avoid memory issues
 					batch_size = 500
 					new_hashes = {}
+					unsaved_hashes = {}
 
 					for i in range(0, len(files_to_hash), batch_size):
 						batch = files_to_hash[i:i+batch_size]
@@ -610,24 +707,26 @@ class MetadataService:
 									file_hash = future.result()
 									if file_hash:
 										new_hashes[file_path] = file_hash
+										unsaved_hashes[file_path] = file_hash
 										hash_cache[file_path] = file_hash
 								except Exception as e:
 									logger.debug(f"Error computing hash for {file_path}: {str(e)}")
 
 						if (i + batch_size) % 2000 == 0 or (i + batch_size) >= len(files_to_hash):
 							logger.info(f"Computed hashes for {min(i + batch_size, len(files_to_hash))} of {len(files_to_hash)} files")
-							# Save hashes periodically to avoid losing progress
-							save_image_hashes(hash_cache, 'data/image_hashes.csv')
+							# Journal the new hashes periodically to avoid losing progress
+							append_image_hashes(unsaved_hashes)
+							unsaved_hashes = {}
 
 					logger.info(f"Computed {len(new_hashes)} new hashes")
 					# Save all hashes to cache file
-					save_image_hashes(hash_cache, 'data/image_hashes.csv')
+					save_image_hashes(hash_cache)
 				else:
 					logger.info("All file hashes already cached, skipping hash computation")
 
 		except (PermissionError, FileNotFoundError) as e:
 			logger.error(f"Error accessing directory {new_dir}: {str(e)}")
-			return pairs
+			return
 
 		# Find and log duplicates in the new directory
 		if use_hash_matching:
@@ -658,77 +757,109 @@ class MetadataService:
 			else:
 				logger.info("No duplicates found")
 
-		# Walk through the old directory
-		for root, _, files in os.walk(old_dir):
-			for file in files:
-				processed_count += 1
-
-				# Log progress every 100 files
-				if processed_count % 100 == 0:
-					logger.info(f"Processed {processed_count} files, found {json_count} JSON files with {match_count} matches")
-
-				# Only process JSON metadata files
-				if file.endswith('.json') and ('.supplemental-metadata' in file or '.supplemental-meta' in file):
-					json_count += 1
-					json_file = os.path.join(root, file)
-
-					try:
-						# Parse the JSON file
-						metadata = MetadataService.parse_json_metadata(json_file)
-						if not metadata:
-							continue
-
-						# Get the base filename
-						base_name = get_base_filename(metadata.filename)
-
-						# Try to find the corresponding media file in the old directory
-						media_file = None
-						possible_media_file = json_file.replace('.supplemental-metadata.json', '').replace('.supplemental-meta.json', '')
-						if os.path.exists(possible_media_file) and is_media_file(possible_media_file):
-							media_file = possible_media_file
-
-						matching_file = None
-						similarity = 0.0
-						match_method = 'none'
-
-						# First try name matching (fastest)
-						base_name_lower = base_name.lower()
-						if base_name_lower in new_files_dict:
-							matching_file = new_files_dict[base_name_lower]
-							name_match_count += 1
-							match_method = 'name'
-							similarity = 1.0
-						# Then try hash matching if enabled and we have the media file
-						elif use_hash_matching and media_file:
-							matching_file = find_matching_file_by_hash(media_file, new_dir, similarity_threshold, new_files_list)
-							if matching_file:
-								hash_match_count += 1
-								match_method = 'hash'
-								similarity = similarity_threshold  # We don't have the exact similarity here
-
-						# If hash matching failed or is disabled, try name matching
-						if not matching_file:
-							matching_file = MetadataService.find_matching_file(json_file, new_dir)
-							if matching_file:
-								name_match_count += 1
-								match_method = 'name'
-
-						if matching_file:
-							match_count += 1
-							pairs.append((json_file, matching_file, metadata))
-
-							# Log the processed file
-							MetadataService.log_processed_file(json_file, matching_file, match_method, similarity)
+		# Walk through the JSON metadata files of the old directory
+		for json_file in _iter_json_files(old_dir):
+			json_count += 1
+
+			# Log progress every 100 JSON files
+			if json_count % 100 == 0:
+				logger.info(f"Processed {json_count} JSON files with {match_count} matches")
+
+			try:
+				# Reuse the parse and match of an unchanged JSON file from a previous run
+				if pairs_cache is not None:
+					json_stat = os.stat(json_file)
+					cached = pairs_cache.get(json_file)
+					if (cached and cached[0] == json_stat.st_mtime_ns and cached[1] == json_stat.st_size
+							and os.path.abspath(cached[2]).startswith(new_dir_prefix) and os.path.exists(cached[2])):
+						match_count += 1
+						# Recorded before the yield: the consumer may log the pair before the generator resumes
+						if match_info is not None:
+							match_info[json_file] = ('cache', 1.0)
 						else:
-							# Only log warnings for files with reasonable filenames
-							if len(base_name) > 3 and not base_name.startswith('.'): 
-								logger.warning(f"No matching file found for {base_name}")
-					except Exception as e:
-						logger.error(f"Error processing {json_file}: {str(e)}")
+							MetadataService.log_processed_file(json_file, cached[2], 'cache', 1.0)
+						yield json_file, cached[2], cached[3]
+						continue
+
+				# Parse the JSON file
+				metadata = MetadataService.parse_json_metadata(json_file)
+				if not metadata:
+					continue
+
+				# Get the base filename
+				base_name = get_base_filename(metadata.filename)
+
+				# Try to find the corresponding media file in the old directory
+				media_file = None
+				possible_media_file = json_file.replace('.supplemental-metadata.json', '').replace('.supplemental-meta.json', '')
+				if os.path.exists(possible_media_file) and is_media_file(possible_media_file):
+					media_file = possible_media_file
+
+				matching_file = None
+				similarity = 0.0
+				match_method = 'none'
+
+				# First try name matching (fastest)
+				base_name_lower = base_name.lower()
+				if base_name_lower in new_files_dict:
+					matching_file = new_files_dict[base_name_lower]
+					name_match_count += 1
+					match_method = 'name'
+					similarity = 1.0
+				# Then try hash matching if enabled and we have the media file
+				elif use_hash_matching and media_file:
+					matching_file = find_matching_file_by_hash(media_file, new_dir, similarity_threshold, new_files_list)
+					if matching_file:
+						hash_match_count += 1
+						match_method = 'hash'
+						similarity = similarity_threshold  # We don't have the exact similarity here
+
+				# If hash matching failed or is disabled, try name matching
+				if not matching_file:
+					matching_file = _find_by_name(new_files_dict, new_files_names, json_file)
+					if matching_file:
+						name_match_count += 1
+						match_method = 'name'
+
+				if matching_file:
+					match_count += 1
+					if pairs_cache is not None:
+						pairs_cache[json_file] = (json_stat.st_mtime_ns, json_stat.st_size, matching_file, metadata)
+
+					# Log the processed file; before the yield, as the consumer may use match_info right away
+					if match_info is not None:
+						match_info[json_file] = (match_method, similarity)
+					else:
+						MetadataService.log_processed_file(json_file, matching_file, match_method, similarity)
+					yield json_file, matching_file, metadata
+				else:
+					# Only log warnings for files with reasonable filenames
+					if len(base_name) > 3 and not base_name.startswith('.'): 
+						logger.warning(f"No matching file found for {base_name}")
+			except Exception as e:
+				logger.error(f"Error processing {json_file}: {str(e)}")
 
 		logger.info(f"Finished processing. Found {match_count} matches out of {json_count} JSON files")
 		logger.info(f"Match methods: {hash_match_count} by hash, {name_match_count} by name")
-		return pairs
+
+	@staticmethod
+	def find_metadata_pairs(old_dir: str, new_dir: str, use_hash_matching: bool = True,
+						   similarity_threshold: float = 0.98, duplicates_log: str = 'duplicates.log',
+						   skip_duplicates: bool = False,
+						   pairs_cache: Optional[Dict[str, Tuple[int, int, str, PhotoMetadata]]] = None,
+						   match_info: Optional[Dict[str, Tuple[str, float]]] = None) -> List[Tuple[str, str, PhotoMetadata]]:
+		"""
+		Find all pairs of files between old and new directories with their metadata
+
+		See iter_metadata_pairs for the arguments.
+
+		Returns:
+			List of tuples (json_file, new_file, metadata)
+		"""
+		return list(MetadataService.iter_metadata_pairs(
+			old_dir, new_dir, use_hash_matching, similarity_threshold, duplicates_log,
+			skip_duplicates, pairs_cache, match_info
+		))
 
 	@staticmethod
 	def apply_metadata_to_file(json_path: str, target_file: str, dry_run: bool = False) -> bool:
@@ -754,8 +885,9 @@ class MetadataService:
 		# Convert metadata to exiftool arguments
 		exif_args = metadata.to_exiftool_args()
 
-		# Apply metadata to the target file
-		if ExifToolService.apply_metadata(target_file, exif_args, dry_run):
+		# Apply metadata to the target file through the shared exiftool process
+		session = None if dry_run else ExifToolService.shared_session()
+		if ExifToolService.apply_metadata(target_file, exif_args, dry_run, session):
 			logger.info(f"Successfully applied metadata to {target_file}")
 			return True
 		else:
@@ -774,21 +906,42 @@ class MetadataService:
 		Returns:
 			Tuple of (total processed, successful)
 		"""
+		from src.services.exiftool_service import ExifToolService
+
 		processed = 0
 		successful = 0
+		progress_step = max(1, len(pairs) // 100)
+
+		# Write the files in batches of METADATA_BATCH_SIZE, one exiftool run per batch
+		# and several runs at a time (exiftool uses one core); files a run could not
+		# update go through apply_metadata_to_file with its per-type handling and retries
+		updated = set()
+		if not dry_run and pairs:
+			def write_batch(batch: List[Tuple[str, str]]) -> Set[str]:
+				items = []
+				for json_path, target_file in batch:
+					metadata = MetadataService.extract_metadata_from_json(json_path)
+					if metadata:
+						items.append((target_file, metadata.to_exiftool_args()))
+				return ExifToolService.apply_metadata_batch(items)
+
+			batches = [pairs[i:i + METADATA_BATCH_SIZE] for i in range(0, len(pairs), METADATA_BATCH_SIZE)]
+			with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(batches), os.cpu_count() or 1)) as executor:
+				for batch_updated in executor.map(write_batch, batches):
+					updated.update(batch_updated)
 
 		for json_path, target_file in pairs:
 			processed += 1
 
-			# Log progress every 10 files
-			if processed % 10 == 0:
+			# Log progress every 1%
+			if processed % progress_step == 0:
 				logger.info(f"Processed {processed} of {len(pairs)} files, {successful} successful")
 
 			# Apply metadata to the target file
 			if dry_run:
 				logger.info(f"[DRY RUN] Would apply metadata to {target_file}")
 				successful += 1
-			elif MetadataService.apply_metadata_to_file(json_path, target_file):
+			elif target_file in updated or MetadataService.apply_metadata_to_file(json_path, target_file):
 				successful += 1
 
 		logger.info(f"Finished processing {processed} files, {successful} successful")
@@ -815,7 +968,6 @@ class MetadataService:
 
 				# Clean up the filename
 				# Remove any invalid characters
-				import re
 				original_filename = re.sub(r'[<>:"/\\|?*]', '_', original_filename)
 
 				# Ensure the filename has an extension
@@ -925,12 +1077,13 @@ class MetadataService:
 		"""
 		processed = 0
 		successful = 0
+		progress_step = max(1, len(pairs) // 100)
 
 		for json_path, file_path, _ in pairs:
 			processed += 1
 
-			# Log progress every 10 files
-			if processed % 10 == 0:
+			# Log progress every 1%
+			if processed % progress_step == 0:
 				logger.info(f"Processed {processed} of {len(pairs)} files, {successful} successful")
 
 			# Rename the file
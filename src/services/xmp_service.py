@@ -0,0 +1,129 @@
+"""
+Service for writing XMP sidecar files
+"""
+import os
+import logging
+import tempfile
+from typing import Optional
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+XMP_TEMPLATE = """<?xpacket begin='\ufeff' id='W5M0MpCehiHzreSzNTczkc9d'?>
+<x:xmpmeta xmlns:x='adobe:ns:meta/'>
+<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'>
+ <rdf:Description rdf:about=''
+  xmlns:exif='http://ns.adobe.com/exif/1.0/'
+  xmlns:xmp='http://ns.adobe.com/xap/1.0/'
+  xmlns:dc='http://purl.org/dc/elements/1.1/'>
+{properties}
+ </rdf:Description>
+</rdf:RDF>
+</x:xmpmeta>
+<?xpacket end='w'?>
+"""
+
+
+class XmpService:
+	"""Service for writing XMP sidecar files without calling exiftool"""
+
+	@staticmethod
+	def format_date(date_str: str) -> str:
+		"""
+		Convert an EXIF date string to the XMP date format
+
+		Args:
+			date_str: Date in 'YYYY:MM:DD HH:MM:SS' format
+
+		Returns:
+			Date in 'YYYY-MM-DDTHH:MM:SS' format
+		"""
+		return f"{date_str[:10].replace(':', '-')}T{date_str[11:]}"
+
+	@staticmethod
+	def format_gps(value: float, positive_ref: str, negative_ref: str) -> str:
+		"""
+		Convert a decimal coordinate to the XMP 'DDD,MM.mmmmR' format
+
+		Args:
+			value: Coordinate in decimal degrees
+			positive_ref: Reference letter for positive values (N or E)
+			negative_ref: Reference letter for negative values (S or W)
+
+		Returns:
+			Coordinate string as written by exiftool to XMP-exif:GPSLatitude/GPSLongitude
+		"""
+		ref = positive_ref if value >= 0 else negative_ref
+		value = abs(value)
+		degrees = int(value)
+		minutes = f"{(value - degrees) * 60:.8f}".rstrip('0').rstrip('.')
+		return f"{degrees},{minutes}{ref}"
+
+	@staticmethod
+	def build_xmp(date_str: str, latitude: Optional[float] = None, longitude: Optional[float] = None,
+				title: Optional[str] = None, description: Optional[str] = None) -> str:
+		"""
+		Build the XMP document for a sidecar
+
+		Args:
+			date_str: Date in 'YYYY:MM:DD HH:MM:SS' format
+			latitude: GPS latitude in decimal degrees
+			longitude: GPS longitude in decimal degrees
+			title: Title of the photo
+			description: Description of the photo
+
+		Returns:
+			XMP document as a string
+		"""
+		xmp_date = XmpService.format_date(date_str)
+		properties = [
+			f"  <exif:DateTimeOriginal>{xmp_date}</exif:DateTimeOriginal>",
+			f"  <xmp:CreateDate>{xmp_date}</xmp:CreateDate>",
+			f"  <xmp:ModifyDate>{xmp_date}</xmp:ModifyDate>"
+		]
+		if latitude is not None:
+			properties.append(f"  <exif:GPSLatitude>{XmpService.format_gps(latitude, 'N', 'S')}</exif:GPSLatitude>")
+		if longitude is not None:
+			properties.append(f"  <exif:GPSLongitude>{XmpService.format_gps(longitude, 'E', 'W')}</exif:GPSLongitude>")
+		for tag, text in (('title', title), ('description', description)):
+			if text:
+				properties.append(
+					f"  <dc:{tag}><rdf:Alt><rdf:li xml:lang='x-default'>{escape(text)}</rdf:li></rdf:Alt></dc:{tag}>"
+				)
+		return XMP_TEMPLATE.format(properties="\n".join(properties))
+
+	@staticmethod
+	def write_sidecar(sidecar_path: str, date_str: str, latitude: Optional[float] = None,
+					longitude: Optional[float] = None, title: Optional[str] = None,
+					description: Optional[str] = None) -> bool:
+		"""
+		Write an XMP sidecar atomically (temporary file + rename)
+
+		Args:
+			sidecar_path: Path of the sidecar to write
+			date_str: Date in 'YYYY:MM:DD HH:MM:SS' format
+			latitude: GPS latitude in decimal degrees
+			longitude: GPS longitude in decimal degrees
+			title: Title of the photo
+			description: Description of the photo
+
+		Returns:
+			True if the sidecar was written, False otherwise
+		"""
+		content = XmpService.build_xmp(date_str, latitude, longitude, title, description).encode('utf-8')
+		directory = os.path.dirname(os.path.abspath(sidecar_path))
+		tmp_path = None
+		try:
+			fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.xmp.tmp')
+			# A file object writes all of the content; os.write may stop after part of it
+			with os.fdopen(fd, 'wb') as f:
+				# mkstemp creates the file as 0600; sidecars should be readable like exiftool's
+				os.fchmod(f.fileno(), 0o644)
+				f.write(content)
+			os.replace(tmp_path, sidecar_path)
+			return True
+		except OSError as e:
+			logger.error(f"Error writing XMP sidecar {sidecar_path}: {str(e)}")
+			if tmp_path and os.path.exists(tmp_path):
+				os.remove(tmp_path)
+			return False
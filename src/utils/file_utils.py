@@ -3,9 +3,52 @@ Utility functions for file operations
 """
 import os
 import re
-from pathlib import Path
+from datetime import datetime
 from typing import Optional, List, Tuple
 
+# Try to use RE2 (linear-time DFA matching) for the filename patterns
+HAS_RE2 = False
+try:
+	import re2
+	HAS_RE2 = True
+except ImportError:
+	pass
+
+
+def _compile(pattern: str):
+	"""
+	Compile a filename pattern with RE2 when available, falling back to the stdlib engine
+	
+	Args:
+		pattern: Regular expression (flags must be inline, e.g. (?i))
+		
+	Returns:
+		Compiled pattern object exposing match()/search()
+	"""
+	if HAS_RE2:
+		try:
+			return re2.compile(pattern)
+		except Exception:
+			pass
+	return re.compile(pattern)
+
+
+# Precompiled filename patterns
+_EDITED_RE = _compile(r'(.+)(\(\d+\))(\..+)')
+_UUID_RE = _compile(r'(?i)^[0-9A-F]{8}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{12}(_\d+)*(_\d+)*(_[a-z])*\.[a-zA-Z0-9]+$')
+_IMG_DATE_RE = _compile(r'(?i)IMG-([0-9]{4})([0-9]{2})([0-9]{2}).*\..+')
+_PHOTO_DATE_TIME_RE = _compile(r'photo_([0-9]{4}-[0-9]{2}-[0-9]{2})_([0-9]{2}-[0-9]{2}-[0-9]{2})\..+')
+_PHOTO_N_DATE_TIME_RE = _compile(r'photo_\d+_([0-9]{4}-[0-9]{2}-[0-9]{2})_([0-9]{2}-[0-9]{2}-[0-9]{2})\..+')
+_DATE_TIME_RE = _compile(r'([0-9]{4}-[0-9]{2}-[0-9]{2})_([0-9]{2}-[0-9]{2}-[0-9]{2}).*\..+')
+_DATE_SPACE_RE = _compile(r'([0-9]{4}-[0-9]{2}-[0-9]{2}) ([0-9]{2}\.[0-9]{2}\.[0-9]{2})\..+')
+_DATE_TIME_COMPACT_RE = _compile(r'([0-9]{8})_([0-9]{6}).*\..+')
+_WHATSAPP_RE = _compile(r'(?i)(?:IMG|VID)-([0-9]{4})([0-9]{2})([0-9]{2})-WA[0-9]+\..+')
+_SCREENSHOT_RE = _compile(r'(?i)Screenshot_([0-9]{8})-([0-9]{6}).*\..+')
+_GOOGLE_IMG_RE = _compile(r'(?i)(?:IMG|VID)([0-9]{4})([0-9]{2})([0-9]{2})([0-9]{6})(?:_[0-9]+)?\..+')
+_IMG_UNDERSCORE_RE = _compile(r'(?i)IMG_([0-9]{8})_([0-9]{6})(?:_\d+)?\..+')
+_CAMPHOTO_RE = _compile(r'(?i)camphoto_([0-9]{10})(?:\(\d+\))?\..+')
+_ANY_DATE_RE = _compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})')
+
 
 def get_base_filename(file_path: str) -> str:
 	"""
@@ -21,7 +64,7 @@ def get_base_filename(file_path: str) -> str:
 	filename = os.path.basename(file_path)
 	
 	# Handle edited files (filename(1).jpg)
-	edited_match = re.match(r'(.+)(\(\d+\))(\..+)', filename)
+	edited_match = _EDITED_RE.match(filename)
 	if edited_match:
 		return edited_match.group(1).strip()
 	
@@ -44,8 +87,7 @@ def is_uuid_filename(filename: str) -> bool:
 		True if the filename follows the UUID pattern, False otherwise
 	"""
 	# UUID pattern: 8-4-4-4-12 hex digits, possibly followed by modifiers
-	uuid_pattern = re.compile(r'^[0-9A-F]{8}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{12}(_\d+)*(_\d+)*(_[a-z])*\.[a-zA-Z0-9]+$', re.IGNORECASE)
-	return bool(uuid_pattern.match(filename))
+	return bool(_UUID_RE.match(filename))
 
 
 def are_duplicate_filenames(filename1: str, filename2: str) -> bool:
@@ -84,70 +126,64 @@ def extract_date_from_filename(file_path: str) -> Optional[Tuple[str, str]]:
 	"""
 	filename = os.path.basename(file_path)
 	# IMG-YYYYMMDD pattern
-	img_date_match = re.match(r'IMG-([0-9]{4})([0-9]{2})([0-9]{2}).*\..+', filename, re.IGNORECASE)
+	img_date_match = _IMG_DATE_RE.match(filename)
 	if img_date_match:
 		year, month, day = img_date_match.group(1), img_date_match.group(2), img_date_match.group(3)
 		try:
-			from datetime import datetime
 			datetime(int(year), int(month), int(day))
 			return f"{year}:{month}:{day}", "IMG-YYYYMMDD pattern"
 		except ValueError:
 			pass
 	# photo_YYYY-MM-DD_HH-MM-SS
-	photo_date_time_match = re.match(r'photo_([0-9]{4}-[0-9]{2}-[0-9]{2})_([0-9]{2}-[0-9]{2}-[0-9]{2})\..+', filename)
+	photo_date_time_match = _PHOTO_DATE_TIME_RE.match(filename)
 	if photo_date_time_match:
 		date_str = photo_date_time_match.group(1)
 		time_str = photo_date_time_match.group(2).replace('-', ':')
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{date_str} {time_str}", '%Y-%m-%d %H:%M:%S')
 			year, month, day = date_str.split('-')
 			return f"{year}:{month}:{day}", "photo_YYYY-MM-DD_HH-MM-SS pattern"
 		except ValueError:
 			pass
 	# photo_N_YYYY-MM-DD_HH-MM-SS
-	photo_n_date_time_match = re.match(r'photo_\d+_([0-9]{4}-[0-9]{2}-[0-9]{2})_([0-9]{2}-[0-9]{2}-[0-9]{2})\..+', filename)
+	photo_n_date_time_match = _PHOTO_N_DATE_TIME_RE.match(filename)
 	if photo_n_date_time_match:
 		date_str = photo_n_date_time_match.group(1)
 		time_str = photo_n_date_time_match.group(2).replace('-', ':')
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{date_str} {time_str}", '%Y-%m-%d %H:%M:%S')
 			year, month, day = date_str.split('-')
 			return f"{year}:{month}:{day}", "photo_N_YYYY-MM-DD_HH-MM-SS pattern"
 		except ValueError:
 			pass
 	# YYYY-MM-DD_HH-MM-SS
-	date_time_match = re.match(r'([0-9]{4}-[0-9]{2}-[0-9]{2})_([0-9]{2}-[0-9]{2}-[0-9]{2}).*\..+', filename)
+	date_time_match = _DATE_TIME_RE.match(filename)
 	if date_time_match:
 		date_str = date_time_match.group(1)
 		time_str = date_time_match.group(2).replace('-', ':')
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{date_str} {time_str}", '%Y-%m-%d %H:%M:%S')
 			year, month, day = date_str.split('-')
 			return f"{year}:{month}:{day}", "YYYY-MM-DD_HH-MM-SS pattern"
 		except ValueError:
 			pass
 	# YYYY-MM-DD HH.MM.SS
-	date_space_match = re.match(r'([0-9]{4}-[0-9]{2}-[0-9]{2}) ([0-9]{2}\.[0-9]{2}\.[0-9]{2})\..+', filename)
+	date_space_match = _DATE_SPACE_RE.match(filename)
 	if date_space_match:
 		date_str = date_space_match.group(1)
 		time_str = date_space_match.group(2).replace('.', ':')
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{date_str} {time_str}", '%Y-%m-%d %H:%M:%S')
 			year, month, day = date_str.split('-')
 			return f"{year}:{month}:{day}", "YYYY-MM-DD HH.MM.SS pattern"
 		except ValueError:
 			pass
 	# YYYYMMDD_HHMMSS
-	date_time_compact_match = re.match(r'([0-9]{8})_([0-9]{6}).*\..+', filename)
+	date_time_compact_match = _DATE_TIME_COMPACT_RE.match(filename)
 	if date_time_compact_match:
 		date_str = date_time_compact_match.group(1)
 		time_str = date_time_compact_match.group(2)
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{date_str} {time_str}", '%Y%m%d %H%M%S')
 			year = date_str[0:4]
 			month = date_str[4:6]
@@ -156,22 +192,20 @@ def extract_date_from_filename(file_path: str) -> Optional[Tuple[str, str]]:
 		except ValueError:
 			pass
 	# WhatsApp IMG/VID-YYYYMMDD-WA
-	whatsapp_match = re.match(r'(?:IMG|VID)-([0-9]{4})([0-9]{2})([0-9]{2})-WA[0-9]+\..+', filename, re.IGNORECASE)
+	whatsapp_match = _WHATSAPP_RE.match(filename)
 	if whatsapp_match:
 		year, month, day = whatsapp_match.group(1), whatsapp_match.group(2), whatsapp_match.group(3)
 		try:
-			from datetime import datetime
 			datetime(int(year), int(month), int(day))
 			return f"{year}:{month}:{day}", "WhatsApp pattern"
 		except ValueError:
 			pass
 	# Screenshot_YYYYMMDD-HHMMSS
-	screenshot_match = re.match(r'Screenshot_([0-9]{8})-([0-9]{6}).*\..+', filename, re.IGNORECASE)
+	screenshot_match = _SCREENSHOT_RE.match(filename)
 	if screenshot_match:
 		date_str = screenshot_match.group(1)
 		time_str = screenshot_match.group(2)
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{date_str} {time_str}", '%Y%m%d %H%M%S')
 			year = date_str[0:4]
 			month = date_str[4:6]
@@ -180,23 +214,21 @@ def extract_date_from_filename(file_path: str) -> Optional[Tuple[str, str]]:
 		except ValueError:
 			pass
 	# Google Takeout IMG20210503102138.jpg
-	google_img_match = re.match(r'(?:IMG|VID)([0-9]{4})([0-9]{2})([0-9]{2})([0-9]{6})(?:_[0-9]+)?\..+', filename, re.IGNORECASE)
+	google_img_match = _GOOGLE_IMG_RE.match(filename)
 	if google_img_match:
 		year, month, day = google_img_match.group(1), google_img_match.group(2), google_img_match.group(3)
 		time_str = google_img_match.group(4)
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{year}{month}{day} {time_str}", '%Y%m%d %H%M%S')
 			return f"{year}:{month}:{day}", "Google Takeout pattern"
 		except ValueError:
 			pass
 	# IMG_YYYYMMDD_HHMMSS
-	img_underscore_match = re.match(r'IMG_([0-9]{8})_([0-9]{6})(?:_\d+)?\..+', filename, re.IGNORECASE)
+	img_underscore_match = _IMG_UNDERSCORE_RE.match(filename)
 	if img_underscore_match:
 		date_str = img_underscore_match.group(1)
 		time_str = img_underscore_match.group(2)
 		try:
-			from datetime import datetime
 			date_obj = datetime.strptime(f"{date_str} {time_str}", '%Y%m%d %H%M%S')
 			year = date_str[0:4]
 			month = date_str[4:6]
@@ -205,21 +237,19 @@ def extract_date_from_filename(file_path: str) -> Optional[Tuple[str, str]]:
 		except ValueError:
 			pass
 	# camphoto_TIMESTAMP
-	camphoto_match = re.match(r'camphoto_([0-9]{10})(?:\(\d+\))?\..+', filename, re.IGNORECASE)
+	camphoto_match = _CAMPHOTO_RE.match(filename)
 	if camphoto_match:
 		timestamp = int(camphoto_match.group(1))
 		try:
-			from datetime import datetime
 			dt = datetime.fromtimestamp(timestamp)
 			return f"{dt.year}:{dt.month:02d}:{dt.day:02d}", "camphoto_TIMESTAMP pattern"
 		except Exception:
 			pass
 	# YYYY-MM-DD в кириллических названиях
-	cyrillic_date_match = re.search(r'([0-9]{4})-([0-9]{2})-([0-9]{2})', filename)
+	cyrillic_date_match = _ANY_DATE_RE.search(filename)
 	if cyrillic_date_match:
 		year, month, day = cyrillic_date_match.group(1), cyrillic_date_match.group(2), cyrillic_date_match.group(3)
 		try:
-			from datetime import datetime
 			datetime(int(year), int(month), int(day))
 			return f"{year}:{month}:{day}", "Cyrillic filename with date pattern"
 		except Exception:
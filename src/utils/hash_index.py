@@ -0,0 +1,155 @@
+"""
+Index of perceptual image hashes for near-duplicate lookups
+"""
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Try to use numpy to compare a hash against the whole index in one vectorized pass
+HAS_NUMPY = False
+try:
+	import numpy as np
+	HAS_NUMPY = True
+except ImportError:
+	pass
+
+# str(imagehash.phash(img)) with the default hash_size of 8: 64 bits as 16 hex digits
+PHASH_HEX_LENGTH = 16
+PHASH_BITS = 64
+
+
+def is_phash(file_hash: str) -> bool:
+	"""Check if a hash is a 64-bit perceptual hash (and not a file or content hash)"""
+	if len(file_hash) != PHASH_HEX_LENGTH:
+		return False
+	try:
+		int(file_hash, 16)
+		return True
+	except ValueError:
+		return False
+
+
+def max_distance_for(similarity_threshold: float) -> int:
+	"""
+	Convert a similarity threshold to the largest Hamming distance between two 64-bit hashes
+
+	Args:
+		similarity_threshold: Threshold for considering images as matches (0.0 to 1.0)
+
+	Returns:
+		Number of differing bits still considered a match
+	"""
+	return max(0, int((1.0 - similarity_threshold) * PHASH_BITS))
+
+
+class HashIndex:
+	"""
+	Lookup of files by hash that also finds perceptual hashes within a Hamming distance
+
+	Every hash is looked up exactly first. Perceptual hashes without an exact match
+	are then compared against all indexed perceptual hashes; with numpy this is a
+	single XOR + popcount over a uint64 array instead of a Python loop.
+	"""
+
+	def __init__(self, hashes: Dict[str, str], max_distance: int = 0):
+		"""
+		Build the index
+
+		Args:
+			hashes: Dictionary mapping file paths to hash values
+			max_distance: Largest number of differing bits for a perceptual match
+		"""
+		self.max_distance = max_distance
+		self.exact: Dict[str, str] = {}
+		self.paths: List[str] = []
+		values = []
+		for file_path, file_hash in hashes.items():
+			if not file_hash:
+				continue
+			self.exact.setdefault(file_hash, file_path)
+			if is_phash(file_hash):
+				self.paths.append(file_path)
+				values.append(int(file_hash, 16))
+
+		if HAS_NUMPY:
+			self.values = np.array(values, dtype=np.uint64)
+			# Sorted copy for batched exact lookups with searchsorted
+			self.sorted_values = np.sort(self.values)
+		else:
+			self.values = values
+		logger.debug(f"Indexed {len(self.exact)} hashes ({len(self.paths)} perceptual)")
+
+	def __len__(self) -> int:
+		return len(self.exact)
+
+	def contains_many(self, file_hashes: List[Optional[str]]) -> List[bool]:
+		"""
+		Check which hashes are in the index exactly
+
+		With numpy, the perceptual hashes are looked up together with one
+		searchsorted over the sorted uint64 array instead of one dict probe each.
+
+		Args:
+			file_hashes: Hashes to look up (None for files without a hash)
+
+		Returns:
+			List of flags, True where the same hash is in the index
+		"""
+		if not HAS_NUMPY or not len(self.sorted_values):
+			return [bool(file_hash) and file_hash in self.exact for file_hash in file_hashes]
+
+		found = [False] * len(file_hashes)
+		phash_positions = []
+		for i, file_hash in enumerate(file_hashes):
+			if not file_hash:
+				continue
+			if is_phash(file_hash):
+				phash_positions.append(i)
+			else:
+				found[i] = file_hash in self.exact
+
+		if phash_positions:
+			needles = np.fromiter((int(file_hashes[i], 16) for i in phash_positions), dtype=np.uint64, count=len(phash_positions))
+			positions = np.minimum(np.searchsorted(self.sorted_values, needles), len(self.sorted_values) - 1)
+			hits = self.sorted_values[positions] == needles
+			for i, hit in zip(phash_positions, hits.tolist()):
+				found[i] = hit
+		return found
+
+	def find(self, file_hash: str) -> Optional[str]:
+		"""
+		Find the indexed file with the same or the closest matching hash
+
+		Args:
+			file_hash: Hash to look up
+
+		Returns:
+			Path of the matching file or None if there is no match
+		"""
+		if not file_hash:
+			return None
+		file_path = self.exact.get(file_hash)
+		if file_path is not None or self.max_distance <= 0 or not self.paths or not is_phash(file_hash):
+			return file_path
+
+		needle = int(file_hash, 16)
+		if HAS_NUMPY:
+			xored = self.values ^ np.uint64(needle)
+			if hasattr(np, 'bitwise_count'):
+				distances = np.bitwise_count(xored)
+			else:
+				# numpy < 2.0 has no popcount ufunc
+				distances = np.unpackbits(xored.view(np.uint8)).reshape(-1, PHASH_BITS).sum(axis=1)
+			best = int(np.argmin(distances))
+			if distances[best] <= self.max_distance:
+				return self.paths[best]
+			return None
+
+		best_path = None
+		best_distance = self.max_distance + 1
+		for path, value in zip(self.paths, self.values):
+			distance = bin(needle ^ value).count('1')
+			if distance < best_distance:
+				best_path, best_distance = path, distance
+		return best_path
@@ -2,27 +2,65 @@
 Utility functions for image processing, hashing and duplicate detection
 """
 import os
+import re
 import csv
+import json
 import logging
+import pickle
 import hashlib
+import importlib.util
 import concurrent.futures
-from typing import Dict, List, Tuple, Set, Optional
-from pathlib import Path
+from collections import defaultdict
+from typing import Dict, List, Tuple, Set, Optional, Iterator, Any
 
 logger = logging.getLogger(__name__)
 
-# Try to import optional dependencies
-HAS_IMAGE_HASH = False
+# Check for optional dependencies without importing them; Pillow and imagehash
+# (with numpy/scipy) take a noticeable time to import and are only needed for hashing
+HAS_IMAGE_HASH = importlib.util.find_spec('imagehash') is not None and importlib.util.find_spec('PIL') is not None
+if not HAS_IMAGE_HASH:
+	logger.warning("imagehash or Pillow not installed. Using basic file matching instead of image hash matching.")
+
+# Try to use xxHash (XXH3, non-cryptographic) or BLAKE3 (SIMD C/Rust implementation)
+# for content hashes; both run several times faster than hashlib
+HAS_XXHASH = False
 try:
-	import imagehash
-	from PIL import Image, UnidentifiedImageError
-	HAS_IMAGE_HASH = True
+	import xxhash
+	HAS_XXHASH = True
 except ImportError:
-	logger.warning("imagehash or Pillow not installed. Using basic file matching instead of image hash matching.")
+	pass
+
+HAS_BLAKE3 = False
+try:
+	import blake3
+	HAS_BLAKE3 = True
+except ImportError:
+	pass
+
+imagehash = None
+Image = None
+UnidentifiedImageError = OSError
+
+
+def _import_image_hash() -> None:
+	"""Import imagehash and Pillow on first use"""
+	global imagehash, Image, UnidentifiedImageError
+	if imagehash is None:
+		import imagehash as _imagehash
+		from PIL import Image as _Image, UnidentifiedImageError as _UnidentifiedImageError
+		imagehash, Image, UnidentifiedImageError = _imagehash, _Image, _UnidentifiedImageError
+
+# Perceptual/content hashes of media files, shared by all commands
+HASH_CACHE_FILE = 'data/image_hashes.pkl'
 
 # Supported image formats
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.tiff', '.tif', '.bmp', '.gif'}
-VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.wmv', '.m4v', '.3gp'}
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.wmv', '.m4v', '.3gp', '.mpg', '.mpeg'}
+
+MEDIA_EXTENSIONS = frozenset(IMAGE_EXTENSIONS | VIDEO_EXTENSIONS)
+
+# Number of directories listed at the same time by scan_media_entries
+SCAN_WORKERS = 8
 
 def is_image_file(file_path: str) -> bool:
 	"""Check if a file is an image based on its extension"""
@@ -36,7 +74,87 @@ def is_video_file(file_path: str) -> bool:
 
 def is_media_file(file_path: str) -> bool:
 	"""Check if a file is a media file (image or video)"""
-	return is_image_file(file_path) or is_video_file(file_path)
+	return os.path.splitext(file_path)[1].lower() in MEDIA_EXTENSIONS
+
+def iter_media_entries(directory: str) -> Iterator[os.DirEntry]:
+	"""Recursively yield the media files of a directory
+	
+	Uses os.scandir so that the file type comes from the directory entry
+	instead of a separate stat() call per file, and checks the extension on
+	the entry name that is already in memory.
+	
+	Args:
+		directory: Directory to scan
+		
+	Yields:
+		os.DirEntry for each media file
+	"""
+	stack = [directory]
+	while stack:
+		path = stack.pop()
+		try:
+			with os.scandir(path) as entries:
+				for entry in entries:
+					if entry.is_dir(follow_symlinks=False):
+						stack.append(entry.path)
+					else:
+						# Inline extension check on the name; the entry is only typed if it could be media
+						name, dot, ext = entry.name.rpartition('.')
+						if dot and name and dot + ext.lower() in MEDIA_EXTENSIONS and entry.is_file(follow_symlinks=False):
+							yield entry
+		except OSError as e:
+			logger.error(f"Error scanning {path}: {str(e)}")
+
+def _scan_media_dir(path: str, stat: bool) -> Tuple[List[os.DirEntry], List[str]]:
+	"""List one directory for scan_media_entries: its media files and its subdirectories"""
+	files = []
+	subdirs = []
+	try:
+		with os.scandir(path) as entries:
+			for entry in entries:
+				if entry.is_dir(follow_symlinks=False):
+					subdirs.append(entry.path)
+				else:
+					name, dot, ext = entry.name.rpartition('.')
+					if dot and name and dot + ext.lower() in MEDIA_EXTENSIONS and entry.is_file(follow_symlinks=False):
+						if stat:
+							try:
+								# Cached on the entry, so later entry.stat() calls are free
+								entry.stat()
+							except OSError:
+								pass
+						files.append(entry)
+	except OSError as e:
+		logger.error(f"Error scanning {path}: {str(e)}")
+	return files, subdirs
+
+
+def scan_media_entries(directory: str, max_workers: int = SCAN_WORKERS, stat: bool = False) -> List[os.DirEntry]:
+	"""Recursively list the media files of a directory with several threads
+	
+	Like iter_media_entries, but the directories of each level of the tree are
+	listed concurrently: scandir and stat release the GIL, so on network storage
+	or a deep album tree the listings overlap instead of waiting on each other.
+	
+	Args:
+		directory: Directory to scan
+		max_workers: Number of directories listed at the same time
+		stat: If True, also stat every media file in the worker threads
+		
+	Returns:
+		List of os.DirEntry for each media file
+	"""
+	media_entries = []
+	level = [directory]
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+		while level:
+			next_level = []
+			for files, subdirs in executor.map(_scan_media_dir, level, [stat] * len(level)):
+				media_entries.extend(files)
+				next_level.extend(subdirs)
+			level = next_level
+	return media_entries
+
 
 def is_uuid_filename(filename: str) -> bool:
 	"""Check if a filename follows the UUID pattern
@@ -48,7 +166,6 @@ def is_uuid_filename(filename: str) -> bool:
 		True if the filename follows the UUID pattern, False otherwise
 	"""
 	# UUID pattern: 8-4-4-4-12 hexadecimal characters
-	import re
 	# Extract the base name without extension
 	base_name = os.path.splitext(os.path.basename(filename))[0]
 	# UUID pattern regex
@@ -71,7 +188,6 @@ def are_duplicate_filenames(filename1: str, filename2: str) -> bool:
 	
 	# Check if one filename is a suffix version of the other
 	# e.g., IMG_1234.jpg and IMG_1234 (1).jpg
-	import re
 	suffix_pattern = r'^(.+?)(?:\s*\(\d+\))?$'
 	match1 = re.match(suffix_pattern, base1)
 	match2 = re.match(suffix_pattern, base2)
@@ -98,6 +214,7 @@ def compute_image_hash(image_path: str, hash_size: int = 8) -> Optional[str]:
 		# Fall back to simple file hash if imagehash is not available
 		return compute_file_hash(image_path)
 		
+	_import_image_hash()
 	try:
 		if not is_image_file(image_path):
 			return None
@@ -118,19 +235,21 @@ def compute_image_hash(image_path: str, hash_size: int = 8) -> Optional[str]:
 		return compute_file_hash(image_path)  # Fall back to file hash
 
 
-def compute_file_hash(file_path: str) -> Optional[str]:
+def compute_file_hash(file_path: str, file_size: Optional[int] = None) -> Optional[str]:
 	"""
 	Compute a simple hash based on file size and first few bytes
 	
 	Args:
 		file_path: Path to the file
+		file_size: Size of the file if already known (saves a stat call)
 		
 	Returns:
 		String representation of the hash or None if failed
 	"""
 	try:
 		# Use file size and first few bytes as a simple hash
-		file_size = os.path.getsize(file_path)
+		if file_size is None:
+			file_size = os.path.getsize(file_path)
 		with open(file_path, 'rb') as f:
 			first_bytes = f.read(1024)  # Read first 1KB
 			
@@ -142,12 +261,51 @@ def compute_file_hash(file_path: str) -> Optional[str]:
 		logger.debug(f"Could not compute file hash for {file_path}: {str(e)}")
 		return None
 
-def load_image_hashes(hash_file: str = 'data/image_hashes.csv') -> Dict[str, str]:
+def compute_content_hash(file_path: str, chunk_size: int = 1 << 20) -> Optional[str]:
+	"""
+	Compute a hash of the whole file content, read in chunks
+	
+	Uses XXH3-128 when the xxhash package is installed, then BLAKE3, then BLAKE2b.
+	The hash only confirms duplicates of files that were already grouped by size
+	and perceptual hash, so a non-cryptographic hash is good enough; the digests
+	are only compared within one run, so they need not match across runs.
+	
+	Args:
+		file_path: Path to the file
+		chunk_size: Number of bytes read at a time
+		
+	Returns:
+		Hex digest of the content or None if failed
+	"""
+	try:
+		if HAS_XXHASH:
+			m = xxhash.xxh3_128()
+		elif HAS_BLAKE3:
+			m = blake3.blake3()
+		else:
+			m = hashlib.blake2b()
+		with open(file_path, 'rb', buffering=0) as f:
+			for chunk in iter(lambda: f.read(chunk_size), b''):
+				m.update(chunk)
+		return m.hexdigest()
+	except Exception as e:
+		logger.debug(f"Could not compute content hash for {file_path}: {str(e)}")
+		return None
+
+def _hash_journal_path(hash_file: str) -> str:
+	"""Return the path of the append-only journal that belongs to a hash cache"""
+	return f"{hash_file}.journal"
+
+
+def load_image_hashes(hash_file: str = HASH_CACHE_FILE) -> Dict[str, str]:
 	"""
-	Load image hashes from a CSV file
+	Load image hashes from a pickle file and replay its journal
+	
+	A CSV cache written by older versions (same name with a .csv extension)
+	is read when the pickle file does not exist yet.
 	
 	Args:
-		hash_file: Path to the CSV file containing image hashes
+		hash_file: Path to the pickle file containing image hashes
 		
 	Returns:
 		Dictionary mapping file paths to hash values
@@ -155,8 +313,12 @@ def load_image_hashes(hash_file: str = 'data/image_hashes.csv') -> Dict[str, str
 	hashes = {}
 	
 	try:
+		legacy_file = os.path.splitext(hash_file)[0] + '.csv'
 		if os.path.exists(hash_file):
-			with open(hash_file, 'r', encoding='utf-8') as f:
+			with open(hash_file, 'rb') as f:
+				hashes = pickle.load(f)
+		elif os.path.exists(legacy_file):
+			with open(legacy_file, 'r', encoding='utf-8') as f:
 				reader = csv.reader(f)
 				# Skip header
 				next(reader, None)
@@ -164,6 +326,21 @@ def load_image_hashes(hash_file: str = 'data/image_hashes.csv') -> Dict[str, str
 					if len(row) >= 2:
 						file_path, hash_value = row[0], row[1]
 						hashes[file_path] = hash_value
+		
+		journal_file = _hash_journal_path(hash_file)
+		if os.path.exists(journal_file):
+			with open(journal_file, 'rb') as f:
+				while True:
+					try:
+						hashes.update(pickle.load(f))
+					except EOFError:
+						break
+					except (pickle.UnpicklingError, ValueError) as e:
+						# A run that was killed mid-write leaves a truncated last record
+						logger.debug(f"Stopped replaying {journal_file} at a truncated record: {str(e)}")
+						break
+		
+		if hashes:
 			logger.info(f"Loaded {len(hashes)} image hashes from {hash_file}")
 	except Exception as e:
 		logger.error(f"Error loading image hashes: {str(e)}")
@@ -171,30 +348,118 @@ def load_image_hashes(hash_file: str = 'data/image_hashes.csv') -> Dict[str, str
 	return hashes
 
 
-def save_image_hashes(hashes: Dict[str, str], hash_file: str = 'data/image_hashes.csv'):
+def save_image_hashes(hashes: Dict[str, str], hash_file: str = HASH_CACHE_FILE):
 	"""
-	Save image hashes to a CSV file
+	Save image hashes to a pickle file and drop the journal it supersedes
 	
 	Args:
 		hashes: Dictionary mapping file paths to hash values
-		hash_file: Path to the CSV file to save image hashes
+		hash_file: Path to the pickle file to save image hashes
 	"""
 	try:
 		# Ensure data directory exists
-		os.makedirs(os.path.dirname(hash_file), exist_ok=True)
+		os.makedirs(os.path.dirname(hash_file) or '.', exist_ok=True)
 		
-		with open(hash_file, 'w', encoding='utf-8', newline='') as f:
-			writer = csv.writer(f)
-			writer.writerow(['file_path', 'hash_value'])
-			for file_path, hash_value in hashes.items():
-				writer.writerow([file_path, hash_value])
+		tmp_file = f"{hash_file}.tmp"
+		with open(tmp_file, 'wb') as f:
+			pickle.dump(hashes, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(tmp_file, hash_file)
+		
+		journal_file = _hash_journal_path(hash_file)
+		if os.path.exists(journal_file):
+			os.remove(journal_file)
 				
 		logger.info(f"Saved {len(hashes)} image hashes to {hash_file}")
 	except Exception as e:
 		logger.error(f"Error saving image hashes: {str(e)}")
 
 
-def compute_hash_for_file(file_path: str, hash_cache: Dict[str, str] = None) -> Optional[str]:
+def append_image_hashes(hashes: Dict[str, str], hash_file: str = HASH_CACHE_FILE):
+	"""
+	Append newly computed hashes to the journal of a hash cache
+	
+	Cheap enough to call periodically during long hashing runs: only the new
+	hashes are written, instead of rewriting the whole cache each time.
+	
+	Args:
+		hashes: Dictionary mapping file paths to the new hash values
+		hash_file: Path to the pickle file the journal belongs to
+	"""
+	if not hashes:
+		return
+	try:
+		os.makedirs(os.path.dirname(hash_file) or '.', exist_ok=True)
+		with open(_hash_journal_path(hash_file), 'ab') as f:
+			pickle.dump(hashes, f, protocol=pickle.HIGHEST_PROTOCOL)
+			f.flush()
+			os.fsync(f.fileno())
+	except Exception as e:
+		logger.error(f"Error appending image hashes: {str(e)}")
+
+
+def compact_image_hashes(hash_file: str = HASH_CACHE_FILE, max_journal_ratio: float = 0.5):
+	"""
+	Fold the journal into the hash cache once it has grown large relative to it
+	
+	Runs that only append to the journal avoid rewriting the whole cache; the
+	rewrite is done here, at most once per run, when replaying the journal on
+	load would start to cost more than reading the cache itself.
+	
+	Args:
+		hash_file: Path to the pickle file the journal belongs to
+		max_journal_ratio: Journal size, relative to the cache file, above which it is folded in
+	"""
+	try:
+		journal_size = os.path.getsize(_hash_journal_path(hash_file))
+	except OSError:
+		return
+	cache_size = os.path.getsize(hash_file) if os.path.exists(hash_file) else 0
+	if journal_size > cache_size * max_journal_ratio:
+		save_image_hashes(load_image_hashes(hash_file), hash_file)
+
+
+def get_cached_hash(hash_cache: Dict[str, Any], file_path: str, st: Optional[os.stat_result] = None) -> Optional[str]:
+	"""
+	Look up the hash of a file in a hash cache
+	
+	With a stat result, entries are stored as (size, mtime_ns, hash) and only
+	returned while the file still has that size and modification time, so a
+	file that was replaced or edited in place is hashed again. Plain entries
+	from older caches are trusted once and stamped with the given stat result.
+	
+	Args:
+		hash_cache: Dictionary mapping file paths to hashes or stamped hashes
+		file_path: Path to the file
+		st: Optional stat result of the file (e.g. from os.DirEntry.stat())
+		
+	Returns:
+		The cached hash or None if there is no valid entry
+	"""
+	entry = hash_cache.get(file_path)
+	if entry is None or isinstance(entry, str):
+		if entry is not None and st is not None:
+			hash_cache[file_path] = (st.st_size, st.st_mtime_ns, entry)
+		return entry
+	size, mtime_ns, hash_value = entry
+	if st is not None and (size != st.st_size or mtime_ns != st.st_mtime_ns):
+		return None
+	return hash_value
+
+
+def set_cached_hash(hash_cache: Dict[str, Any], file_path: str, hash_value: str, st: Optional[os.stat_result] = None):
+	"""
+	Store the hash of a file in a hash cache, stamped with its size and mtime if a stat result is given
+	
+	Args:
+		hash_cache: Dictionary mapping file paths to hashes or stamped hashes
+		file_path: Path to the file
+		hash_value: Hash of the file
+		st: Optional stat result of the file
+	"""
+	hash_cache[file_path] = (st.st_size, st.st_mtime_ns, hash_value) if st is not None else hash_value
+
+
+def compute_hash_for_file(file_path: str, hash_cache: Dict[str, Any] = None, st: Optional[os.stat_result] = None) -> Optional[str]:
 	"""
 	Compute hash for a file (image or video).
 	For images, use perceptual hash if available, otherwise use file hash.
@@ -203,28 +468,30 @@ def compute_hash_for_file(file_path: str, hash_cache: Dict[str, str] = None) ->
 	Args:
 		file_path: Path to the file
 		hash_cache: Optional dictionary to use as a cache for hashes
+		st: Optional stat result of the file, e.g. from the directory walk; cache
+			entries are then only used while size and mtime are unchanged
 		
 	Returns:
 		String representation of the hash or None if failed
 	"""
 	# Check if hash is in cache
-	if hash_cache is not None and file_path in hash_cache:
-		return hash_cache[file_path]
+	if hash_cache is not None:
+		hash_value = get_cached_hash(hash_cache, file_path, st)
+		if hash_value is not None:
+			return hash_value
 		
 	if is_image_file(file_path):
 		hash_value = compute_image_hash(file_path)
-		# Add to cache if successful
-		if hash_value and hash_cache is not None:
-			hash_cache[file_path] = hash_value
-		return hash_value
 	elif is_video_file(file_path):
-		hash_value = compute_file_hash(file_path)
-		# Add to cache if successful
-		if hash_value and hash_cache is not None:
-			hash_cache[file_path] = hash_value
-		return hash_value
+		hash_value = compute_file_hash(file_path, st.st_size if st is not None else None)
 	else:
 		return None
+	
+	# Add to cache if successful
+	if hash_value and hash_cache is not None:
+		set_cached_hash(hash_cache, file_path, hash_value, st)
+	return hash_value
+
 
 def hash_similarity(hash1: str, hash2: str) -> float:
 	"""
@@ -246,6 +513,7 @@ def hash_similarity(hash1: str, hash2: str) -> float:
 		
 	if HAS_IMAGE_HASH and hash1.startswith('0x') and hash2.startswith('0x'):
 		try:
+			_import_image_hash()
 			# Convert string hashes back to imagehash objects
 			h1 = imagehash.hex_to_hash(hash1) if isinstance(hash1, str) else hash1
 			h2 = imagehash.hex_to_hash(hash2) if isinstance(hash2, str) else hash2
@@ -335,7 +603,6 @@ def check_metadata_status(old_dir: str, new_dir: str, status_log: str = 'data/me
 				
 				# Check if the JSON file contains photoTakenTime
 				try:
-					import json
 					with open(json_path, 'r', encoding='utf-8') as f:
 						metadata = json.load(f)
 						if 'photoTakenTime' in metadata:
@@ -457,31 +724,38 @@ def find_duplicates(directory: str, similarity_threshold: float = 0.98, duplicat
 	Returns:
 		Dictionary mapping original files to lists of duplicate files
 	"""
-	import concurrent.futures
-	from collections import defaultdict
 	
 	duplicates = {}  # Map original file to list of duplicate files
 	media_files = []
 	
 	# Load existing hashes from cache file
-	hash_cache = load_image_hashes('data/image_hashes.csv')
+	hash_cache = load_image_hashes()
 	logger.info(f"Loaded {len(hash_cache)} hashes from cache")
 	
-	# Collect all media files first
+	# Collect all media files first, grouped by size (quick filter)
 	logger.info(f"Collecting media files from {directory}...")
-	for root, _, files in os.walk(directory):
-		for file in files:
-			file_path = os.path.join(root, file)
-			if is_media_file(file_path):
-				media_files.append(file_path)
+	size_groups = defaultdict(list)
+	# The directory entries give the file type and name without a stat call per file
+	for entry in iter_media_entries(directory):
+		file_path = entry.path
+		media_files.append(file_path)
+		try:
+			# Group by 10KB chunks so that re-encoded copies of similar size end up together
+			size_groups[entry.stat().st_size // (1024 * 10)].append(file_path)
+		except OSError as e:
+			logger.debug(f"Error getting size for {file_path}: {str(e)}")
 	
 	logger.info(f"Found {len(media_files)} media files")
 	
-	# Identify files that need hash computation
-	files_to_hash = []
-	for file_path in media_files:
-		if file_path not in hash_cache:
-			files_to_hash.append(file_path)
+	# Filter groups with only one file
+	potential_duplicate_groups = {size: files for size, files in size_groups.items() if len(files) > 1}
+	logger.info(f"Found {len(potential_duplicate_groups)} groups of files with similar sizes")
+	
+	# Only files that share a size group can be duplicates, so only those need a hash
+	files_to_hash = [
+		file_path for files in potential_duplicate_groups.values() for file_path in files
+		if file_path not in hash_cache
+	]
 	
 	if files_to_hash:
 		logger.info(f"Computing hashes for {len(files_to_hash)} new files...")
@@ -489,12 +763,14 @@ def find_duplicates(directory: str, similarity_threshold: float = 0.98, duplicat
 		# Compute hashes in parallel batches to avoid memory issues
 		batch_size = 500
 		new_hashes = {}
+		unsaved_hashes = {}
 		
-		for i in range(0, len(files_to_hash), batch_size):
-			batch = files_to_hash[i:i+batch_size]
-			
-			# Process batch in parallel
-			with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+		# One pool for all batches: workers (and their imports) are started once
+		with concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+			for i in range(0, len(files_to_hash), batch_size):
+				batch = files_to_hash[i:i+batch_size]
+				
+				# Process batch in parallel; perceptual hashing is CPU bound, so use processes
 				futures = {}
 				for file_path in batch:
 					futures[executor.submit(compute_hash_for_file, file_path)] = file_path
@@ -505,33 +781,20 @@ def find_duplicates(directory: str, similarity_threshold: float = 0.98, duplicat
 						file_hash = future.result()
 						if file_hash:
 							new_hashes[file_path] = file_hash
+							unsaved_hashes[file_path] = file_hash
 							hash_cache[file_path] = file_hash
 					except Exception as e:
 						logger.debug(f"Error computing hash for {file_path}: {str(e)}")
-			
-			if (i + batch_size) % 2000 == 0 or (i + batch_size) >= len(files_to_hash):
-				logger.info(f"Computed hashes for {min(i + batch_size, len(files_to_hash))} of {len(files_to_hash)} files")
-				# Save hashes periodically to avoid losing progress
-				save_image_hashes(hash_cache, 'data/image_hashes.csv')
+				
+				if (i + batch_size) % 2000 == 0 or (i + batch_size) >= len(files_to_hash):
+					logger.info(f"Computed hashes for {min(i + batch_size, len(files_to_hash))} of {len(files_to_hash)} files")
+					# Journal the new hashes periodically to avoid losing progress
+					append_image_hashes(unsaved_hashes)
+					unsaved_hashes = {}
 		
 		logger.info(f"Computed {len(new_hashes)} new hashes")
 		# Save all hashes to cache file
-		save_image_hashes(hash_cache, 'data/image_hashes.csv')
-	
-	# Group files by size first (quick filter)
-	size_groups = defaultdict(list)
-	for file_path in media_files:
-		try:
-			file_size = os.path.getsize(file_path)
-			# Only group files if they're within 5% size of each other
-			size_key = file_size // (1024 * 10)  # Group by 10KB chunks
-			size_groups[size_key].append(file_path)
-		except (OSError, IOError) as e:
-			logger.debug(f"Error getting size for {file_path}: {str(e)}")
-	
-	# Filter groups with only one file
-	potential_duplicate_groups = {size: files for size, files in size_groups.items() if len(files) > 1}
-	logger.info(f"Found {len(potential_duplicate_groups)} groups of files with similar sizes")
+		save_image_hashes(hash_cache)
 	
 	# Process each group
 	for size_key, files in potential_duplicate_groups.items():
@@ -541,8 +804,19 @@ def find_duplicates(directory: str, similarity_threshold: float = 0.98, duplicat
 			if file_path in hash_cache and hash_cache[file_path]:
 				hash_groups[hash_cache[file_path]].append(file_path)
 		
+		# Without perceptual hashes the file hash only covers the first bytes,
+		# so confirm matches with a hash of the whole content
+		exact_groups = hash_groups.values()
+		if not HAS_IMAGE_HASH:
+			content_groups = defaultdict(list)
+			for file_paths in hash_groups.values():
+				if len(file_paths) > 1:
+					for file_path in file_paths:
+						content_groups[compute_content_hash(file_path) or file_path].append(file_path)
+			exact_groups = content_groups.values()
+		
 		# Add exact hash matches to duplicates
-		for file_hash, file_paths in hash_groups.items():
+		for file_paths in exact_groups:
 			if len(file_paths) > 1:
 				# Sort by modification time to keep the oldest file as original
 				file_paths.sort(key=lambda f: os.path.getmtime(f))
@@ -595,7 +869,6 @@ def find_duplicates(directory: str, similarity_threshold: float = 0.98, duplicat
 	try:
 		os.makedirs(os.path.dirname(duplicates_log), exist_ok=True)
 		with open(duplicates_log, 'w', newline='') as f:
-			import csv
 			writer = csv.writer(f)
 			writer.writerow(['original', 'duplicate'])
 			for original, dups in duplicates.items():
@@ -734,7 +1007,7 @@ def rename_files_remove_suffix(directory: str, suffix: str = ' (1)', dry_run: bo
 	logger.info(f"Renaming complete. Processed {processed} files, renamed {renamed} files")
 	return processed, renamed
 
-def remove_duplicates(duplicates_log_path: str = 'data/duplicates.csv', dry_run: bool = False) -> Tuple[int, int]:
+def remove_duplicates_from_log(duplicates_log_path: str = 'data/duplicates.csv', dry_run: bool = False) -> Tuple[int, int]:
 	"""
 	Remove duplicate files based on the duplicates log file
 	
@@ -749,7 +1022,6 @@ def remove_duplicates(duplicates_log_path: str = 'data/duplicates.csv', dry_run:
 		logger.error(f"Duplicates log file not found: {duplicates_log_path}")
 		return 0, 0
 	
-	import csv
 	
 	duplicates_processed = 0
 	duplicates_removed = 0
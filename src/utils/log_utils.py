@@ -0,0 +1,60 @@
+"""
+Utility functions for logging
+"""
+import logging
+
+# Size of the write buffer of log files
+LOG_BUFFER_SIZE = 1 << 20
+
+
+class BufferedFileHandler(logging.FileHandler):
+	"""File handler that writes records through a large buffer instead of flushing each one"""
+
+	def __init__(self, filename: str, mode: str = 'a', encoding: str = None, buffer_size: int = LOG_BUFFER_SIZE,
+				flush_level: int = logging.WARNING):
+		"""
+		Args:
+			filename: Path to the log file
+			mode: Mode to open the file with
+			encoding: Encoding of the log file
+			buffer_size: Size of the write buffer in bytes
+			flush_level: Records of this level or higher are written at once, like MemoryHandler's flushLevel
+		"""
+		self.buffer_size = buffer_size
+		self.flush_level = flush_level
+		super().__init__(filename, mode, encoding, delay=True)
+
+	def _open(self):
+		"""Open the log file with the large write buffer"""
+		return open(self.baseFilename, self.mode, buffering=self.buffer_size, encoding=self.encoding)
+
+	def emit(self, record: logging.LogRecord):
+		"""Write a record; the buffer is written when full, on close or for warnings and errors"""
+		if self.stream is None:
+			self.stream = self._open()
+		try:
+			self.stream.write(self.format(record) + self.terminator)
+			# Worker processes exit without atexit handlers, so their warnings must not wait in the buffer
+			if record.levelno >= self.flush_level:
+				self.stream.flush()
+		except Exception:
+			self.handleError(record)
+
+
+def flush_log_handlers() -> None:
+	"""
+	Write the buffered records of all loggers' handlers
+
+	Called at the end of the work of a worker process, which exits without
+	flushing, and before forking workers, which would otherwise inherit the
+	buffered records and write them again.
+	"""
+	loggers = [logging.getLogger()] + [
+		logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+	]
+	for logger in loggers:
+		for handler in logger.handlers:
+			try:
+				handler.flush()
+			except Exception:
+				pass
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Unit tests for copy_service module
+"""
+import os
+import sys
+import unittest
+import tempfile
+import zipfile
+import functools
+from unittest.mock import patch
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.copy_service import CopyService
+from src.utils.image_utils import (
+	compute_hash_for_file, get_cached_hash, load_image_hashes, append_image_hashes, compact_image_hashes
+)
+
+
+class TestCopyService(unittest.TestCase):
+	"""Test cases for CopyService class"""
+
+	def setUp(self):
+		"""Set up test environment"""
+		self.temp_dir = tempfile.TemporaryDirectory()
+		self.old_dir = os.path.join(self.temp_dir.name, "old")
+		self.new_dir = os.path.join(self.temp_dir.name, "new")
+		os.makedirs(os.path.join(self.old_dir, "album"))
+		os.makedirs(self.new_dir)
+
+		self.old_files = []
+		for i in range(20):
+			file_path = os.path.join(self.old_dir, "album", f"IMG_{i:04d}.jpg")
+			with open(file_path, 'wb') as f:
+				f.write(f"photo {i}".encode())
+			self.old_files.append(file_path)
+
+		# Keep the hash cache of copy_missing_files out of the repository's data directory
+		hash_file = os.path.join(self.temp_dir.name, "data", "image_hashes.pkl")
+		for func in (load_image_hashes, append_image_hashes, compact_image_hashes):
+			patcher = patch(f'src.services.copy_service.{func.__name__}', functools.partial(func, hash_file=hash_file))
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def tearDown(self):
+		"""Clean up test environment"""
+		self.temp_dir.cleanup()
+
+	def test_copy_files(self):
+		"""Test copying files with concurrent workers"""
+		missing = os.path.join(self.old_dir, "missing.jpg")
+
+		copied_count = CopyService.copy_files(self.old_files + [missing], self.new_dir, max_workers=4)
+
+		self.assertEqual(copied_count, len(self.old_files))
+		for i, old_file in enumerate(self.old_files):
+			with open(os.path.join(self.new_dir, os.path.basename(old_file)), 'rb') as f:
+				self.assertEqual(f.read(), f"photo {i}".encode())
+
+
+	def test_copy_missing_files_keeps_existing_names(self):
+		"""Test that files whose name already exists in the target are not overwritten"""
+		existing = os.path.join(self.new_dir, "IMG_0000.jpg")
+		with open(existing, 'wb') as f:
+			f.write(b"edited photo")
+
+		missing_count, copied_count = CopyService.copy_missing_files(self.old_dir, self.new_dir)
+
+		self.assertEqual(missing_count, len(self.old_files) - 1)
+		self.assertEqual(copied_count, len(self.old_files) - 1)
+		with open(existing, 'rb') as f:
+			self.assertEqual(f.read(), b"edited photo")
+
+	def test_copy_missing_files_same_name_in_two_albums(self):
+		"""Test that a second file with an already copied name does not overwrite the first"""
+		other_album = os.path.join(self.old_dir, "other")
+		os.makedirs(other_album)
+		with open(os.path.join(other_album, "IMG_0000.jpg"), 'wb') as f:
+			f.write(b"another photo with the same name")
+
+		missing_count, copied_count = CopyService.copy_missing_files(self.old_dir, self.new_dir)
+
+		self.assertEqual(copied_count, len(self.old_files))
+		self.assertEqual(len(os.listdir(self.new_dir)), len(self.old_files))
+
+	def test_copy_missing_files_skips_hashing_unmatched_sizes(self):
+		"""Test that videos without a file of the same size in the target are copied without hashing"""
+		video = os.path.join(self.old_dir, "album", "VID_0001.mp4")
+		with open(video, 'wb') as f:
+			f.write(b"a video no file in new has the size of")
+		with open(os.path.join(self.new_dir, "VID_0002.mp4"), 'wb') as f:
+			f.write(b"short video")
+
+		with patch('src.services.copy_service.compute_hash_for_file', wraps=compute_hash_for_file) as mock_hash:
+			missing_count, copied_count = CopyService.copy_missing_files(self.old_dir, self.new_dir)
+
+		hashed = [call.args[0] for call in mock_hash.call_args_list]
+		self.assertNotIn(video, hashed)
+		self.assertEqual(missing_count, len(self.old_files) + 1)
+		self.assertTrue(os.path.exists(os.path.join(self.new_dir, "VID_0001.mp4")))
+
+	def test_cache_copied_hashes(self):
+		"""Test that copied files get the hash of their source, stamped with their own stat"""
+		target = os.path.join(self.new_dir, "IMG_0000.jpg")
+		CopyService.copy_file(self.old_files[0], target)
+		hash_cache = {}
+
+		with patch('src.services.copy_service.append_image_hashes') as mock_append:
+			CopyService._cache_copied_hashes(
+				[(self.old_files[0], target), (self.old_files[1], os.path.join(self.new_dir, "gone.jpg"))],
+				{self.old_files[0]: "abc", self.old_files[1]: "def"},
+				hash_cache
+			)
+
+		self.assertEqual(list(hash_cache), ['new:' + target])
+		self.assertEqual(get_cached_hash(hash_cache, 'new:' + target, os.stat(target)), "abc")
+		mock_append.assert_called_once_with(hash_cache)
+
+	def test_fast_copy_keeps_content_and_times(self):
+		"""Test that the default copy keeps the content and modification time"""
+		os.utime(self.old_files[1], (1600000000, 1600000000))
+		target = os.path.join(self.new_dir, "copied.jpg")
+
+		CopyService.copy_file(self.old_files[1], target)
+
+		with open(target, 'rb') as f:
+			self.assertEqual(f.read(), b"photo 1")
+		self.assertEqual(os.path.getmtime(target), 1600000000)
+
+	def test_copy_file_hardlink(self):
+		"""Test that hardlink mode links the file instead of copying it"""
+		target = os.path.join(self.new_dir, "linked.jpg")
+
+		CopyService.copy_file(self.old_files[0], target, 'hardlink')
+
+		self.assertTrue(os.path.samefile(self.old_files[0], target))
+
+	def test_copy_file_reflink_falls_back_to_copy(self):
+		"""Test that reflink mode always produces a copy with the same content"""
+		target = os.path.join(self.new_dir, "cloned.jpg")
+
+		CopyService.copy_file(self.old_files[0], target, 'reflink')
+
+		self.assertFalse(os.path.samefile(self.old_files[0], target))
+		with open(target, 'rb') as f:
+			self.assertEqual(f.read(), b"photo 0")
+
+	def test_copy_file_never_overwrites(self):
+		"""Test that every copy mode refuses to replace an existing target"""
+		target = os.path.join(self.new_dir, "taken.jpg")
+		with open(target, 'wb') as f:
+			f.write(b"existing")
+
+		for copy_mode in ('copy', 'hardlink', 'reflink'):
+			with self.assertRaises(FileExistsError):
+				CopyService.copy_file(self.old_files[0], target, copy_mode)
+			with open(target, 'rb') as f:
+				self.assertEqual(f.read(), b"existing")
+
+	def test_copy_files_skips_existing_targets(self):
+		"""Test that copy_files does not count files whose target already exists"""
+		with open(os.path.join(self.new_dir, os.path.basename(self.old_files[0])), 'wb') as f:
+			f.write(b"existing")
+
+		copied_count = CopyService.copy_files(self.old_files, self.new_dir, max_workers=2)
+
+		self.assertEqual(copied_count, len(self.old_files) - 1)
+
+	def test_extract_zip_file(self):
+		"""Test that zip members are streamed to disk and paths outside the target are skipped"""
+		zip_path = os.path.join(self.temp_dir.name, "takeout.zip")
+		with zipfile.ZipFile(zip_path, 'w') as zf:
+			zf.writestr("Takeout/Google Photos/album/", "")
+			zf.writestr("Takeout/Google Photos/album/IMG_0001.jpg", b"photo" * 1000)
+			zf.writestr("../escaped.jpg", b"bad")
+		extract_dir = os.path.join(self.temp_dir.name, "extracted")
+
+		self.assertEqual(CopyService.extract_zip_file(zip_path, extract_dir), extract_dir)
+
+		with open(os.path.join(extract_dir, "Takeout", "Google Photos", "album", "IMG_0001.jpg"), 'rb') as f:
+			self.assertEqual(f.read(), b"photo" * 1000)
+		self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "escaped.jpg")))
+
+	def test_extract_zip_file_stored_and_deflated(self):
+		"""Test that stored and compressed members are both extracted with their content"""
+		zip_path = os.path.join(self.temp_dir.name, "takeout.zip")
+		stored = zipfile.ZipInfo("album/IMG_0001.jpg")
+		stored.extra = b"\x75\x70\x05\x00\x01abcd"
+		with zipfile.ZipFile(zip_path, 'w') as zf:
+			zf.writestr(stored, b"stored photo" * 1000, compress_type=zipfile.ZIP_STORED)
+			zf.writestr("album/IMG_0002.json", b"{}" * 1000, compress_type=zipfile.ZIP_DEFLATED)
+			zf.writestr("album/empty.jpg", b"")
+		extract_dir = os.path.join(self.temp_dir.name, "extracted")
+
+		self.assertEqual(CopyService.extract_zip_file(zip_path, extract_dir), extract_dir)
+
+		with open(os.path.join(extract_dir, "album", "IMG_0001.jpg"), 'rb') as f:
+			self.assertEqual(f.read(), b"stored photo" * 1000)
+		with open(os.path.join(extract_dir, "album", "IMG_0002.json"), 'rb') as f:
+			self.assertEqual(f.read(), b"{}" * 1000)
+		self.assertEqual(os.path.getsize(os.path.join(extract_dir, "album", "empty.jpg")), 0)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -4,6 +4,7 @@ Unit tests for exiftool_service module
 """
 import os
 import sys
+import json
 import unittest
 import tempfile
 import subprocess
@@ -12,7 +13,8 @@ from unittest.mock import patch, MagicMock
 # Add the project root directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.services.exiftool_service import ExifToolService
+from src.services import exiftool_service
+from src.services.exiftool_service import ExifToolService, ExifToolSession
 
 
 class TestExifToolService(unittest.TestCase):
@@ -23,34 +25,32 @@ class TestExifToolService(unittest.TestCase):
 		# Create a temporary directory for test files
 		self.temp_dir = tempfile.TemporaryDirectory()
 		self.test_dir = self.temp_dir.name
+		# Results are cached per process; every test mocks its own exiftool
+		ExifToolService.check_exiftool.cache_clear()
+		exiftool_service._file_type_cache.clear()
+		exiftool_service._write_fallbacks.clear()
 
 	def tearDown(self):
 		"""Clean up test environment"""
 		self.temp_dir.cleanup()
 
 	@patch('subprocess.run')
-	def test_check_exiftool_installed(self, mock_run):
+	@patch('shutil.which', return_value='/usr/local/bin/exiftool')
+	def test_check_exiftool_installed(self, mock_which, mock_run):
 		"""Test checking if exiftool is installed"""
-		# Mock subprocess.run to simulate exiftool being installed
-		mock_process = MagicMock()
-		mock_process.returncode = 0
-		mock_run.return_value = mock_process
-		
 		# Test the method
 		result = ExifToolService.check_exiftool()
 		
 		# Verify the result
 		self.assertTrue(result)
 		
-		# Verify that subprocess.run was called correctly
-		mock_run.assert_called_once()
+		# Verify that only the PATH was searched, without starting exiftool
+		mock_which.assert_called_once_with('exiftool')
+		mock_run.assert_not_called()
 
-	@patch('subprocess.run')
-	def test_check_exiftool_not_installed(self, mock_run):
+	@patch('shutil.which', return_value=None)
+	def test_check_exiftool_not_installed(self, mock_which):
 		"""Test checking if exiftool is not installed"""
-		# Mock subprocess.run to simulate exiftool not being installed
-		mock_run.side_effect = FileNotFoundError("No such file or directory: 'exiftool'")
-		
 		# Test the method with assertLogs to capture the error message
 		with self.assertLogs(level='ERROR') as log:
 			result = ExifToolService.check_exiftool()
@@ -61,6 +61,14 @@ class TestExifToolService(unittest.TestCase):
 		# Verify the result
 		self.assertFalse(result)
 
+	@patch('shutil.which', return_value='/usr/local/bin/exiftool')
+	def test_check_exiftool_cached(self, mock_which):
+		"""Test that the PATH is only searched once"""
+		self.assertTrue(ExifToolService.check_exiftool())
+		self.assertTrue(ExifToolService.check_exiftool())
+		
+		mock_which.assert_called_once()
+
 	@patch('subprocess.run')
 	def test_detect_file_type_jpeg(self, mock_run):
 		"""Test detecting JPEG file type"""
@@ -82,6 +90,108 @@ class TestExifToolService(unittest.TestCase):
 		self.assertEqual(ext, "jpg")
 		self.assertTrue(mime.startswith("image/"))
 
+	@patch('subprocess.run')
+	def test_detect_file_type_cached(self, mock_run):
+		"""Test that an unchanged file is only probed once"""
+		test_file = os.path.join(self.test_dir, "test.jpg")
+		with open(test_file, 'w') as f:
+			f.write("test file content")
+		
+		mock_process = MagicMock()
+		mock_process.returncode = 0
+		mock_process.stdout = "JPEG"
+		mock_run.return_value = mock_process
+		
+		self.assertEqual(ExifToolService.detect_file_type(test_file)[0], "jpg")
+		self.assertEqual(ExifToolService.detect_file_type(test_file)[0], "jpg")
+		self.assertEqual(mock_run.call_count, 1)
+		
+		# A changed file is probed again
+		with open(test_file, 'a') as f:
+			f.write(" and more")
+		ExifToolService.detect_file_type(test_file)
+		self.assertEqual(mock_run.call_count, 2)
+
+	@patch('subprocess.run')
+	def test_detect_file_type_magic_bytes(self, mock_run):
+		"""Test that common formats are recognized without running exiftool"""
+		headers = {
+			"photo.heic": (b'\xff\xd8\xff\xe0\x00\x10JFIF\x00', "jpg"),
+			"photo.jpg": (b'\x00\x00\x00\x20ftypheic\x00\x00\x00\x00', "heic"),
+			"video.mov": (b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00', "mp4"),
+			"video.mp4": (b'\x00\x00\x00\x14ftypqt  \x00\x00\x00\x00', "mov"),
+			"image.png": (b'RIFF\x00\x00\x00\x00WEBPVP8 ', "webp"),
+			"samsung.jpg": (b'\x00\x00\x00\x1cftypmif1\x00\x00\x00\x00mif1heicmiaf', "heic"),
+			"still.heic": (b'\x00\x00\x00\x18ftypmif1\x00\x00\x00\x00mif1miaf', "heif"),
+			"clip.mp4": (b'\x00\x00\x00\x1cftypM4V \x00\x00\x00\x01M4V M4A mp42', "m4v"),
+		}
+		for name, (header, expected_ext) in headers.items():
+			test_file = os.path.join(self.test_dir, name)
+			with open(test_file, 'wb') as f:
+				f.write(header + b'\x00' * 32)
+			self.assertEqual(ExifToolService.detect_file_type(test_file)[0], expected_ext)
+		
+		mock_run.assert_not_called()
+
+	def test_file_type_cache_is_bounded(self):
+		"""Test that the oldest detected types are dropped once the cache is full"""
+		files = []
+		for i in range(3):
+			files.append(os.path.join(self.test_dir, f"photo{i}.jpg"))
+			with open(files[-1], 'wb') as f:
+				f.write(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00' + b'\x00' * 32)
+
+		with patch.object(exiftool_service, 'FILE_TYPE_CACHE_SIZE', 2):
+			for file_path in files:
+				self.assertEqual(ExifToolService.detect_file_type(file_path)[0], "jpg")
+
+		self.assertEqual([key[0] for key in exiftool_service._file_type_cache], files[1:])
+
+	@patch('subprocess.run')
+	def test_detect_file_types(self, mock_run):
+		"""Test that unrecognized files are probed with one exiftool run and one file run"""
+		files = {}
+		for name, content in (("photo.jpg", b'\xff\xd8\xff\xe0\x00\x10JFIF\x00'), ("scan.dat", b'II*\x01'),
+							("clip.bin", b'\x00\x01'), ("unknown.xyz", b'\x00\x02')):
+			files[name] = os.path.join(self.test_dir, name)
+			with open(files[name], 'wb') as f:
+				f.write(content + b'\x00' * 32)
+
+		def run(cmd, **kwargs):
+			if cmd[0] == 'exiftool':
+				output = json.dumps([{"SourceFile": files["scan.dat"], "File:FileType": "TIFF"}]).encode()
+				return subprocess.CompletedProcess(cmd, 1, output, b'')
+			return subprocess.CompletedProcess(cmd, 0, "video/x-msvideo\napplication/octet-stream\n", '')
+		mock_run.side_effect = run
+
+		types = ExifToolService.detect_file_types(list(files.values()) + [os.path.join(self.test_dir, "missing.jpg")])
+
+		self.assertEqual(types, {
+			files["photo.jpg"]: ("jpg", "image/jpeg"),
+			files["scan.dat"]: ("tiff", "image/tiff"),
+			files["clip.bin"]: ("avi", "video/x-msvideo"),
+			files["unknown.xyz"]: ("", "application/octet-stream"),
+		})
+		self.assertEqual([call.args[0][0] for call in mock_run.call_args_list], ['exiftool', 'file'])
+		# The results are shared with detect_file_type
+		self.assertEqual(ExifToolService.detect_file_type(files["clip.bin"]), ("avi", "video/x-msvideo"))
+		self.assertEqual(mock_run.call_count, 2)
+
+	def test_fix_file_extension_links_instead_of_copying(self):
+		"""Test that the file is renamed through a hard link, without copying its data"""
+		test_file = os.path.join(self.test_dir, "photo.heic")
+		with open(test_file, 'wb') as f:
+			f.write(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00' + b'\x00' * 32)
+		inode = os.stat(test_file).st_ino
+
+		with patch('src.services.copy_service.CopyService.copy_file') as mock_copy:
+			fixed_path = ExifToolService.fix_file_extension(test_file)
+
+		self.assertEqual(fixed_path, os.path.join(self.test_dir, "photo.jpg"))
+		self.assertEqual(os.stat(fixed_path).st_ino, inode)
+		self.assertFalse(os.path.exists(test_file))
+		mock_copy.assert_not_called()
+
 	@patch('subprocess.run')
 	def test_detect_file_type_nonexistent_file(self, mock_run):
 		"""Test detecting file type for a nonexistent file"""
@@ -98,6 +208,129 @@ class TestExifToolService(unittest.TestCase):
 		# Verify that subprocess.run was not called
 		mock_run.assert_not_called()
 
+	@patch('subprocess.run')
+	def test_apply_metadata_retries_in_session(self, mock_run):
+		"""Test that the date-only retry runs in the session instead of a new exiftool process"""
+		test_file = os.path.join(self.test_dir, "photo.jpg")
+		with open(test_file, 'wb') as f:
+			f.write(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00' + b'\x00' * 32)
+		session = MagicMock()
+		session.running = True
+		session.execute.side_effect = [
+			subprocess.CompletedProcess([], 1, '', 'Warning: bad GPS'),
+			subprocess.CompletedProcess([], 0, '1 image files updated', ''),
+		]
+
+		result = ExifToolService.apply_metadata(test_file, ['-DateTimeOriginal=2020:01:01 00:00:00', '-GPSLatitude=1.0'],
+												session=session)
+
+		# Only the dates were written, so the update still counts as failed
+		self.assertFalse(result)
+		retry_args = session.execute.call_args_list[1].args[0]
+		self.assertEqual(retry_args[0], '-DateTimeOriginal=2020:01:01 00:00:00')
+		self.assertNotIn('-GPSLatitude=1.0', retry_args)
+		mock_run.assert_not_called()
+
+	@patch('subprocess.run')
+	def test_apply_metadata_session_timeout_retries_dates(self, mock_run):
+		"""Test that a write that times out in the session is retried with the dates only"""
+		test_file = os.path.join(self.test_dir, "clip.mpg")
+		with open(test_file, 'wb') as f:
+			f.write(b'\x00\x00\x01\xba' + b'\x00' * 32)
+		session = MagicMock()
+		session.running = True
+		session.execute.side_effect = [
+			subprocess.TimeoutExpired(['exiftool'], 30),
+			subprocess.CompletedProcess([], 0, '1 image files updated', ''),
+		]
+
+		result = ExifToolService.apply_metadata(test_file, ['-DateTimeOriginal=2020:01:01 00:00:00', '-Title=x'],
+												session=session)
+
+		# As with a timeout of a new exiftool process, the dates alone count as an update
+		self.assertTrue(result)
+		self.assertEqual(session.execute.call_count, 2)
+		retry_args = session.execute.call_args_list[-1].args[0]
+		self.assertIn('-DateTimeOriginal=2020:01:01 00:00:00', retry_args)
+		self.assertNotIn('-Title=x', retry_args)
+		mock_run.assert_not_called()
+
+	@patch('subprocess.run')
+	def test_apply_metadata_session_overwrite_mode(self, mock_run):
+		"""Test that a session write gives one overwrite mode, in place for the types that need it"""
+		session = MagicMock()
+		session.running = True
+		session.execute.return_value = subprocess.CompletedProcess([], 0, '1 image files updated', '')
+		args = ['-DateTimeOriginal=2020:01:01 00:00:00']
+		for name, header, mode in (("photo.jpg", b'\xff\xd8\xff\xe0\x00\x10JFIF\x00', '-overwrite_original'),
+								   ("clip.mpg", b'\x00\x00\x01\xba', '-overwrite_original_in_place')):
+			test_file = os.path.join(self.test_dir, name)
+			with open(test_file, 'wb') as f:
+				f.write(header + b'\x00' * 32)
+			self.assertTrue(ExifToolService.apply_metadata(test_file, args, session=session))
+			write_args = session.execute.call_args.args[0]
+			self.assertEqual([arg for arg in write_args if arg.startswith('-overwrite_original')], [mode])
+		self.assertNotIn('-overwrite_original', ExifToolSession.COMMON_ARGS)
+		mock_run.assert_not_called()
+
+	@patch('subprocess.run')
+	def test_apply_metadata_replaces_hardlinked_file(self, mock_run):
+		"""Test that a hardlinked file is not written in place, which would change the linked original"""
+		original = os.path.join(self.test_dir, "original.mpg")
+		with open(original, 'wb') as f:
+			f.write(b'\x00\x00\x01\xba' + b'\x00' * 32)
+		linked = os.path.join(self.test_dir, "linked.mpg")
+		os.link(original, linked)
+		session = MagicMock()
+		session.running = True
+		session.execute.return_value = subprocess.CompletedProcess([], 0, '1 image files updated', '')
+
+		self.assertTrue(ExifToolService.apply_metadata(linked, ['-DateTimeOriginal=2020:01:01 00:00:00'], session=session))
+		write_args = session.execute.call_args.args[0]
+		self.assertNotIn('-overwrite_original_in_place', write_args)
+		self.assertIn('-overwrite_original', write_args)
+		mock_run.assert_not_called()
+
+	@patch('subprocess.run')
+	def test_apply_metadata_learns_date_only_fallback(self, mock_run):
+		"""Test that after repeated failed full writes of a type, the date-only write is tried first"""
+		args = ['-DateTimeOriginal=2020:01:01 00:00:00', '-GPSLatitude=1.0']
+		failed = subprocess.CompletedProcess([], 1, '', 'Error: bad GPS')
+		updated = subprocess.CompletedProcess([], 0, '1 image files updated', '')
+		session = MagicMock()
+		session.running = True
+		files = []
+		for i in range(3):
+			files.append(os.path.join(self.test_dir, f"photo{i}.jpg"))
+			with open(files[-1], 'wb') as f:
+				f.write(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00' + b'\x00' * 32)
+
+		with patch.object(exiftool_service, 'WRITE_FALLBACK_THRESHOLD', 2):
+			session.execute.side_effect = [failed, updated, failed, updated, updated]
+			for file_path in files:
+				self.assertFalse(ExifToolService.apply_metadata(file_path, args, session=session))
+
+		# Two files needed the full write and the retry; the third only got the retry
+		self.assertEqual(session.execute.call_count, 5)
+		self.assertNotIn('-GPSLatitude=1.0', session.execute.call_args_list[4].args[0])
+		mock_run.assert_not_called()
+
+	def test_metadata_args_handler(self):
+		"""Test that the metadata arguments are adjusted by real type, MIME type and file name"""
+		args = ['-DateTimeOriginal=2020:01:01 00:00:00', '-GPSLatitude=1.0', '-Title=x']
+		cases = [
+			(('heic', 'image/heic', 'heic'), ['-DateTimeOriginal=2020:01:01 00:00:00', '-Title=x', '-ignoreMinorErrors']),
+			(('heic', 'image/heic', 'jpg'), args + ['-ignoreMinorErrors']),
+			(('heif', 'image/heif', 'heif'), ['-DateTimeOriginal=2020:01:01 00:00:00', '-Title=x', '-ignoreMinorErrors']),
+			(('', 'video/avi', 'avi'), ['-DateTimeOriginal=2020:01:01 00:00:00', '-ignoreMinorErrors', '-m', '-overwrite_original_in_place']),
+			(('', 'video/x-matroska', 'mkv'), args + ['-ignoreMinorErrors', '-use MWG']),
+			(('', 'application/xml', 'aae'), ['-DateTimeOriginal=2020:01:01 00:00:00', '-ignoreMinorErrors']),
+		]
+		for (real_ext, mime_type, file_ext), expected in cases:
+			handler = exiftool_service._metadata_args_handler(real_ext, mime_type, file_ext)
+			self.assertEqual(handler(args), expected)
+		self.assertIsNone(exiftool_service._metadata_args_handler('pdf', 'application/pdf', 'pdf'))
+
 	@patch('subprocess.run')
 	def test_apply_metadata(self, mock_run):
 		"""Test applying metadata to a file"""
@@ -129,6 +362,145 @@ class TestExifToolService(unittest.TestCase):
 		# Verify the result
 		self.assertTrue(result)
 
+	@patch('subprocess.run')
+	def test_apply_metadata_with_session(self, mock_run):
+		"""Test that the type probe and the write go through a running session"""
+		test_file = os.path.join(self.test_dir, "test.jpg")
+		with open(test_file, 'w') as f:
+			f.write("test file content")
+
+		session = MagicMock()
+		session.running = True
+		session.execute.side_effect = lambda args, timeout=None: subprocess.CompletedProcess(
+			['exiftool'] + args, 0, "JPEG\n" if '-FileType' in args else "", ""
+		)
+
+		metadata_args = ['-DateTimeOriginal=2021:02:03 10:01:18']
+		self.assertTrue(ExifToolService.apply_metadata(test_file, metadata_args, session=session))
+
+		mock_run.assert_not_called()
+		self.assertEqual(session.execute.call_count, 2)
+		self.assertEqual(session.execute.call_args[0][0][0], metadata_args[0])
+		self.assertEqual(session.execute.call_args[0][0][-1], test_file)
+
+	@patch('subprocess.run')
+	def test_apply_metadata_batch(self, mock_run):
+		"""Test applying metadata to several files in one exiftool run"""
+		arg_files = []
+
+		def mock_run_side_effect(cmd, **kwargs):
+			with open(cmd[2], encoding='utf-8') as f:
+				arg_files.append(f.read().splitlines())
+			mock_process = MagicMock()
+			mock_process.returncode = 1
+			mock_process.stdout = "    1 image files updated\n{done0=0}\n    1 files weren't updated due to errors\n{done1=1}\n"
+			return mock_process
+
+		mock_run.side_effect = mock_run_side_effect
+
+		items = [
+			("/photos/a.jpg", ['-DateTimeOriginal=2021:02:03 10:01:18']),
+			("/photos/b.jpg", ['-Title=Two\nlines'])
+		]
+		updated = ExifToolService.apply_metadata_batch(items)
+
+		# Only the file whose command succeeded is reported as updated
+		self.assertEqual(updated, {"/photos/a.jpg"})
+		mock_run.assert_called_once()
+		lines = arg_files[0]
+		self.assertEqual(lines.count('-execute'), 1)
+		self.assertIn('-Title=Two lines', lines)
+		self.assertEqual(lines[-2:], ['-echo3', '{done1=${status}}'])
+
+	@patch('src.services.exiftool_service.ExifToolService.apply_metadata', return_value=True)
+	@patch('subprocess.run')
+	def test_apply_metadata_batch_unexpanded_status(self, mock_run, mock_apply):
+		"""Test that without ${status} (exiftool before 12.10) the update summaries tell which files were updated"""
+		mock_process = MagicMock()
+		mock_process.returncode = 1
+		mock_process.stdout = ("    1 image files updated\n{done0=${status}}\n"
+							   "    0 image files updated\n    1 files weren't updated due to errors\n{done1=}\n")
+		mock_run.return_value = mock_process
+
+		items = [
+			("/photos/a.jpg", ['-DateTimeOriginal=2021:02:03 10:01:18']),
+			("/photos/b.jpg", ['-DateTimeOriginal=2021:02:04 10:01:18'])
+		]
+		updated = ExifToolService.apply_metadata_batch(items)
+
+		# Both files have a result, so neither is written again
+		self.assertEqual(updated, {"/photos/a.jpg"})
+		mock_apply.assert_not_called()
+
+	@patch('subprocess.run')
+	def test_apply_metadata_batch_adjusts_args_by_type(self, mock_run):
+		"""Test that each file of a batch gets the arguments of its type"""
+		arg_files = []
+
+		def mock_run_side_effect(cmd, **kwargs):
+			with open(cmd[2], encoding='utf-8') as f:
+				arg_files.append(f.read().split('-execute\n'))
+			mock_process = MagicMock()
+			mock_process.returncode = 0
+			mock_process.stdout = "    1 image files updated\n{done0=0}\n    1 image files updated\n{done1=0}\n"
+			return mock_process
+
+		mock_run.side_effect = mock_run_side_effect
+		args = ['-DateTimeOriginal=2021:02:03 10:01:18', '-Title=x']
+		updated = ExifToolService.apply_metadata_batch([("/photos/a.jpg", args), ("/photos/b.mpg", args)])
+
+		self.assertEqual(updated, {"/photos/a.jpg", "/photos/b.mpg"})
+		jpg_lines, mpg_lines = (command.splitlines() for command in arg_files[0])
+		self.assertIn('-Title=x', jpg_lines)
+		self.assertIn('-overwrite_original', jpg_lines)
+		self.assertNotIn('-Title=x', mpg_lines)
+		self.assertIn('-overwrite_original_in_place', mpg_lines)
+		self.assertNotIn('-overwrite_original', mpg_lines)
+		self.assertEqual(jpg_lines.count('-ignoreMinorErrors'), 1)
+
+	@patch('src.services.exiftool_service.ExifToolService.apply_metadata', return_value=True)
+	@patch('subprocess.run')
+	def test_apply_metadata_batch_timeout(self, mock_run, mock_apply):
+		"""Test that the files left when a batch times out are written one at a time"""
+		mock_run.side_effect = subprocess.TimeoutExpired(['exiftool'], 34, output=b"    1 image files updated\n{done0=0}\n")
+
+		items = [
+			("/photos/a.jpg", ['-DateTimeOriginal=2021:02:03 10:01:18']),
+			("/photos/b.mpg", ['-DateTimeOriginal=2021:02:04 10:01:18'])
+		]
+		updated = ExifToolService.apply_metadata_batch(items)
+
+		self.assertEqual(updated, {"/photos/a.jpg", "/photos/b.mpg"})
+		self.assertEqual(mock_run.call_args.kwargs['timeout'], exiftool_service._batch_timeout(2))
+		mock_apply.assert_called_once_with("/photos/b.mpg", ['-DateTimeOriginal=2021:02:04 10:01:18'])
+
+	@patch('subprocess.run')
+	def test_read_tags(self, mock_run):
+		"""Test reading tags of several files with one command"""
+		mock_process = MagicMock()
+		mock_process.returncode = 0
+		mock_process.stdout = json.dumps([
+			{"SourceFile": "/photos/a.jpg", "DateTimeOriginal": "2021:02:03 10:01:18", "GPSLatitude": -33.5},
+			{"SourceFile": "/photos/b.jpg"}
+		])
+		mock_run.return_value = mock_process
+
+		tags = ExifToolService.read_tags(["/photos/a.jpg", "/photos/b.jpg"], ['DateTimeOriginal', 'Composite:GPSLatitude'])
+
+		self.assertEqual(tags["/photos/a.jpg"]["GPSLatitude"], -33.5)
+		self.assertEqual(tags["/photos/b.jpg"], {"SourceFile": "/photos/b.jpg"})
+		cmd = mock_run.call_args[0][0]
+		self.assertEqual(cmd[:5], ['exiftool', '-j', '-n', '-DateTimeOriginal', '-Composite:GPSLatitude'])
+
+	@patch('subprocess.run')
+	def test_read_tags_error(self, mock_run):
+		"""Test that unreadable output yields no tags"""
+		mock_process = MagicMock()
+		mock_process.stdout = "not json"
+		mock_run.return_value = mock_process
+
+		self.assertEqual(ExifToolService.read_tags(["/photos/a.jpg"], ['Title']), {})
+
 	@patch('subprocess.run')
 	def test_apply_metadata_dry_run(self, mock_run):
 		"""Test applying metadata in dry run mode"""
@@ -161,6 +533,22 @@ class TestExifToolService(unittest.TestCase):
 		# Verify the result
 		self.assertTrue(result)
 
+	@patch('subprocess.run')
+	def test_get_metadata_batch(self, mock_run):
+		"""Test reading the metadata of several files with one exiftool run"""
+		mock_process = MagicMock()
+		mock_process.returncode = 1
+		mock_process.stdout = b'[{"SourceFile":"a.jpg","EXIF:DateTimeOriginal":"2021:02:03 10:01:18"},{"SourceFile":"b.jpg"}]'
+		mock_process.stderr = b'Error: File not found - c.jpg'
+		mock_run.return_value = mock_process
+		
+		metadata = ExifToolService.get_metadata_batch(["a.jpg", "b.jpg", "c.jpg"])
+		
+		self.assertEqual(set(metadata), {"a.jpg", "b.jpg"})
+		self.assertEqual(metadata["a.jpg"]["EXIF:DateTimeOriginal"], "2021:02:03 10:01:18")
+		mock_run.assert_called_once()
+		self.assertEqual(mock_run.call_args.kwargs['input'], b"a.jpg\nb.jpg\nc.jpg")
+
 	@patch('subprocess.run')
 	def test_get_metadata(self, mock_run):
 		"""Test getting metadata from a file"""
@@ -370,5 +758,168 @@ class TestExifToolService(unittest.TestCase):
 		self.assertEqual(mime, "image/jpeg")
 
 
+# Minimal stand-in for exiftool's -stay_open protocol, used to test ExifToolSession
+FAKE_EXIFTOOL = """#!{python}
+import os
+import sys
+import time
+
+with open(os.path.join(os.path.dirname(sys.argv[0]), 'argv.txt'), 'w') as f:
+	f.write('\\n'.join(sys.argv[1:]))
+
+args = []
+for line in sys.stdin:
+	line = line.rstrip('\\n')
+	if line.startswith('-execute'):
+		echo = args[args.index('-echo4') + 1] if '-echo4' in args else ''
+		files = [arg for arg in args if not arg.startswith('-') and arg != echo]
+		ok = bool(files) and all(os.path.exists(path) for path in files)
+		if any('hang' in path for path in files):
+			time.sleep(60)
+		if any('crash' in path for path in files):
+			# Die before the {{ready}} marker, after output that looks like success
+			sys.stdout.write('    1 image files updated\\n')
+			sys.stdout.flush()
+			sys.exit(3)
+		if any('noisy' in path for path in files):
+			# More than a pipe buffer of warnings before the command ends
+			for i in range(5000):
+				sys.stderr.write('Warning: [minor] Bad MakerNotes directory - ' + files[0] + '\\n')
+		if ok:
+			sys.stdout.write('    1 image files updated\\n')
+		else:
+			sys.stderr.write('Error: File not found\\n')
+		sys.stdout.write('{{ready' + line[len('-execute'):] + '}}\\n')
+		sys.stdout.flush()
+		sys.stderr.write(echo.replace('${{status}}', '0' if ok else '1') + '\\n')
+		sys.stderr.flush()
+		args = []
+	elif args[-1:] == ['-stay_open'] and line == 'False':
+		break
+	else:
+		args.append(line)
+"""
+
+
+@unittest.skipIf(os.name == 'nt', "Fake exiftool script requires a POSIX shell")
+class TestExifToolSession(unittest.TestCase):
+	"""Test cases for the persistent exiftool session"""
+
+	def setUp(self):
+		"""Set up a fake exiftool on PATH"""
+		self.temp_dir = tempfile.TemporaryDirectory()
+		fake_path = os.path.join(self.temp_dir.name, 'exiftool')
+		with open(fake_path, 'w') as f:
+			f.write(FAKE_EXIFTOOL.format(python=sys.executable))
+		os.chmod(fake_path, 0o755)
+		self.path_patcher = patch.dict(os.environ, {'PATH': self.temp_dir.name + os.pathsep + os.environ.get('PATH', '')})
+		self.path_patcher.start()
+
+		self.test_file = os.path.join(self.temp_dir.name, 'photo.jpg')
+		with open(self.test_file, 'w') as f:
+			f.write("test content")
+
+	def tearDown(self):
+		"""Clean up"""
+		self.path_patcher.stop()
+		self.temp_dir.cleanup()
+
+	def test_batch_session_applies_metadata(self):
+		"""Test several writes through one exiftool process"""
+		with ExifToolService.batch_session() as session:
+			self.assertIsNotNone(session)
+			self.assertTrue(session.apply(self.test_file, ['-DateTimeOriginal=2021:01:01 12:00:00']))
+			self.assertTrue(session.apply(self.test_file, ['-Title=second']))
+			self.assertFalse(session.apply(os.path.join(self.temp_dir.name, 'missing.jpg'), ['-Title=x']))
+			self.assertTrue(session.running)
+		self.assertFalse(session.running)
+
+	def test_execute_returns_output(self):
+		"""Test that execute returns the command output and status"""
+		with ExifToolService.batch_session() as session:
+			result = session.execute(['-Title=line one\nline two', self.test_file])
+		self.assertEqual(result.returncode, 0)
+		self.assertIn("1 image files updated", result.stdout)
+
+	def test_execute_timeout_restarts_session(self):
+		"""Test that a hung command times out and the session keeps working with a new exiftool"""
+		hang_file = os.path.join(self.temp_dir.name, 'hang.mpg')
+		with open(hang_file, 'w') as f:
+			f.write("test content")
+		with ExifToolService.batch_session() as session:
+			with self.assertRaises(subprocess.TimeoutExpired):
+				session.execute(['-Title=x', hang_file], timeout=1)
+			self.assertTrue(session.running)
+			result = session.execute(['-Title=x', self.test_file])
+		self.assertEqual(result.returncode, 0)
+		self.assertIn("1 image files updated", result.stdout)
+
+	def test_execute_crash_fails_and_restarts_session(self):
+		"""Test that a command during which exiftool exits fails and the session keeps working"""
+		crash_file = os.path.join(self.temp_dir.name, 'crash.jpg')
+		with open(crash_file, 'w') as f:
+			f.write("test content")
+		with ExifToolService.batch_session() as session:
+			result = session.execute(['-Title=x', crash_file], timeout=10)
+			self.assertEqual(result.returncode, 3)
+			self.assertTrue(session.running)
+			self.assertFalse(session.apply(crash_file, ['-Title=x']))
+			result = session.execute(['-Title=x', self.test_file])
+		self.assertEqual(result.returncode, 0)
+		self.assertIn("1 image files updated", result.stdout)
+
+	def test_execute_reads_large_stderr(self):
+		"""Test that a command writing more than a pipe buffer to stderr does not block"""
+		noisy_file = os.path.join(self.temp_dir.name, 'noisy.jpg')
+		with open(noisy_file, 'w') as f:
+			f.write("test content")
+		with ExifToolService.batch_session() as session:
+			result = session.execute(['-Title=x', noisy_file], timeout=10)
+		self.assertEqual(result.returncode, 0)
+		self.assertEqual(result.stderr.count('Bad MakerNotes'), 5000)
+
+	def test_session_passes_common_args(self):
+		"""Test that shared options are given once on the exiftool command line"""
+		with ExifToolService.batch_session() as session:
+			session.apply(self.test_file, ['-Title=x'])
+		with open(os.path.join(self.temp_dir.name, 'argv.txt')) as f:
+			argv = f.read().splitlines()
+		self.assertEqual(argv[argv.index('-common_args') + 1:], ExifToolSession.COMMON_ARGS)
+
+	def test_shared_session_is_reused(self):
+		"""Test that the shared session is started once and reused"""
+		with patch.object(exiftool_service, '_shared_session', None), \
+			 patch.object(exiftool_service, '_shared_session_pid', None), \
+			 patch.object(exiftool_service, '_shared_session_failed', False):
+			session = ExifToolService.shared_session()
+			try:
+				self.assertIsNotNone(session)
+				self.assertIs(ExifToolService.shared_session(), session)
+				self.assertTrue(session.apply(self.test_file, ['-Title=x']))
+			finally:
+				session.close()
+
+	def test_wait_for_exit(self):
+		"""Test waiting for a process to exit, and the timeout while it is still running"""
+		process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(0.1)'])
+		exiftool_service._wait_for_exit(process, 10)
+		self.assertEqual(process.returncode, 0)
+
+		process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(10)'])
+		try:
+			with self.assertRaises(subprocess.TimeoutExpired):
+				exiftool_service._wait_for_exit(process, 0.1)
+			self.assertIsNone(process.poll())
+		finally:
+			process.kill()
+			process.wait()
+
+	def test_batch_session_without_exiftool(self):
+		"""Test that a missing exiftool yields no session"""
+		with patch.dict(os.environ, {'PATH': ''}):
+			with ExifToolService.batch_session() as session:
+				self.assertIsNone(session)
+
+
 if __name__ == "__main__":
 	unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for file_format_service module
+"""
+import os
+import sys
+import unittest
+import tempfile
+import subprocess
+from unittest.mock import patch
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import file_format_service
+from src.services.file_format_service import FileFormatService
+
+JPEG_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00' + b'\x00' * 32
+PNG_HEADER = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+class TestFileFormatService(unittest.TestCase):
+	"""Test cases for FileFormatService class"""
+
+	def setUp(self):
+		"""Set up test environment"""
+		self.temp_dir = tempfile.TemporaryDirectory()
+		self.test_dir = self.temp_dir.name
+
+	def tearDown(self):
+		"""Clean up test environment"""
+		self.temp_dir.cleanup()
+
+	def _write(self, name, content):
+		file_path = os.path.join(self.test_dir, name)
+		with open(file_path, 'wb') as f:
+			f.write(content)
+		return file_path
+
+	@patch('src.services.exiftool_service.ExifToolService.shared_session', return_value=None)
+	def test_fix_file_extensions(self, mock_session):
+		"""Test that only files whose extension does not match their content are renamed"""
+		png_as_jpg = self._write("screenshot.jpg", PNG_HEADER)
+		jpeg = self._write("photo.jpg", JPEG_HEADER)
+
+		fixed_count = FileFormatService.fix_file_extensions([png_as_jpg, jpeg, os.path.join(self.test_dir, "missing.jpg")])
+
+		self.assertEqual(fixed_count, 1)
+		self.assertTrue(os.path.exists(os.path.join(self.test_dir, "screenshot.png")))
+		self.assertFalse(os.path.exists(png_as_jpg))
+		self.assertTrue(os.path.exists(jpeg))
+
+	@patch('src.services.exiftool_service.ExifToolService.shared_session', return_value=None)
+	def test_convert_heic_files(self, mock_session):
+		"""Test that HEIC files are converted in parallel and counted"""
+		heic_files = [self._write(f"IMG_{i}.heic", b'\x00\x00\x00\x18ftypheic' + b'\x00' * 32) for i in range(3)]
+
+		with patch.object(FileFormatService, 'convert_heic_to_jpg',
+						  side_effect=lambda path, known_format: None if path == heic_files[1] else path[:-5] + '.jpg') as mock_convert:
+			converted_count = FileFormatService.convert_heic_files(heic_files, max_workers=2)
+
+		self.assertEqual(converted_count, 2)
+		self.assertEqual(sorted(call.args[0] for call in mock_convert.call_args_list), heic_files)
+		# The type detected for the batch is passed on instead of being detected again
+		self.assertEqual({call.kwargs['known_format'] for call in mock_convert.call_args_list}, {'heic'})
+
+	@patch('src.services.file_format_service.HAS_PYHEIF', False)
+	@patch('src.services.exiftool_service.ExifToolService.copy_metadata')
+	@patch('subprocess.run')
+	def test_convert_heic_to_jpg_resolves_converter_once(self, mock_run, mock_copy):
+		"""Test that the conversion tool is looked up once, not for every file"""
+		def run(cmd, **kwargs):
+			self._write(os.path.basename(cmd[-1]), JPEG_HEADER)
+			return subprocess.CompletedProcess(cmd, 0, '', '')
+		mock_run.side_effect = run
+		heic_files = [self._write(f"IMG_{i}.heic", b'') for i in range(2)]
+		file_format_service._heic_converter.cache_clear()
+
+		exists = os.path.exists
+		# Not on macOS, so that ImageMagick is picked
+		with patch('os.path.exists', side_effect=lambda path: path != '/usr/bin/sips' and exists(path)) as mock_exists, \
+			 patch('shutil.which', return_value='/opt/homebrew/bin/magick') as mock_which:
+			for heic_file in heic_files:
+				self.assertEqual(FileFormatService.convert_heic_to_jpg(heic_file, known_format='heic'), heic_file[:-5] + '.jpg')
+		file_format_service._heic_converter.cache_clear()
+
+		self.assertEqual([call.args[0] for call in mock_exists.call_args_list].count('/usr/bin/sips'), 1)
+		mock_which.assert_called_once_with('magick')
+		self.assertEqual(mock_run.call_args_list[0].args[0][0], 'magick')
+
+	@patch('src.services.exiftool_service.ExifToolService.copy_metadata')
+	@patch('subprocess.run')
+	@patch('src.services.file_format_service._convert_heic_in_process')
+	@patch('src.services.file_format_service.HAS_PYHEIF', True)
+	def test_convert_heic_to_jpg_in_process(self, mock_convert, mock_run, mock_copy):
+		"""Test that no converter process is started when pyheif can decode the file"""
+		heic_file = self._write("IMG_1.heic", b'')
+		jpg_file = heic_file[:-5] + '.jpg'
+		mock_convert.side_effect = lambda source, target: self._write(os.path.basename(target), JPEG_HEADER) is not None
+
+		self.assertEqual(FileFormatService.convert_heic_to_jpg(heic_file, known_format='heic'), jpg_file)
+
+		mock_convert.assert_called_once_with(heic_file, jpg_file)
+		mock_run.assert_not_called()
+		mock_copy.assert_called_once_with(heic_file, jpg_file)
+		self.assertFalse(os.path.exists(heic_file))
+
+	@patch('src.services.file_format_service.FileFormatService.detect_file_format')
+	def test_process_file_formats_detects_once(self, mock_detect):
+		"""Test that a file that is not converted is only detected once"""
+		mock_detect.return_value = 'png'
+		png_as_jpg = self._write("screenshot.jpg", PNG_HEADER)
+
+		result = FileFormatService.process_file_formats(png_as_jpg)
+
+		self.assertEqual(result, os.path.join(self.test_dir, "screenshot.png"))
+		mock_detect.assert_called_once_with(png_as_jpg)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Unit tests for hash_index module
+"""
+import os
+import sys
+import unittest
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.hash_index import HashIndex, is_phash, max_distance_for
+
+
+class TestHashIndex(unittest.TestCase):
+	"""Test cases for the HashIndex class"""
+
+	def setUp(self):
+		"""Set up test environment"""
+		self.hashes = {
+			"/new/a.jpg": "ffd7918181c9ffff",
+			"/new/b.jpg": "0000000000000000",
+			"/new/c.mov": "9e107d9d372bb6826bd81d3542a419d6"
+		}
+
+	def test_is_phash(self):
+		"""Test that only 64-bit hex hashes are treated as perceptual hashes"""
+		self.assertTrue(is_phash("ffd7918181c9ffff"))
+		self.assertFalse(is_phash("9e107d9d372bb6826bd81d3542a419d6"))
+		self.assertFalse(is_phash("not a hash value"))
+
+	def test_max_distance_for(self):
+		"""Test the conversion of similarity thresholds to Hamming distances"""
+		self.assertEqual(max_distance_for(1.0), 0)
+		self.assertEqual(max_distance_for(0.95), 3)
+
+	def test_exact_match(self):
+		"""Test that identical hashes are found for every hash type"""
+		index = HashIndex(self.hashes)
+		self.assertEqual(index.find("ffd7918181c9ffff"), "/new/a.jpg")
+		self.assertEqual(index.find("9e107d9d372bb6826bd81d3542a419d6"), "/new/c.mov")
+		self.assertIsNone(index.find("ffd7918181c9fffe"))
+		self.assertIsNone(index.find(None))
+
+	def test_near_match(self):
+		"""Test that perceptual hashes within the distance are found"""
+		index = HashIndex(self.hashes, max_distance=2)
+		# Two bits differ from a.jpg
+		self.assertEqual(index.find("ffd7918181c9fffc"), "/new/a.jpg")
+		# One bit differs from b.jpg
+		self.assertEqual(index.find("0000000000000001"), "/new/b.jpg")
+		self.assertIsNone(index.find("0f0f0f0f0f0f0f0f"))
+
+
+	def test_contains_many(self):
+		"""Test batched exact lookups of mixed hash types"""
+		index = HashIndex(self.hashes, max_distance=2)
+		found = index.contains_many([
+			"ffd7918181c9ffff", "ffd7918181c9fffc", None,
+			"9e107d9d372bb6826bd81d3542a419d6", "ffffffffffffffff"
+		])
+		self.assertEqual(found, [True, False, False, True, False])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -16,13 +16,22 @@ from src.utils.image_utils import (
 	find_duplicates_by_name,
 	find_potential_duplicates,
 	is_media_file,
+	iter_media_entries,
+	scan_media_entries,
 	is_uuid_filename,
 	are_duplicate_filenames,
 	compute_file_hash,
+	compute_content_hash,
 	compute_hash_for_file,
+	get_cached_hash,
+	load_image_hashes,
+	save_image_hashes,
+	append_image_hashes,
+	compact_image_hashes,
 	hash_similarity,
 	check_metadata_status,
 	rename_files_remove_suffix,
+	remove_duplicates_from_log,
 	find_matching_file_by_hash
 )
 
@@ -102,6 +111,35 @@ class TestImageUtils(unittest.TestCase):
 			f.write(b"test content")
 		self.assertTrue(is_media_file(uppercase_path))
 
+	def test_iter_media_entries(self):
+		"""Test that iter_media_entries yields media files of nested directories"""
+		album_dir = os.path.join(self.test_dir, "Album")
+		os.makedirs(album_dir)
+		album_img = os.path.join(album_dir, "IMG_9999.mov")
+		with open(album_img, 'wb') as f:
+			f.write(b"video content")
+
+		paths = {entry.path for entry in iter_media_entries(self.test_dir)}
+
+		self.assertEqual(paths, {
+			self.img1_path, self.img2_path, self.img1_dup_path,
+			self.img1_ext_path, self.uuid_path, album_img
+		})
+
+	def test_scan_media_entries(self):
+		"""Test that the threaded scan finds the same files as iter_media_entries"""
+		for album in ("Album 1", os.path.join("Album 1", "Nested"), "Album 2"):
+			os.makedirs(os.path.join(self.test_dir, album))
+			with open(os.path.join(self.test_dir, album, "IMG_0001.jpg"), 'wb') as f:
+				f.write(b"image content")
+
+		entries = scan_media_entries(self.test_dir, max_workers=2, stat=True)
+
+		self.assertEqual({entry.path for entry in entries}, {entry.path for entry in iter_media_entries(self.test_dir)})
+		self.assertEqual(len(entries), 8)
+		for entry in entries:
+			self.assertEqual(entry.stat().st_size, os.path.getsize(entry.path))
+
 	def test_is_uuid_filename(self):
 		"""Test is_uuid_filename function"""
 		# Test UUID filename
@@ -189,6 +227,27 @@ class TestImageUtils(unittest.TestCase):
 		result = compute_hash_for_file(nonexistent_path)
 		self.assertIsNone(result)
 
+	def test_compute_hash_for_file_stamped_cache(self):
+		"""Test that cache entries stamped with a stat result are invalidated when the file changes"""
+		hash_cache = {}
+		with patch('src.utils.image_utils.compute_image_hash', side_effect=["hash-1", "hash-2"]) as mock_image_hash:
+			st = os.stat(self.img1_path)
+			self.assertEqual(compute_hash_for_file(self.img1_path, hash_cache, st=st), "hash-1")
+			self.assertEqual(compute_hash_for_file(self.img1_path, hash_cache, st=st), "hash-1")
+			self.assertEqual(mock_image_hash.call_count, 1)
+			
+			# Same path, different content: the stale entry must not be used
+			with open(self.img1_path, 'ab') as f:
+				f.write(b"changed")
+			st = os.stat(self.img1_path)
+			self.assertIsNone(get_cached_hash(hash_cache, self.img1_path, st))
+			self.assertEqual(compute_hash_for_file(self.img1_path, hash_cache, st=st), "hash-2")
+		
+		# Plain entries from older caches are trusted and stamped
+		legacy_cache = {self.img1_path: "legacy-hash"}
+		self.assertEqual(get_cached_hash(legacy_cache, self.img1_path, st), "legacy-hash")
+		self.assertEqual(legacy_cache[self.img1_path], (st.st_size, st.st_mtime_ns, "legacy-hash"))
+
 	def test_compute_file_hash(self):
 		"""Test compute_file_hash function"""
 		# Test with existing file
@@ -201,6 +260,56 @@ class TestImageUtils(unittest.TestCase):
 		result = compute_file_hash(nonexistent_path)
 		self.assertIsNone(result)
 
+	def test_compute_content_hash(self):
+		"""Test compute_content_hash function"""
+		# Files with the same first bytes but different content get different hashes
+		path1 = os.path.join(self.test_dir, "content1.bin")
+		path2 = os.path.join(self.test_dir, "content2.bin")
+		with open(path1, 'wb') as f:
+			f.write(b"x" * 2048 + b"a")
+		with open(path2, 'wb') as f:
+			f.write(b"x" * 2048 + b"b")
+		self.assertNotEqual(compute_content_hash(path1, chunk_size=1024), compute_content_hash(path2, chunk_size=1024))
+		self.assertEqual(compute_content_hash(path1), compute_content_hash(path1, chunk_size=7))
+		
+		# Test with non-existent file
+		self.assertIsNone(compute_content_hash(os.path.join(self.test_dir, "nonexistent.jpg")))
+
+	def test_image_hash_cache_journal(self):
+		"""Test that journaled hashes are replayed and folded into the saved cache"""
+		hash_file = os.path.join(self.test_dir, "data", "image_hashes.pkl")
+		save_image_hashes({"a.jpg": "aaaa"}, hash_file)
+		append_image_hashes({"b.jpg": "bbbb"}, hash_file)
+		append_image_hashes({"a.jpg": "cccc"}, hash_file)
+
+		hashes = load_image_hashes(hash_file)
+		self.assertEqual(hashes, {"a.jpg": "cccc", "b.jpg": "bbbb"})
+
+		save_image_hashes(hashes, hash_file)
+		self.assertFalse(os.path.exists(hash_file + ".journal"))
+		self.assertEqual(load_image_hashes(hash_file), hashes)
+
+	def test_compact_image_hashes(self):
+		"""Test that the journal is only folded into the cache once it is large"""
+		hash_file = os.path.join(self.test_dir, "data", "image_hashes.pkl")
+		save_image_hashes({f"{i}.jpg": "a" * 16 for i in range(100)}, hash_file)
+		append_image_hashes({"new.jpg": "bbbb"}, hash_file)
+		compact_image_hashes(hash_file)
+		self.assertTrue(os.path.exists(hash_file + ".journal"))
+
+		append_image_hashes({f"{i}.mov": "c" * 32 for i in range(100)}, hash_file)
+		compact_image_hashes(hash_file)
+		self.assertFalse(os.path.exists(hash_file + ".journal"))
+		hashes = load_image_hashes(hash_file)
+		self.assertEqual(len(hashes), 201)
+		self.assertEqual(hashes["new.jpg"], "bbbb")
+
+	def test_load_image_hashes_legacy_csv(self):
+		"""Test that a CSV cache from older versions is still read"""
+		with open(os.path.join(self.test_dir, "image_hashes.csv"), 'w') as f:
+			f.write("file_path,hash_value\na.jpg,aaaa\n")
+		self.assertEqual(load_image_hashes(os.path.join(self.test_dir, "image_hashes.pkl")), {"a.jpg": "aaaa"})
+
 	def test_hash_similarity(self):
 		"""Test hash_similarity function"""
 		# Test with identical hashes
@@ -325,5 +434,23 @@ class TestImageUtils(unittest.TestCase):
 		result = find_matching_file_by_hash(self.uuid_path, self.test_dir, file_list=target_files)
 		self.assertIsNone(result)
 
+	def test_remove_duplicates_from_log(self):
+		"""Test removing the duplicates listed in a duplicates log"""
+		original = os.path.join(self.test_dir, "original.jpg")
+		duplicate = os.path.join(self.test_dir, "original (1).jpg")
+		for path in (original, duplicate):
+			with open(path, 'w') as f:
+				f.write("image")
+		log_path = os.path.join(self.test_dir, "duplicates.csv")
+		with open(log_path, 'w') as f:
+			f.write(f"original,duplicate\n{original},{duplicate}\n")
+
+		self.assertEqual(remove_duplicates_from_log(log_path, dry_run=True), (1, 1))
+		self.assertTrue(os.path.exists(duplicate))
+
+		self.assertEqual(remove_duplicates_from_log(log_path), (1, 1))
+		self.assertTrue(os.path.exists(original))
+		self.assertFalse(os.path.exists(duplicate))
+
 if __name__ == "__main__":
 	unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for log_utils module
+"""
+import os
+import sys
+import logging
+import unittest
+import multiprocessing
+import tempfile
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.log_utils import BufferedFileHandler, flush_log_handlers
+
+
+def _log_from_worker(i):
+	"""Log like a worker of apply_metadata_to_pairs"""
+	logger = logging.getLogger('test_buffered_file_handler')
+	logger.warning(f"worker warning {i}")
+	logger.info(f"worker info {i}")
+	flush_log_handlers()
+	return i
+
+
+class TestBufferedFileHandler(unittest.TestCase):
+	"""Test cases for BufferedFileHandler class"""
+
+	def setUp(self):
+		"""Set up test environment"""
+		self.temp_dir = tempfile.TemporaryDirectory()
+		self.log_file = os.path.join(self.temp_dir.name, "test.log")
+		self.logger = logging.getLogger('test_buffered_file_handler')
+		self.logger.propagate = False
+		self.handler = BufferedFileHandler(self.log_file, mode='w')
+		self.handler.setFormatter(logging.Formatter('%(message)s'))
+		self.logger.addHandler(self.handler)
+
+	def tearDown(self):
+		"""Clean up test environment"""
+		self.logger.removeHandler(self.handler)
+		self.handler.close()
+		self.temp_dir.cleanup()
+
+	def test_records_written_on_close(self):
+		"""Test that buffered records end up in the file once the handler is closed"""
+		for i in range(3):
+			self.logger.warning(f"line {i}")
+
+		self.handler.close()
+
+		with open(self.log_file) as f:
+			self.assertEqual(f.read(), "line 0\nline 1\nline 2\n")
+
+	@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), "needs the fork start method")
+	def test_records_from_pool_workers(self):
+		"""Test that records of pool workers reach the file once, and the parent's are not repeated"""
+		self.logger.setLevel(logging.INFO)
+		self.logger.info("before pool")
+		flush_log_handlers()
+
+		with multiprocessing.get_context('fork').Pool(2) as pool:
+			self.assertEqual(sorted(pool.map(_log_from_worker, range(4))), [0, 1, 2, 3])
+		self.logger.info("after pool")
+		self.handler.close()
+
+		with open(self.log_file) as f:
+			lines = f.read().splitlines()
+		self.assertEqual(lines.count("before pool"), 1)
+		self.assertEqual(lines.count("after pool"), 1)
+		for i in range(4):
+			self.assertEqual(lines.count(f"worker warning {i}"), 1)
+			self.assertEqual(lines.count(f"worker info {i}"), 1)
+
+	def test_warnings_flushed_at_once(self):
+		"""Test that warnings are written without waiting for the buffer to fill"""
+		self.logger.setLevel(logging.INFO)
+		self.logger.info("info")
+		self.logger.warning("warning")
+
+		with open(self.log_file) as f:
+			self.assertEqual(f.read(), "info\nwarning\n")
+
+
+if __name__ == "__main__":
+	unittest.main()
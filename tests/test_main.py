@@ -0,0 +1,223 @@
+"""
+Tests for applying metadata to matched pairs in main
+"""
+import os
+import sys
+import json
+import tempfile
+import unittest
+from contextlib import nullcontext
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import main
+from src.models.metadata import format_exif_date
+from src.services.exiftool_service import ExifToolService
+from src.services.metadata_service import MetadataService
+
+# photoTakenTime of the test JSON files
+TIMESTAMP = 1600000000
+
+
+class SerialPool:
+	"""Stand-in for multiprocessing.Pool that runs each task as soon as it is submitted"""
+
+	def __init__(self, processes):
+		self.processes = processes
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		return False
+
+	def apply_async(self, func, args, callback=None, error_callback=None):
+		try:
+			result = func(*args)
+		except Exception as e:
+			error_callback(e)
+			return
+		callback(result)
+
+
+class TestApplyMetadataToPairs(unittest.TestCase):
+	"""Test cases for apply_metadata_to_pairs and _apply_chunk"""
+
+	def setUp(self):
+		"""Create media files with their JSON metadata"""
+		self.temp_dir = tempfile.TemporaryDirectory()
+		self.old_dir = os.path.join(self.temp_dir.name, "old")
+		self.new_dir = os.path.join(self.temp_dir.name, "new")
+		os.makedirs(self.old_dir)
+		os.makedirs(self.new_dir)
+
+		self.pairs = []
+		for i in range(5):
+			json_path = os.path.join(self.old_dir, f"IMG_{i:04d}.jpg.json")
+			with open(json_path, 'w') as f:
+				json.dump({"title": f"IMG_{i:04d}.jpg", "photoTakenTime": {"timestamp": str(TIMESTAMP)}}, f)
+			media_file = os.path.join(self.new_dir, f"IMG_{i:04d}.jpg")
+			with open(media_file, 'wb') as f:
+				f.write(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00')
+			self.pairs.append((json_path, media_file, None))
+
+		self.session = MagicMock()
+		self.session.running = True
+		for patcher in (
+			patch.object(ExifToolService, 'batch_session', side_effect=lambda: nullcontext(self.session)),
+			patch.object(ExifToolService, 'read_tags', return_value={}),
+			patch.object(MetadataService, 'log_processed_file'),
+		):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def tearDown(self):
+		"""Clean up"""
+		self.temp_dir.cleanup()
+
+	def _logged_files(self):
+		"""Media files written to the processed files log"""
+		return sorted(call.args[1] for call in MetadataService.log_processed_file.call_args_list)
+
+	@patch('src.main.multiprocessing.Pool')
+	@patch('src.main.process_file')
+	def test_serial_applies_and_records(self, mock_process, mock_pool):
+		"""Test that without workers every pair is processed and the updated ones are recorded"""
+		failed_file = self.pairs[1][1]
+		mock_process.side_effect = lambda media_file, *args, **kwargs: media_file != failed_file
+		match_info = {self.pairs[0][0]: ('hash', 0.99)}
+
+		result = main.apply_metadata_to_pairs(iter(self.pairs), self.old_dir, jobs=1, match_info=match_info)
+
+		self.assertEqual(result, (4, 1))
+		mock_pool.assert_not_called()
+		self.assertEqual(mock_process.call_count, 5)
+		self.assertEqual(self._logged_files(), sorted(media for _, media, _ in self.pairs if media != failed_file))
+		MetadataService.log_processed_file.assert_any_call(self.pairs[0][0], self.pairs[0][1], 'hash', 0.99)
+		MetadataService.log_processed_file.assert_any_call(self.pairs[2][0], self.pairs[2][1], 'name', 1.0)
+
+	@patch('src.main._APPLY_CHUNK_SIZE', 2)
+	@patch('src.main.multiprocessing.Pool', side_effect=SerialPool)
+	@patch('src.main.process_file', return_value=True)
+	def test_pool_applies_all_chunks(self, mock_process, mock_pool):
+		"""Test that the chunks handed to the workers cover every pair and their results are recorded"""
+		result = main.apply_metadata_to_pairs(iter(self.pairs), self.old_dir, jobs=2)
+
+		self.assertEqual(result, (5, 0))
+		mock_pool.assert_called_once_with(2)
+		self.assertEqual(sorted(call.args[0] for call in mock_process.call_args_list), sorted(media for _, media, _ in self.pairs))
+		self.assertEqual(self._logged_files(), sorted(media for _, media, _ in self.pairs))
+
+	@patch('src.main.multiprocessing.Pool')
+	@patch('src.main.process_file', return_value=True)
+	def test_single_chunk_does_not_start_pool(self, mock_process, mock_pool):
+		"""Test that a single chunk is applied without starting worker processes"""
+		result = main.apply_metadata_to_pairs(iter(self.pairs), self.old_dir, jobs=4)
+
+		self.assertEqual(result, (5, 0))
+		mock_pool.assert_not_called()
+
+	@patch('src.main.process_file', return_value=True)
+	def test_dry_run_does_not_record(self, mock_process):
+		"""Test that a dry run neither starts exiftool nor marks files as processed"""
+		result = main.apply_metadata_to_pairs(iter(self.pairs), self.old_dir, dry_run=True, jobs=1)
+
+		self.assertEqual(result, (5, 0))
+		ExifToolService.batch_session.assert_not_called()
+		MetadataService.log_processed_file.assert_not_called()
+		self.assertTrue(all(call.args[2] for call in mock_process.call_args_list))
+
+	@patch('src.main.process_file', return_value=True)
+	def test_processed_files_are_skipped(self, mock_process):
+		"""Test that files recorded by a previous run are not processed again"""
+		processed_files = {self.pairs[0][1], self.pairs[3][1]}
+
+		result = main.apply_metadata_to_pairs(iter(self.pairs), self.old_dir, jobs=1, processed_files=processed_files)
+
+		self.assertEqual(result, (3, 0))
+		processed = {call.args[0] for call in mock_process.call_args_list}
+		self.assertFalse(processed & processed_files)
+		self.assertEqual(len(processed), 3)
+
+	def _current_tags(self, media_file):
+		"""Tag values of a file that already holds its metadata"""
+		date_str = format_exif_date(datetime.fromtimestamp(TIMESTAMP))
+		return {'DateTimeOriginal': date_str, 'CreateDate': date_str, 'ModifyDate': date_str,
+				'Title': os.path.basename(media_file)}
+
+	@patch('src.main._HAS_SETFILE', False)
+	@patch('src.main.update_file_metadata', return_value=True)
+	def test_up_to_date_file_is_not_written(self, mock_update):
+		"""Test that a file whose tags and modification time already match is skipped"""
+		json_path, media_file, _ = self.pairs[0]
+		os.utime(media_file, (TIMESTAMP, TIMESTAMP))
+		ExifToolService.read_tags.return_value = {media_file: self._current_tags(media_file)}
+
+		updated_pairs, failure_count = main._apply_chunk(([(json_path, media_file)], self.old_dir, False, False))
+
+		self.assertEqual(updated_pairs, [(json_path, media_file)])
+		self.assertEqual(failure_count, 0)
+		mock_update.assert_not_called()
+
+	@patch('src.main._HAS_SETFILE', False)
+	@patch('src.main.update_file_metadata', return_value=True)
+	def test_up_to_date_tags_with_stale_times_are_written(self, mock_update):
+		"""Test that a file with current tags but another modification time still gets its times set"""
+		json_path, media_file, _ = self.pairs[0]
+		os.utime(media_file, (TIMESTAMP + 3600, TIMESTAMP + 3600))
+		ExifToolService.read_tags.return_value = {media_file: self._current_tags(media_file)}
+
+		updated_pairs, _ = main._apply_chunk(([(json_path, media_file)], self.old_dir, False, False))
+
+		self.assertEqual(updated_pairs, [(json_path, media_file)])
+		mock_update.assert_called_once()
+		self.assertEqual(mock_update.call_args.args[0], media_file)
+
+	@patch('src.main.process_file', side_effect=RuntimeError("broken file"))
+	def test_chunk_counts_errors_as_failures(self, mock_process):
+		"""Test that an exception while processing one file fails only that file"""
+		pairs = [(json_path, media_file) for json_path, media_file, _ in self.pairs[:2]]
+
+		self.assertEqual(main._apply_chunk((pairs, self.old_dir, False, False)), ([], 2))
+
+
+class TestMain(unittest.TestCase):
+	"""Test cases for the command line entry point"""
+
+	def setUp(self):
+		"""Create the old and new directories"""
+		self.temp_dir = tempfile.TemporaryDirectory()
+		self.old_dir = os.path.join(self.temp_dir.name, "old")
+		self.new_dir = os.path.join(self.temp_dir.name, "new")
+		os.makedirs(self.old_dir)
+		os.makedirs(self.new_dir)
+
+	def tearDown(self):
+		"""Clean up"""
+		self.temp_dir.cleanup()
+
+	@patch('src.main.apply_metadata_to_pairs')
+	@patch('src.main.report_duplicates')
+	@patch('src.main.copy_missing_files')
+	@patch('src.main.rename_files_remove_suffix', return_value=(2, 1))
+	@patch.object(MetadataService, 'setup_processed_files_logger')
+	@patch.object(ExifToolService, 'check_exiftool', return_value=True)
+	def test_advanced_option_stops_after_running(self, mock_check, mock_setup, mock_rename, mock_copy,
+												 mock_report, mock_apply):
+		"""Test that an advanced option runs on its own, without the default workflow after it"""
+		argv = ['main.py', '--old-dir', self.old_dir, '--new-dir', self.new_dir, '--rename-files',
+				'--processed-log', os.path.join(self.temp_dir.name, 'processed_files.csv')]
+		with patch.object(sys, 'argv', argv):
+			self.assertEqual(main.main(), 0)
+
+		mock_rename.assert_called_once_with(self.new_dir, ' (1)', False)
+		mock_copy.assert_not_called()
+		mock_report.assert_not_called()
+		mock_apply.assert_not_called()
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -12,7 +12,7 @@ from pathlib import Path
 # Add the project root directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.models.metadata import Metadata, PhotoMetadata
+from src.models.metadata import Metadata, PhotoMetadata, format_exif_date
 
 
 class TestMetadata(unittest.TestCase):
@@ -119,6 +119,22 @@ class TestPhotoMetadata(unittest.TestCase):
         self.assertEqual(metadata.description, "Test description")
         self.assertEqual(metadata.latitude, 37.7749)
         self.assertEqual(metadata.longitude, -122.4194)
+        # The JSON data is only kept on request
+        self.assertIsNone(metadata.raw_data)
+
+    @unittest.skipIf(sys.version_info < (3, 10), "dataclass slots need Python 3.10")
+    def test_uses_slots(self):
+        """Test that instances carry no per-object __dict__"""
+        metadata = PhotoMetadata.from_json(self.sample_json)
+        self.assertFalse(hasattr(metadata, '__dict__'))
+
+    def test_from_json_keep_raw(self):
+        """Test that the JSON data is kept when KEEP_RAW is set"""
+        PhotoMetadata.KEEP_RAW = True
+        try:
+            metadata = PhotoMetadata.from_json(self.sample_json)
+        finally:
+            PhotoMetadata.KEEP_RAW = False
         self.assertEqual(metadata.raw_data, self.sample_json)
 
     def test_from_json_missing_fields(self):
@@ -164,6 +180,12 @@ class TestPhotoMetadata(unittest.TestCase):
         self.assertIn("-GPSLatitude=37.7749", args)
         self.assertIn("-GPSLongitude=-122.4194", args)
 
+    def test_format_exif_date(self):
+        """Test that dates are formatted like strftime('%Y:%m:%d %H:%M:%S')"""
+        for dt in (datetime(2021, 2, 3, 10, 1, 8), datetime(999, 12, 31, 23, 59, 59)):
+            self.assertEqual(format_exif_date(dt), f"{dt.year:04d}:{dt:%m:%d %H:%M:%S}")
+        self.assertEqual(format_exif_date(datetime(2021, 2, 3, 10, 1, 8)), "2021:02:03 10:01:08")
+
     def test_to_exiftool_args_partial(self):
         """Test conversion to exiftool arguments with partial data"""
         # Test with minimal data
@@ -8,13 +8,15 @@ import unittest
 import tempfile
 import json
 import shutil
+import functools
 from unittest.mock import patch, MagicMock
 
 # Add the project root directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.services.metadata_service import MetadataService
+from src.services.metadata_service import MetadataService, _iter_json_files, _find_by_name
 from src.models.metadata import Metadata, PhotoMetadata
+from src.utils.image_utils import load_image_hashes, save_image_hashes, append_image_hashes
 
 
 class TestMetadataService(unittest.TestCase):
@@ -31,6 +33,13 @@ class TestMetadataService(unittest.TestCase):
 		self.new_dir = os.path.join(self.test_dir, "new")
 		os.makedirs(self.old_dir, exist_ok=True)
 		os.makedirs(self.new_dir, exist_ok=True)
+
+		# Keep the hash cache of the matching out of the repository's data directory
+		hash_file = os.path.join(self.test_dir, "data", "image_hashes.pkl")
+		for func in (load_image_hashes, save_image_hashes, append_image_hashes):
+			patcher = patch(f'src.services.metadata_service.{func.__name__}', functools.partial(func, hash_file=hash_file))
+			patcher.start()
+			self.addCleanup(patcher.stop)
 		
 		# Create a test JSON metadata file
 		self.test_json = {
@@ -261,6 +270,138 @@ class TestMetadataService(unittest.TestCase):
 			self.assertTrue(os.path.exists(json_path))
 			self.assertTrue(os.path.exists(media_path))
 
+	@patch('src.utils.image_utils.compute_hash_for_file')
+	def test_iter_metadata_pairs(self, mock_compute_hash):
+		"""Test that pairs are yielded lazily with their match info"""
+		supplemental_json_path = os.path.join(self.old_dir, self.test_photo_name + ".supplemental-metadata.json")
+		with open(supplemental_json_path, 'w') as f:
+			json.dump(self.test_json, f)
+		mock_compute_hash.return_value = "test-hash-123"
+
+		match_info = {}
+		pairs = MetadataService.iter_metadata_pairs(self.old_dir, self.new_dir, match_info=match_info)
+
+		# Nothing is scanned before the first pair is requested
+		self.assertNotIsInstance(pairs, list)
+		self.assertEqual(match_info, {})
+		pairs = list(pairs)
+		self.assertGreater(len(pairs), 0)
+		self.assertEqual(set(match_info), {pair[0] for pair in pairs})
+
+	def test_iter_json_files(self):
+		"""Test that only the supplemental metadata JSON files are found, in all subdirectories"""
+		album_dir = os.path.join(self.old_dir, "Album", "2021")
+		os.makedirs(album_dir)
+		expected = set()
+		for directory in (self.old_dir, album_dir):
+			for name in ("IMG_1.jpg.supplemental-metadata.json", "IMG_2.jpg.supplemental-meta.json", "metadata.json", "IMG_1.jpg"):
+				path = os.path.join(directory, name)
+				with open(path, 'w') as f:
+					f.write("{}")
+				if '.supplemental-meta' in name:
+					expected.add(path)
+		os.makedirs(os.path.join(self.old_dir, "folder.supplemental-metadata.json"))
+
+		self.assertEqual(set(_iter_json_files(self.old_dir)), expected)
+
+	def test_find_by_name(self):
+		"""Test matching JSON files to media files with the name index"""
+		name_index = {
+			'img_1234.jpg': '/new/IMG_1234.jpg', 'img_1234': '/new/IMG_1234.jpg',
+			'img_5678 (1).heic': '/new/IMG_5678 (1).heic', 'img_5678 (1)': '/new/IMG_5678 (1).heic', 'img_5678': '/new/IMG_5678 (1).heic',
+			'a_very_long_file_name_from_takeout.jpg': '/new/a_very_long_file_name_from_takeout.jpg',
+			'a_very_long_file_name_from_takeout': '/new/a_very_long_file_name_from_takeout.jpg',
+		}
+		sorted_names = sorted(name_index)
+
+		self.assertEqual(_find_by_name(name_index, sorted_names, '/old/IMG_1234.JPG.supplemental-metadata.json'), '/new/IMG_1234.jpg')
+		self.assertEqual(_find_by_name(name_index, sorted_names, '/old/IMG_5678.HEIC.supplemental-meta.json'), '/new/IMG_5678 (1).heic')
+		# Takeout truncates long JSON names
+		self.assertEqual(_find_by_name(name_index, sorted_names, '/old/a_very_long_file_name_fr.json'), '/new/a_very_long_file_name_from_takeout.jpg')
+		self.assertIsNone(_find_by_name(name_index, sorted_names, '/old/DSC_0001.jpg.supplemental-metadata.json'))
+
+	def _match_with_cache(self, pairs_cache, new_dir=None):
+		"""Match the supplemental JSON file with a pairs cache, returning the pairs and match info"""
+		match_info = {}
+		pairs = list(MetadataService.iter_metadata_pairs(self.old_dir, new_dir or self.new_dir, use_hash_matching=False,
+														 pairs_cache=pairs_cache, match_info=match_info))
+		return pairs, match_info
+
+	def _write_supplemental_json(self):
+		supplemental_json_path = os.path.join(self.old_dir, self.test_photo_name + ".supplemental-metadata.json")
+		with open(supplemental_json_path, 'w') as f:
+			json.dump(self.test_json, f)
+		return supplemental_json_path
+
+	def test_pairs_cache_hit(self):
+		"""Test that an unchanged JSON file reuses its cached match after a save and load"""
+		json_path = self._write_supplemental_json()
+		cache_file = os.path.join(self.test_dir, "pairs_cache.pkl")
+		settings = MetadataService.pairs_cache_settings(self.new_dir, False, 0.98)
+
+		pairs_cache = MetadataService.load_pairs_cache(cache_file, settings)
+		pairs, match_info = self._match_with_cache(pairs_cache)
+		self.assertEqual([pair[:2] for pair in pairs], [(json_path, self.new_photo_path)])
+		self.assertEqual(match_info[json_path][0], 'name')
+		MetadataService.save_pairs_cache(pairs_cache, cache_file, settings)
+
+		pairs_cache = MetadataService.load_pairs_cache(cache_file, settings)
+		self.assertIn(json_path, pairs_cache)
+		with patch.object(MetadataService, 'parse_json_metadata') as mock_parse:
+			pairs, match_info = self._match_with_cache(pairs_cache)
+		mock_parse.assert_not_called()
+		self.assertEqual([pair[:2] for pair in pairs], [(json_path, self.new_photo_path)])
+		self.assertEqual(match_info[json_path], ('cache', 1.0))
+
+	def test_match_info_set_before_yield(self):
+		"""Test that the match of a pair is recorded before the pair is handed to the consumer"""
+		json_path = self._write_supplemental_json()
+		pairs_cache = {}
+		for expected_method in ('name', 'cache'):
+			match_info = {}
+			pairs = MetadataService.iter_metadata_pairs(self.old_dir, self.new_dir, use_hash_matching=False,
+														pairs_cache=pairs_cache, match_info=match_info)
+			self.assertEqual(next(pairs)[0], json_path)
+			self.assertEqual(match_info[json_path][0], expected_method)
+			self.assertIn(json_path, pairs_cache)
+			pairs.close()
+
+	def test_pairs_cache_stale_entry(self):
+		"""Test that a JSON file changed since it was cached is parsed and matched again"""
+		json_path = self._write_supplemental_json()
+		pairs_cache = {}
+		self._match_with_cache(pairs_cache)
+
+		self.test_json["title"] = "Edited title"
+		with open(json_path, 'w') as f:
+			json.dump(self.test_json, f)
+		pairs, match_info = self._match_with_cache(pairs_cache)
+
+		self.assertEqual(match_info[json_path][0], 'name')
+		self.assertEqual(pairs[0][2].title, "Edited title")
+
+	def test_pairs_cache_changed_directory(self):
+		"""Test that matches cached for another new directory are not reused"""
+		json_path = self._write_supplemental_json()
+		cache_file = os.path.join(self.test_dir, "pairs_cache.pkl")
+		pairs_cache = {}
+		self._match_with_cache(pairs_cache)
+		MetadataService.save_pairs_cache(pairs_cache, cache_file, MetadataService.pairs_cache_settings(self.new_dir, False, 0.98))
+
+		other_new_dir = os.path.join(self.test_dir, "other_new")
+		os.makedirs(other_new_dir)
+		other_photo_path = os.path.join(other_new_dir, self.test_photo_name)
+		with open(other_photo_path, 'w') as f:
+			f.write("test photo content")
+
+		# Another directory or other matching settings discard the whole cache
+		self.assertEqual(MetadataService.load_pairs_cache(cache_file, MetadataService.pairs_cache_settings(other_new_dir, False, 0.98)), {})
+		self.assertEqual(MetadataService.load_pairs_cache(cache_file, MetadataService.pairs_cache_settings(self.new_dir, True, 0.98)), {})
+		# An entry pointing outside the new directory is not used either
+		pairs, match_info = self._match_with_cache(pairs_cache, other_new_dir)
+		self.assertEqual([pair[:2] for pair in pairs], [(json_path, other_photo_path)])
+		self.assertEqual(match_info[json_path][0], 'name')
+
 	def test_find_metadata_pairs_empty_directories(self):
 		"""Test finding metadata pairs with empty directories"""
 		# Skip this test if the method doesn't exist
@@ -368,6 +509,21 @@ class TestMetadataService(unittest.TestCase):
 			self.assertEqual(processed, 1)
 			self.assertEqual(successful, 0)
 
+	def test_process_metadata_pairs_in_batches(self):
+		"""Test that pairs are written in batches with one exiftool run each"""
+		pairs = [(self.json_path, self.new_photo_path)] * 3
+		
+		with patch('src.services.metadata_service.METADATA_BATCH_SIZE', 2), \
+			 patch('src.services.exiftool_service.ExifToolService.apply_metadata_batch') as mock_batch, \
+			 patch('src.services.metadata_service.MetadataService.apply_metadata_to_file') as mock_apply:
+			mock_batch.side_effect = lambda items: {target_file for target_file, _ in items}
+			
+			processed, successful = MetadataService.process_metadata_pairs(pairs)
+			
+			self.assertEqual((processed, successful), (3, 3))
+			self.assertEqual(sorted(len(call.args[0]) for call in mock_batch.call_args_list), [1, 2])
+			mock_apply.assert_not_called()
+
 	def test_find_matching_file(self):
 		"""Test finding a matching file"""
 		# Skip this test if the method doesn't exist
@@ -418,5 +574,17 @@ class TestMetadataService(unittest.TestCase):
 				self.assertEqual(processed, 1)
 				self.assertEqual(successful, 1)
 
+	def test_load_processed_files(self):
+		"""Test loading updated target files from the processed files log"""
+		log_file = os.path.join(self.test_dir, "processed.csv")
+		with open(log_file, 'w') as f:
+			f.write("source_file,target_file,match_method,similarity,date_modified\n")
+			f.write(f"{self.json_path},{self.new_photo_path},name,1.0000,2021-02-03 10:01:18\n")
+
+		processed_files = MetadataService.load_processed_files(log_file)
+
+		self.assertEqual(processed_files, {self.new_photo_path})
+		self.assertEqual(MetadataService.load_processed_files(os.path.join(self.test_dir, "missing.csv")), set())
+
 if __name__ == "__main__":
 	unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Unit tests for xmp_service module
+"""
+import os
+import sys
+import unittest
+import tempfile
+import shutil
+import xml.etree.ElementTree as ET
+
+# Add the project root directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.xmp_service import XmpService
+
+
+class TestXmpService(unittest.TestCase):
+	"""Test cases for XmpService class"""
+
+	def setUp(self):
+		"""Set up test environment"""
+		self.test_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		"""Clean up test environment"""
+		shutil.rmtree(self.test_dir)
+
+	def test_format_date(self):
+		"""Test conversion of EXIF dates to XMP dates"""
+		self.assertEqual(XmpService.format_date("2021:01:02 03:04:05"), "2021-01-02T03:04:05")
+
+	def test_format_gps(self):
+		"""Test conversion of decimal coordinates to XMP coordinates"""
+		self.assertEqual(XmpService.format_gps(37.7749, 'N', 'S'), "37,46.494N")
+		self.assertEqual(XmpService.format_gps(-122.5, 'E', 'W'), "122,30W")
+
+	def test_build_xmp_escapes_text(self):
+		"""Test that title and description are XML-escaped"""
+		xmp = XmpService.build_xmp("2021:01:02 03:04:05", title="Tom & Jerry <3", description="a > b")
+		root = ET.fromstring(xmp.split('?>', 1)[1].rsplit('<?xpacket', 1)[0])
+		texts = [element.text for element in root.iter() if element.tag.endswith('}li')]
+		self.assertEqual(texts, ["Tom & Jerry <3", "a > b"])
+
+	def test_build_xmp_without_optional_fields(self):
+		"""Test that only the dates are written when nothing else is known"""
+		xmp = XmpService.build_xmp("2021:01:02 03:04:05")
+		self.assertIn("<exif:DateTimeOriginal>2021-01-02T03:04:05</exif:DateTimeOriginal>", xmp)
+		self.assertNotIn("GPSLatitude", xmp)
+		self.assertNotIn("dc:title", xmp)
+
+	def test_write_sidecar(self):
+		"""Test writing and replacing a sidecar file"""
+		sidecar_path = os.path.join(self.test_dir, "photo.png.xmp")
+		with open(sidecar_path, 'w') as f:
+			f.write("old")
+
+		self.assertTrue(XmpService.write_sidecar(sidecar_path, "2021:01:02 03:04:05", 37.7749, -122.4194, "Title"))
+
+		with open(sidecar_path, 'r', encoding='utf-8') as f:
+			content = f.read()
+		self.assertIn("<exif:GPSLatitude>37,46.494N</exif:GPSLatitude>", content)
+		self.assertIn("<exif:GPSLongitude>122,25.164W</exif:GPSLongitude>", content)
+		self.assertEqual(os.listdir(self.test_dir), ["photo.png.xmp"])
+
+	def test_write_sidecar_writes_all_content(self):
+		"""Test that a sidecar larger than one write is written completely"""
+		sidecar_path = os.path.join(self.test_dir, "photo.png.xmp")
+		description = "x" * (1 << 20)
+
+		self.assertTrue(XmpService.write_sidecar(sidecar_path, "2021:01:02 03:04:05", description=description))
+
+		with open(sidecar_path, 'r', encoding='utf-8') as f:
+			self.assertEqual(f.read(), XmpService.build_xmp("2021:01:02 03:04:05", description=description))
+
+	def test_write_sidecar_missing_directory(self):
+		"""Test that a failed write returns False"""
+		sidecar_path = os.path.join(self.test_dir, "missing", "photo.png.xmp")
+		self.assertFalse(XmpService.write_sidecar(sidecar_path, "2021:01:02 03:04:05"))
+
+
+if __name__ == '__main__':
+	unittest.main()